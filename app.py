@@ -9,6 +9,7 @@ request handler(s).
 """
 
 from flask import Flask, render_template, request, send_file, jsonify
+import io
 import os
 import time
 import threading
@@ -18,6 +19,8 @@ import uuid
 import tempfile
 from datetime import datetime, timedelta
 
+from modules.ArtifactStore import session_store, expire_sessions
+
 app = Flask(__name__, static_folder='static', template_folder='templates')
 
 def _sanitize_for_json(obj):
@@ -65,6 +68,8 @@ def cleanup_old_temp_files():
                         print(f"Error removing temp file {filename}: {e}")
     except Exception as e:
         print(f"Error during temp file cleanup: {e}")
+    # In-memory figures of idle sessions (their files above stay until they expire)
+    expire_sessions()
 
 def start_cleanup_scheduler():
     """Start a background thread for periodic cleanup."""
@@ -472,10 +477,11 @@ def analyze():
         if single_image_mode:
             # --- Single Image Mode Pipeline ---
             # Use merged_pdf path for the single report
-            SingleImageUnitBackend.analyze_and_generate(
+            single_results = SingleImageUnitBackend.analyze_and_generate(
                 sample_img_proc, settings, merged_pdf, 
                 report_id=analysis_id, timestamp=timestamp
             )
+            single_ctx = single_results.get('ctx')
             
             # Settings Receipt
             receipt_pdf = os.path.join(temp_dir, f"{session_id}_receipt.pdf")
@@ -496,7 +502,14 @@ def analyze():
             size_mb = os.path.getsize(merged_pdf) / (1024 * 1024)
             
             # Generate visualization images for frontend display
-            viz_urls = _save_single_image_visualizations(session_id, sample_img_proc, settings)
+            viz_urls = _save_single_image_visualizations(session_id, sample_img_proc, settings, ctx=single_ctx)
+            
+            histograms = {}
+            try:
+                from modules.ColorUnitBackend import histograms_json
+                histograms = {'sample': histograms_json(single_ctx if single_ctx is not None else sample_img_proc)}
+            except Exception as e:
+                print(f"Error building histogram data: {e}")
             
             return jsonify({
                 'success': True,
@@ -514,6 +527,7 @@ def analyze():
                 'report_time': time_str,
                 'operator': settings.get('operator', 'Operator'),
                 'images': viz_urls,
+                'histograms': histograms,
                 'fn_full': f"{analysis_id}T{_lang_suffix}.pdf",
                 'fn_receipt': f"{analysis_id}_AYARLAR{_lang_suffix}.pdf"
             })
@@ -521,11 +535,17 @@ def analyze():
         else:
             # --- Existing Two-Image Pipeline ---
             
+            # One store for the whole request: holding it here keeps its figures until they are
+            # published, even if the registry evicts the session under memory pressure meanwhile
+            artifacts = session_store(session_id)
+            
             # 1. Color Analysis
-            _, color_results = ColorUnitBackend.analyze_and_generate(ref_img_proc, sample_img_proc, settings, color_pdf, report_id=analysis_id, timestamp=timestamp)
+            _, color_results = ColorUnitBackend.analyze_and_generate(ref_img_proc, sample_img_proc, settings, color_pdf, report_id=analysis_id, timestamp=timestamp,
+                                                                     artifacts=artifacts)
             
             # 2. Pattern Analysis
-            _, pattern_results = PatternUnitBackend.analyze_and_generate(ref_img_proc, sample_img_proc, settings, pattern_pdf, report_id=analysis_id, timestamp=timestamp, is_combined=True)
+            _, pattern_results = PatternUnitBackend.analyze_and_generate(ref_img_proc, sample_img_proc, settings, pattern_pdf, report_id=analysis_id, timestamp=timestamp, is_combined=True,
+                                                                         artifacts=artifacts)
             
             
             # Keep individual PDFs for split download
@@ -733,12 +753,17 @@ def analyze():
                 thr_da = float(lab_thr.get('da', 1.0))
                 thr_db = float(lab_thr.get('db', 1.0))
                 thr_mag = float(lab_thr.get('magnitude', 2.0))
-                mean_ref_L = float(_np.mean([r['ref_lab'][0] for r in reg_stats_safe]))
-                mean_ref_a = float(_np.mean([r['ref_lab'][1] for r in reg_stats_safe]))
-                mean_ref_b = float(_np.mean([r['ref_lab'][2] for r in reg_stats_safe]))
-                mean_sam_L = float(_np.mean([r['sam_lab'][0] for r in reg_stats_safe]))
-                mean_sam_a = float(_np.mean([r['sam_lab'][1] for r in reg_stats_safe]))
-                mean_sam_b = float(_np.mean([r['sam_lab'][2] for r in reg_stats_safe]))
+                color_grid_raw = color_results.get('grid')
+                if color_grid_raw is not None:
+                    mean_ref_L, mean_ref_a, mean_ref_b = (float(v) for v in color_grid_raw['ref_lab'].mean(axis=0))
+                    mean_sam_L, mean_sam_a, mean_sam_b = (float(v) for v in color_grid_raw['sam_lab'].mean(axis=0))
+                else:
+                    mean_ref_L = float(_np.mean([r['ref_lab'][0] for r in reg_stats_safe]))
+                    mean_ref_a = float(_np.mean([r['ref_lab'][1] for r in reg_stats_safe]))
+                    mean_ref_b = float(_np.mean([r['ref_lab'][2] for r in reg_stats_safe]))
+                    mean_sam_L = float(_np.mean([r['sam_lab'][0] for r in reg_stats_safe]))
+                    mean_sam_a = float(_np.mean([r['sam_lab'][1] for r in reg_stats_safe]))
+                    mean_sam_b = float(_np.mean([r['sam_lab'][2] for r in reg_stats_safe]))
                 import math as _math
                 dL = round(mean_sam_L - mean_ref_L, 4)
                 da = round(mean_sam_a - mean_ref_a, 4)
@@ -773,7 +798,8 @@ def analyze():
                 pattern_details[_mk] = {'score': _mv, 'pass_threshold': _pass_t, 'cond_threshold': _cond_t, 'status': _st}
             
             # Generate visualization images for frontend display
-            viz_urls = _save_visualization_images(session_id, ref_img_proc, sample_img_proc, color_results, pattern_results, settings)
+            viz_urls = _save_visualization_images(session_id, ref_img_proc, sample_img_proc, color_results, pattern_results, settings,
+                                                  artifacts=artifacts)
             
             # Structural diff metadata
             structural_meta = {}
@@ -786,14 +812,40 @@ def analyze():
                     'total_pixels': int(structural.get('total_pixels', 0)),
                     'changed_pixels': int(structural.get('changed_pixels', 0)),
                 }
+                defects = structural.get('defects')
+                if defects is not None:
+                    structural_meta['defect_count'] = int(len(defects['area']))
+                    structural_meta['largest_defects'] = [
+                        {
+                            'area': int(defects['area'][i]),
+                            'bbox': [int(v) for v in defects['bbox'][i]],
+                            'centroid': [round(float(v), 1) for v in defects['centroid'][i]],
+                            'mean_intensity': round(float(defects['mean_intensity'][i]), 2),
+                        }
+                        for i in range(min(20, len(defects['area'])))
+                    ]
 
             # ΔE summary statistics
             de_statistics = {}
+            color_grid = {}
             if reg_stats_safe:
                 import numpy as np
-                de76_vals = [r['de76'] for r in reg_stats_safe]
-                de94_vals = [r['de94'] for r in reg_stats_safe]
-                de00_vals = [r['de00'] for r in reg_stats_safe]
+                grid = color_results.get('grid')
+                if grid is not None:
+                    # Dense grid: statistics over every cell, region list holds the worst cells
+                    de76_vals, de94_vals, de00_vals = grid['de76'], grid['de94'], grid['de00']
+                    color_grid = {
+                        'cells': int(len(grid['de00'])),
+                        'pitch': round(float(grid['pitch']), 2),
+                        'radius': int(grid['radius']),
+                        'pass': grid['n_pass'],
+                        'conditional': grid['n_conditional'],
+                        'fail': grid['n_fail'],
+                    }
+                else:
+                    de76_vals = [r['de76'] for r in reg_stats_safe]
+                    de94_vals = [r['de94'] for r in reg_stats_safe]
+                    de00_vals = [r['de00'] for r in reg_stats_safe]
                 for metric_name, vals in [('de76', de76_vals), ('de94', de94_vals), ('de00', de00_vals)]:
                     de_statistics[metric_name] = {
                         'mean': round(float(np.mean(vals)), 4),
@@ -802,48 +854,42 @@ def analyze():
                         'max': round(float(np.max(vals)), 4),
                     }
 
+            # Full-resolution ΔE2000 area statistics
+            de_area_stats = {}
+            de_map = color_results.get('de_map')
+            if de_map:
+                de_area_stats = {k: round(float(de_map[k]), 4) for k in ('mean', 'max', 'p50', 'p95', 'p99', 'pct_over_pass', 'pct_over_conditional')}
+                de_area_stats['valid_pixels'] = int(de_map['valid_pixels'])
+                de_area_stats['thresholds'] = de_map['thresholds']
+
+            # Channel and L* histograms for client-side rendering (cached on the image contexts)
+            histograms = {}
+            try:
+                from modules.ColorUnitBackend import histograms_json
+                histograms = {
+                    'ref': histograms_json(color_results.get('ref_ctx', ref_img_proc)),
+                    'sample': histograms_json(color_results.get('sam_ctx', sample_img_proc)),
+                }
+            except Exception as e:
+                print(f"Error building histogram data: {e}")
+
             # Illuminant analysis data
             illuminant_data = []
             try:
-                from modules.ColorUnitBackend import adapt_to_illuminant, xyz_to_lab, deltaE2000, WHITE_POINTS
-                raw_reg_stats = color_results.get('reg_stats', [])
-                primary_ill = settings.get('primary_illuminant', 'D65')
+                illuminants = color_results.get('illuminants', {})
                 test_illuminants = settings.get('test_illuminants', ['D65', 'D50', 'TL84'])
                 if isinstance(test_illuminants, str):
                     test_illuminants = [test_illuminants]
                 for ill in test_illuminants:
                     ill_key = ill.strip()
-                    if ill_key not in WHITE_POINTS:
+                    res = illuminants.get(ill_key)
+                    if res is None:
                         continue
-                    if ill_key == primary_ill:
-                        # Use the canonical values from the main analysis
-                        mean_ill_de = float(mean_de)
-                        ill_csi = float(csi_val)
-                    else:
-                        # Chromatic adaptation for non-primary illuminants
-                        ill_de_values = []
-                        for item in raw_reg_stats:
-                            ref_xyz_d65 = item['ref']['xyz']
-                            ref_xyz_tgt = adapt_to_illuminant(ref_xyz_d65, ill_key)
-                            ref_lab_tgt = xyz_to_lab(ref_xyz_tgt, WHITE_POINTS[ill_key])
-                            sam_xyz_d65 = item['sam']['xyz']
-                            sam_xyz_tgt = adapt_to_illuminant(sam_xyz_d65, ill_key)
-                            sam_lab_tgt = xyz_to_lab(sam_xyz_tgt, WHITE_POINTS[ill_key])
-                            d00 = deltaE2000(ref_lab_tgt, sam_lab_tgt)
-                            ill_de_values.append(d00)
-                        mean_ill_de = float(np.mean(ill_de_values)) if ill_de_values else 0.0
-                        ill_csi = max(0.0, min(100.0, 100.0 - (mean_ill_de * 10.0)))
-                    if ill_csi >= 90.0:
-                        ill_status = 'PASS'
-                    elif ill_csi >= 70.0:
-                        ill_status = 'CONDITIONAL'
-                    else:
-                        ill_status = 'FAIL'
                     illuminant_data.append({
                         'illuminant': ill_key,
-                        'mean_de00': round(mean_ill_de, 4),
-                        'csi': round(ill_csi, 2),
-                        'status': ill_status,
+                        'mean_de00': round(float(res['mean_de00']), 4),
+                        'csi': round(float(res['csi']), 2),
+                        'status': res['status'],
                     })
             except Exception as e:
                 print(f"Error computing illuminant data for frontend: {e}")
@@ -907,6 +953,8 @@ def analyze():
                                 }
                                 for p in fda.get('peaks', [])
                             ],
+                            'radial_profile': [round(float(v), 6) for v in fda.get('radial_profile', [])],
+                            'angular_profile': [round(float(v), 6) for v in fda.get('angular_profile', [])],
                         }
                     fourier_data = {
                         'sample': _fda_scalars(fourier_res.get('sample')),
@@ -914,6 +962,8 @@ def analyze():
                         'fundamental_period': round(float(fourier_res.get('fundamental_period', 0)), 4),
                         'dominant_orientation': round(float(fourier_res.get('dominant_orientation', 0)), 4),
                         'anisotropy': round(float(fourier_res.get('anisotropy', 1)), 4),
+                        'radial_similarity': round(float(fourier_res.get('radial_similarity', 0)), 2),
+                        'angular_similarity': round(float(fourier_res.get('angular_similarity', 0)), 2),
                         'peaks': [
                             {
                                 'radius': round(float(p['radius']), 4),
@@ -1006,9 +1056,35 @@ def analyze():
                 'pattern_scores': pattern_scores,
                 'pattern_composite': round(float(pattern_results.get('composite_score', 0)), 2),
                 'pattern_final_status': p_status,
+                'pattern_triage': {
+                    'decided': bool(pattern_results['triage']['decided']),
+                    'status': pattern_results['triage']['status'],
+                    'composite': round(float(pattern_results['triage']['composite']), 2),
+                    'level': int(pattern_results['triage']['level']),
+                } if pattern_results.get('triage') else None,
+                'pattern_phase_local': {
+                    'max_shift': round(float(pattern_results['phase_local']['max_shift']), 3),
+                    'mean_shift': [round(float(v), 3) for v in pattern_results['phase_local']['mean_shift']],
+                    'shift_variance': round(float(pattern_results['phase_local']['shift_variance']), 4),
+                    'reliable_fraction': round(float(pattern_results['phase_local']['reliable_fraction']), 4),
+                    'window': int(pattern_results['phase_local']['window']),
+                    'step': int(pattern_results['phase_local']['step']),
+                } if pattern_results.get('phase_local') else None,
+                'pattern_repeat': {
+                    'period': [round(float(v), 2) for v in pattern_results['repeat_results']['period_px']],
+                    'tiles': int(pattern_results['repeat_results']['tiles']),
+                    'mean_score': round(float(pattern_results['repeat_results']['mean_score']), 2),
+                    'min_score': round(float(pattern_results['repeat_results']['min_score']), 2),
+                    'score_grid': [[round(float(v), 2) if v == v else None for v in row]
+                                   for row in pattern_results['repeat_results']['ssim']],
+                    'worst': pattern_results['repeat_results']['worst'],
+                } if pattern_results.get('repeat_results') else None,
                 'images': viz_urls,
                 'structural_meta': structural_meta,
                 'de_statistics': de_statistics,
+                'de_area_stats': de_area_stats,
+                'color_grid': color_grid,
+                'histograms': histograms,
                 'illuminant_data': illuminant_data,
                 'color_findings': color_findings,
                 'color_conclusion_text': color_conclusion_text,
@@ -1087,21 +1163,46 @@ def download_merged_report(session_id):
 def serve_report_image(session_id, name):
     safe_id = os.path.basename(session_id)
     safe_name = os.path.basename(name)
+    # Rendered once per session and kept in memory; files cover other worker processes
+    store = session_store(safe_id, create=False)
+    data = store.get(safe_name) if store is not None else None
+    if data is not None:
+        return send_file(io.BytesIO(data), mimetype='image/png')
     img_path = os.path.join(UPLOAD_FOLDER, f"{safe_id}_img_{safe_name}.png")
     if os.path.exists(img_path):
         return send_file(img_path, mimetype='image/png')
     return jsonify({'error': 'Image not found'}), 404
 
 
-def _save_visualization_images(session_id, ref_img_proc, sample_img_proc, color_results, pattern_results, settings):
-    """Generate and save all visualization images for frontend display.
-    Returns a dict of image_name -> URL path."""
+def _save_visualization_images(session_id, ref_img_proc, sample_img_proc, color_results, pattern_results, settings,
+                               artifacts=None):
+    """Publish all visualization images for frontend display from the session's artifact store.
+    Figures the PDF builders already rendered are reused as is; the rest are rendered here once.
+    Pass the store the analyses rendered into (artifacts) so an eviction of the session in
+    between cannot lose them. Returns a dict of image_name -> URL path."""
     import cv2
     import numpy as np
     from modules import ColorUnitBackend, PatternUnitBackend
 
     image_urls = {}
     img_prefix = os.path.join(UPLOAD_FOLDER, f"{session_id}_img_")
+    artifacts = artifacts if artifacts is not None else session_store(session_id)
+
+    def publish(name):
+        # Bytes also go next to the PDFs so other worker processes (and older sessions) can serve them
+        artifacts.save(name, img_prefix + f"{name}.png")
+        image_urls[name] = f"/api/report_image/{session_id}/{name}"
+
+    def publish_render(name, fn):
+        if name not in artifacts:
+            artifacts.render(name, fn)
+        publish(name)
+
+    def publish_image(name, bgr):
+        ok, buf = cv2.imencode('.png', bgr)
+        if ok:
+            artifacts.put(name, buf.tobytes())
+            publish(name)
 
     try:
         reg_stats = color_results.get('reg_stats', [])
@@ -1116,51 +1217,38 @@ def _save_visualization_images(session_id, ref_img_proc, sample_img_proc, color_
             try:
                 mean_rgb_ref = np.mean([x['ref']['rgb01'] for x in reg_stats], axis=0)
                 mean_rgb_sam = np.mean([x['sam']['rgb01'] for x in reg_stats], axis=0)
-                p = img_prefix + "spectral.png"
-                ColorUnitBackend.plot_spectral_proxy(mean_rgb_ref, mean_rgb_sam, p)
-                image_urls['spectral'] = f"/api/report_image/{session_id}/spectral"
+                publish_render('spectral', lambda out: ColorUnitBackend.plot_spectral_proxy(mean_rgb_ref, mean_rgb_sam, out))
             except Exception as e:
                 print(f"Error saving spectral image: {e}")
 
         # 2. RGB Histograms (dual)
         try:
-            p = img_prefix + "histograms.png"
-            ColorUnitBackend.plot_rgb_histograms_dual(ref_bgr, sam_bgr, p)
-            image_urls['histograms'] = f"/api/report_image/{session_id}/histograms"
+            # Histograms are memoized on the image contexts built by analyze_color
+            publish_render('histograms', lambda out: ColorUnitBackend.plot_rgb_histograms_dual(
+                color_results.get('ref_ctx', ref_bgr), color_results.get('sam_ctx', sam_bgr), out))
         except Exception as e:
             print(f"Error saving histogram image: {e}")
 
-        # 3. ΔE Heatmap
+        # 3. ΔE Heatmap (full-resolution ΔE2000 map from analyze_color)
         try:
-            h_r, w_r = ref_bgr.shape[:2]
-            target_w = min(640, w_r)
-            target_h = int(target_w * h_r / w_r)
-            small_ref = cv2.resize(ref_bgr, (target_w, target_h))
-            small_sam = cv2.resize(sam_bgr, (target_w, target_h))
-            s_ref_lab = cv2.cvtColor(small_ref, cv2.COLOR_BGR2LAB).astype(np.float32)
-            s_sam_lab = cv2.cvtColor(small_sam, cv2.COLOR_BGR2LAB).astype(np.float32)
-            diff_map = np.sqrt(np.sum((s_ref_lab - s_sam_lab) ** 2, axis=2))
-            p = img_prefix + "heatmap.png"
-            ColorUnitBackend.plot_heatmap(diff_map, "ΔE Heatmap", p)
-            image_urls['heatmap'] = f"/api/report_image/{session_id}/heatmap"
+            de_map = color_results.get('de_map')
+            if de_map is not None:
+                publish_render('heatmap', lambda out: ColorUnitBackend.plot_heatmap(
+                    de_map['map'], "ΔE2000 Heatmap", out, vmax=de_map['p99']))
         except Exception as e:
             print(f"Error saving heatmap image: {e}")
 
         # 4. Lab Scatter
         if reg_stats:
             try:
-                p = img_prefix + "lab_scatter.png"
-                ColorUnitBackend.plot_lab_scatter(reg_stats, p)
-                image_urls['lab_scatter'] = f"/api/report_image/{session_id}/lab_scatter"
+                publish_render('lab_scatter', lambda out: ColorUnitBackend.plot_lab_scatter(reg_stats, out))
             except Exception as e:
                 print(f"Error saving lab scatter image: {e}")
 
         # 5. Lab Bars
         if reg_stats:
             try:
-                p = img_prefix + "lab_bars.png"
-                ColorUnitBackend.plot_lab_bars(reg_stats, p)
-                image_urls['lab_bars'] = f"/api/report_image/{session_id}/lab_bars"
+                publish_render('lab_bars', lambda out: ColorUnitBackend.plot_lab_bars(reg_stats, out))
             except Exception as e:
                 print(f"Error saving lab bars image: {e}")
 
@@ -1170,10 +1258,7 @@ def _save_visualization_images(session_id, ref_img_proc, sample_img_proc, color_
         # 6-8. Diff Maps (SSIM, Gradient, Phase)
         for key, cv_img in diff_images.items():
             try:
-                safe_key = key.lower().replace(' ', '_')
-                p = img_prefix + f"{safe_key}.png"
-                cv2.imwrite(p, cv_img)
-                image_urls[safe_key] = f"/api/report_image/{session_id}/{safe_key}"
+                publish_image(key.lower().replace(' ', '_'), cv_img)
             except Exception as e:
                 print(f"Error saving {key} diff image: {e}")
 
@@ -1182,12 +1267,8 @@ def _save_visualization_images(session_id, ref_img_proc, sample_img_proc, color_
         if grad_res:
             try:
                 contoured, filled = grad_res[0], grad_res[1]
-                p1 = img_prefix + "gradient_boundary.png"
-                cv2.imwrite(p1, cv2.cvtColor(contoured, cv2.COLOR_RGB2BGR))
-                image_urls['gradient_boundary'] = f"/api/report_image/{session_id}/gradient_boundary"
-                p2 = img_prefix + "gradient_filled.png"
-                cv2.imwrite(p2, cv2.cvtColor(filled, cv2.COLOR_RGB2BGR))
-                image_urls['gradient_filled'] = f"/api/report_image/{session_id}/gradient_filled"
+                publish_image('gradient_boundary', cv2.cvtColor(contoured, cv2.COLOR_RGB2BGR))
+                publish_image('gradient_filled', cv2.cvtColor(filled, cv2.COLOR_RGB2BGR))
             except Exception as e:
                 print(f"Error saving gradient boundary images: {e}")
 
@@ -1196,59 +1277,31 @@ def _save_visualization_images(session_id, ref_img_proc, sample_img_proc, color_
         if phase_res:
             try:
                 contoured, filled = phase_res[0], phase_res[1]
-                p1 = img_prefix + "phase_boundary.png"
-                cv2.imwrite(p1, cv2.cvtColor(contoured, cv2.COLOR_RGB2BGR))
-                image_urls['phase_boundary'] = f"/api/report_image/{session_id}/phase_boundary"
-                p2 = img_prefix + "phase_filled.png"
-                cv2.imwrite(p2, cv2.cvtColor(filled, cv2.COLOR_RGB2BGR))
-                image_urls['phase_filled'] = f"/api/report_image/{session_id}/phase_filled"
+                publish_image('phase_boundary', cv2.cvtColor(contoured, cv2.COLOR_RGB2BGR))
+                publish_image('phase_filled', cv2.cvtColor(filled, cv2.COLOR_RGB2BGR))
             except Exception as e:
                 print(f"Error saving phase boundary images: {e}")
 
-        # 13-14. Structural Difference
-        structural = pattern_results.get('structural_results')
-        if structural:
-            try:
-                raw_sub = structural.get('subplot_raw')
-                if raw_sub:
-                    p = img_prefix + "structural_subplot.png"
-                    with open(p, 'wb') as f:
-                        f.write(raw_sub)
-                    image_urls['structural_subplot'] = f"/api/report_image/{session_id}/structural_subplot"
-                raw_diff = structural.get('diff_raw')
-                if raw_diff:
-                    p = img_prefix + "structural_pure.png"
-                    with open(p, 'wb') as f:
-                        f.write(raw_diff)
-                    image_urls['structural_pure'] = f"/api/report_image/{session_id}/structural_pure"
-            except Exception as e:
-                print(f"Error saving structural images: {e}")
-
-        # 15. Fourier Spectrum
-        fourier = pattern_results.get('fourier_results')
-        if fourier:
-            try:
-                spec_path = fourier.get('spectrum_img_path')
-                if spec_path and os.path.exists(spec_path):
-                    import shutil
-                    p = img_prefix + "fourier_spectrum.png"
-                    shutil.copy2(spec_path, p)
-                    image_urls['fourier_spectrum'] = f"/api/report_image/{session_id}/fourier_spectrum"
-            except Exception as e:
-                print(f"Error saving fourier spectrum: {e}")
-
-        # 16. GLCM Heatmap
-        glcm = pattern_results.get('glcm_results')
-        if glcm:
+        # Figures rendered by the pattern graph: published straight from the store
+        phase_local = pattern_results.get('phase_local') or {}
+        repeat = pattern_results.get('repeat_results') or {}
+        fourier = pattern_results.get('fourier_results') or {}
+        glcm = pattern_results.get('glcm_results') or {}
+        for name in (phase_local.get('heatmap_img'),             # local phase displacement map
+                     repeat.get('map_img'),                      # per-repeat scores
+                     'structural_subplot', 'structural_pure',    # 13-14. Structural Difference
+                     fourier.get('spectrum_img'),                # 15. Fourier Spectrum
+                     glcm.get('heatmap_img'),                    # 16. GLCM Heatmap
+                     glcm.get('maps_img')):
             try:
-                import shutil
-                hm_path = glcm.get('heatmap_img_path')
-                if hm_path and os.path.exists(hm_path):
-                    p = img_prefix + "glcm_heatmap.png"
-                    shutil.copy2(hm_path, p)
-                    image_urls['glcm_heatmap'] = f"/api/report_image/{session_id}/glcm_heatmap"
+                if not name:
+                    continue
+                if name in artifacts:
+                    publish(name)
+                else:
+                    print(f"Figure {name} is missing from the session's artifact store; not published")
             except Exception as e:
-                print(f"Error saving GLCM heatmap: {e}")
+                print(f"Error saving {name} image: {e}")
 
 
     except Exception as e:
@@ -1259,7 +1312,7 @@ def _save_visualization_images(session_id, ref_img_proc, sample_img_proc, color_
     return image_urls
 
 
-def _save_single_image_visualizations(session_id, sample_img_proc, settings):
+def _save_single_image_visualizations(session_id, sample_img_proc, settings, ctx=None):
     """Generate and save visualization images for single image mode."""
     import cv2
     import numpy as np
@@ -1275,7 +1328,7 @@ def _save_single_image_visualizations(session_id, sample_img_proc, settings):
     # 1. RGB Histogram (single)
     try:
         p = img_prefix + "histogram_single.png"
-        plot_rgb_histogram(sam_bgr, p, title='Sample RGB Histogram')
+        plot_rgb_histogram(ctx if ctx is not None else sam_bgr, p, title='Sample RGB Histogram')
         image_urls['histogram_single'] = f"/api/report_image/{session_id}/histogram_single"
     except Exception as e:
         print(f"Error saving single histogram: {e}")
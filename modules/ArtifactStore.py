@@ -0,0 +1,139 @@
+# modules/ArtifactStore.py
+import io, os, time, threading
+
+# =================================================================================================
+# ARTIFACT STORE
+# =================================================================================================
+# Per-session, in-memory store of rendered figures. Each figure is rendered once, keyed by
+# (artifact name, params) where params are whatever changes its pixels (titles, labels,
+# language); the PDF builders embed it from here and the web endpoint serves it from here.
+# Memory is bounded by ARTIFACT_MAX_BYTES over all sessions; evicted sessions fall back
+# to the files app.py writes next to the PDFs.
+
+ARTIFACT_TTL_SECONDS = 3600        # idle sessions are dropped from memory after this
+ARTIFACT_MAX_BYTES = 256 << 20     # all sessions together; least recently used sessions go first
+
+def artifact_key(name, params=None):
+    """Hashable (name, params) key; params is a dict of hashable values."""
+    return (name, tuple(sorted((params or {}).items())))
+
+class ArtifactStore:
+    """
+    Encoded figure bytes for one analysis session. render() runs a figure function
+    once per (name, params), concurrent callers of the same key wait for the first.
+    The last rendered variant of a name is what get(name) returns.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.nbytes = 0
+        self.touched = time.time()
+
+    def render(self, name, fn, params=None):
+        """
+        Bytes of artifact (name, params), calling fn(out) with a BytesIO to render
+        it on the first request. fn writes the encoded image to out the same way
+        it would write to a file path (savefig / save_figure).
+        """
+        key = artifact_key(name, params)
+        with self._lock:
+            self.touched = time.time()
+            if key in self._data:
+                self._latest[name] = key
+                return self._data[key]
+            lock = self._key_locks.setdefault(key, threading.Lock())
+        with lock:
+            with self._lock:
+                if key in self._data:
+                    self._latest[name] = key
+                    return self._data[key]
+            out = io.BytesIO()
+            try:
+                fn(out)
+            except Exception:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+                raise
+            return self.put(name, out.getvalue(), params)
+
+    def put(self, name, data, params=None):
+        """Store already-encoded bytes (e.g. cv2.imencode output) under (name, params)."""
+        key = artifact_key(name, params)
+        with self._lock:
+            self.touched = time.time()
+            self.nbytes += len(data) - len(self._data.get(key, b''))
+            self._data[key] = data
+            self._latest[name] = key
+            self._key_locks.pop(key, None)
+        _trim_sessions(keep=self)
+        return data
+
+    def get(self, name, params=None):
+        """Bytes of (name, params), or of the latest variant of name when params is None; None if absent."""
+        with self._lock:
+            self.touched = time.time()
+            key = artifact_key(name, params) if params is not None else self._latest.get(name)
+            return self._data.get(key)
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._latest
+
+    def names(self):
+        with self._lock:
+            return list(self._latest)
+
+    def stream(self, name, params=None):
+        """BytesIO over the artifact (for RLImage / send_file), or None if absent."""
+        data = self.get(name, params)
+        return io.BytesIO(data) if data is not None else None
+
+    def save(self, name, path, params=None):
+        """Write the artifact's bytes to path (no re-render); returns path or None if absent."""
+        data = self.get(name, params)
+        if data is None:
+            return None
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+# Session registry ------------------------------------------------------------------------------
+
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+def session_store(session_id, create=True):
+    """The ArtifactStore of a session (created on first use unless create=False)."""
+    with _SESSIONS_LOCK:
+        store = _SESSIONS.get(session_id)
+        if store is None and create:
+            store = _SESSIONS[session_id] = ArtifactStore()
+        return store
+
+def _trim_sessions(keep=None, max_bytes=ARTIFACT_MAX_BYTES):
+    """
+    Drop least recently used stores (never `keep`) until all sessions together hold
+    at most max_bytes. Their figures stay servable from the files written next to the PDFs.
+    """
+    with _SESSIONS_LOCK:
+        total = sum(store.nbytes for store in _SESSIONS.values())
+        if total <= max_bytes:
+            return
+        for sid, store in sorted(_SESSIONS.items(), key=lambda item: item[1].touched):
+            if total <= max_bytes:
+                break
+            if store is not keep:
+                total -= store.nbytes
+                del _SESSIONS[sid]
+
+def expire_sessions(max_age=ARTIFACT_TTL_SECONDS):
+    """Drop stores idle for more than max_age seconds; returns how many were dropped."""
+    cutoff = time.time() - max_age
+    with _SESSIONS_LOCK:
+        stale = [sid for sid, store in _SESSIONS.items() if store.touched < cutoff]
+        for sid in stale:
+            del _SESSIONS[sid]
+    return len(stale)
@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-import io, os, math, random
+import io, os, math
 from pathlib import Path
 import numpy as np
 import cv2
@@ -9,6 +9,8 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 from .ReportTranslations import get_translator, translate_status
+from .RasterFigures import render_figure, heatmap_panel, save_figure
+from .ArtifactStore import ArtifactStore
 
 # Illuminant White Points (CIE 1931 2 degree standard observer) - Approximated
 # Y is normalized to 1.0
@@ -22,59 +24,54 @@ WHITE_POINTS = {
     'TL84': np.array([1.0386, 1.0000, 0.6560]),   # Tri-band Fluorescent (Approx)
 }
 
+# Bradford cone response matrix
+BRADFORD_M = np.array([
+    [0.8951000, 0.2664000, -0.1614000],
+    [-0.7502000, 1.7135000, 0.0367000],
+    [0.0389000, -0.0685000, 1.0296000]
+])
+BRADFORD_M_INV = np.linalg.inv(BRADFORD_M)
+
+_ADAPTATION_MATRICES = {}
+
+def get_adaptation_matrix(target_illuminant):
+    """
+    Bradford D65 -> target illuminant matrix. Built on first use for each entry
+    of WHITE_POINTS and memoized; returns None for unknown illuminants.
+    """
+    M_total = _ADAPTATION_MATRICES.get(target_illuminant)
+    if M_total is None and target_illuminant in WHITE_POINTS:
+        # Source and destination cone responses
+        rho_s, gam_s, bet_s = BRADFORD_M @ WHITE_POINTS['D65']
+        rho_d, gam_d, bet_d = BRADFORD_M @ WHITE_POINTS[target_illuminant]
+        M_scale = np.diag([rho_d/rho_s, gam_d/gam_s, bet_d/bet_s])
+        # Combined transform: M_total = M_inv * M_scale * M
+        M_total = BRADFORD_M_INV @ M_scale @ BRADFORD_M
+        _ADAPTATION_MATRICES[target_illuminant] = M_total
+    return M_total
+
 def adapt_to_illuminant(xyz_d65, target_illuminant):
-    """Chromatic adaptation from D65 to the target illuminant using the Bradford transform."""
-    if target_illuminant not in WHITE_POINTS:
+    """
+    Chromatic adaptation from D65 to the target illuminant using the Bradford transform.
+    Accepts a single XYZ triplet or any (..., 3) array.
+    """
+    M_total = get_adaptation_matrix(target_illuminant)
+    if M_total is None:
         return xyz_d65
-        
-    src_white = WHITE_POINTS['D65']
-    dst_white = WHITE_POINTS[target_illuminant]
-    
-    # Bradford chromatic adaptation matrix
-    M_A = np.array([
-        [0.8951000, 0.2664000, -0.1614000],
-        [-0.7502000, 1.7135000, 0.0367000],
-        [0.0389000, -0.0685000, 1.0296000]
-    ])
-    M_A_inv = np.linalg.inv(M_A)
-    
-    # Calculate source and dest cone responses
-    rho_s, gam_s, bet_s = np.dot(M_A, src_white)
-    rho_d, gam_d, bet_d = np.dot(M_A, dst_white)
-    
-    # Diagonal scaling matrix
-    M_scale = np.array([
-        [rho_d/rho_s, 0, 0],
-        [0, gam_d/gam_s, 0],
-        [0, 0, bet_d/bet_s]
-    ])
-    
-    # Combined transform: M_total = M_inv * M_scale * M
-    M_total = np.dot(M_A_inv, np.dot(M_scale, M_A))
-    
-    # Apply
-    xyz_new = np.dot(M_total, xyz_d65)
-    return xyz_new
+    return np.asarray(xyz_d65, dtype=np.float64) @ M_total.T
+
+def _lab_f(t):
+    return np.where(t > 0.008856, np.cbrt(t), 7.787 * t + 16 / 116)
 
 def xyz_to_lab(xyz, white_point):
     """
     Convert XYZ to Lab given a specific white point.
+    Accepts a single XYZ triplet or any (..., 3) array.
     """
-    Xn, Yn, Zn = white_point
-    X, Y, Z = xyz
-    
-    xf = X / Xn
-    yf = Y / Yn
-    zf = Z / Zn
-    
-    def f(t):
-        return t**(1/3) if t > 0.008856 else 7.787*t + 16/116
-        
-    L = 116 * f(yf) - 16
-    a = 500 * (f(xf) - f(yf))
-    b = 200 * (f(yf) - f(zf))
-    
-    return np.array([L, a, b])
+    xyz = np.asarray(xyz, dtype=np.float64)
+    f = _lab_f(xyz / np.asarray(white_point, dtype=np.float64))
+    fx, fy, fz = f[..., 0], f[..., 1], f[..., 2]
+    return np.stack([116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)], axis=-1)
 
 
 from reportlab.lib.pagesizes import A4
@@ -141,6 +138,23 @@ DEFAULT_CONFIG = {
     'csi_thresholds': {'good': 90.0, 'warn': 70.0}
 }
 
+# Dense grid sampling: default pitch in sampling radii and cap on the number of cells
+GRID_PITCH_RADII = 2.0
+GRID_MAX_POINTS = 5000
+
+# Pixels per band for the histogram pass and L* histogram resolution
+HIST_BAND_PIXELS = 1 << 20
+LIGHTNESS_HIST_BINS = 100
+
+# Longest side of the image copies the PDF draws sampling overlays on
+OVERLAY_MAX_SIDE = 1600
+
+# Per-pixel ΔE map: pixels per processing band, preview size and histogram resolution
+DE_MAP_TILE_PIXELS = 512 * 512
+DE_MAP_PREVIEW_MAX = 1024
+DE_MAP_HIST_RES = 100   # bins per ΔE unit
+DE_MAP_HIST_MAX = 200.0
+
 PRIMARY_LOGO = r"logo_square_with_name_1024x1024.png"
 FALLBACK_LOGOS = [
     r"logo_square_with_name_1024x1024.png",
@@ -357,119 +371,516 @@ def rgb_to_cmyk(rgb01):
     y = (1 - b - k) / (1 - k)
     return (c, m, y, k)
 
+# Linear sRGB -> XYZ (D65)
+SRGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                        [0.2126729, 0.7151522, 0.0721750],
+                        [0.0193339, 0.1191920, 0.9503041]])
+
+def srgb_linearize(rgb01):
+    rgb = np.asarray(rgb01, dtype=np.float64)
+    return np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+
+# Linearized value of every 8-bit sRGB code, so full frames never pay the power per pixel
+SRGB_LINEAR_LUT = srgb_linearize(np.arange(256) / 255.0).astype(np.float32)
+
+# XYZ normalized by the D65 white, applied straight to linear BGR (channel order folded in)
+_BGR_TO_XYZN = (SRGB_TO_XYZ[:, ::-1] / WHITE_POINTS['D65'][:, None]).astype(np.float32)
+
 def srgb_to_xyz(rgb01):
-    rgb = np.array(rgb01)
-    mask = rgb > 0.04045
-    rgb[mask] = ((rgb[mask] + 0.055) / 1.055) ** 2.4
-    rgb[~mask] = rgb[~mask] / 12.92
-    M = np.array([[0.4124564, 0.3575761, 0.1804375],
-                  [0.2126729, 0.7151522, 0.0721750],
-                  [0.0193339, 0.1191920, 0.9503041]])
-    xyz = rgb @ M.T
+    xyz = srgb_linearize(rgb01) @ SRGB_TO_XYZ.T
     return xyz * 100.0 
 
-def deltaE76(lab1, lab2):
-    return float(np.sqrt(np.sum((lab1-lab2)**2)))
+def _xyzn_to_lab(t):
+    """White-normalized XYZ (..., 3) float32 -> new Lab array (t is left unchanged)."""
+    f = np.cbrt(t)
+    lin = t <= 0.008856
+    f[lin] = 7.787 * t[lin] + 16 / 116
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
 
-def deltaE94(lab1, lab2, kL=1, kC=1, kH=1, K1=0.045, K2=0.015):
-    L1, a1, b1 = lab1
-    L2, a2, b2 = lab2
+def bgr_to_lab(img_bgr):
+    """
+    uint8 BGR (..., 3) -> float32 CIE Lab (D65): LUT linearization, one fused
+    matrix multiply and a vectorized cube root.
+    """
+    lin = SRGB_LINEAR_LUT[img_bgr]
+    return _xyzn_to_lab(lin @ _BGR_TO_XYZN.T)
+
+def rgb01_to_lab(rgb01):
+    """Float sRGB (..., 3) in 0-1 (e.g. region means) -> float32 CIE Lab (D65)."""
+    lin = srgb_linearize(rgb01)[..., ::-1].astype(np.float32)
+    return _xyzn_to_lab(lin @ _BGR_TO_XYZN.T)
+
+def _delta_e76(lab1, lab2):
+    return np.sqrt(np.sum((lab1 - lab2) ** 2, axis=-1))
+
+def _delta_e94(lab1, lab2, kL=1, kC=1, kH=1, K1=0.045, K2=0.015):
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
     dL = L1 - L2
-    C1 = math.sqrt(a1**2 + b1**2)
-    C2 = math.sqrt(a2**2 + b2**2)
+    C1 = np.sqrt(a1**2 + b1**2)
+    C2 = np.sqrt(a2**2 + b2**2)
     dC = C1 - C2
-    da = a1 - a2
-    db = b1 - b2
-    dH2 = max(0.0, da**2 + db**2 - dC**2)
+    dH2 = np.maximum(0.0, (a1 - a2)**2 + (b1 - b2)**2 - dC**2)
     SL = 1; SC = 1 + K1*C1; SH = 1 + K2*C1
-    return float(math.sqrt((dL/(kL*SL))**2 + (dC/(kC*SC))**2 + (math.sqrt(dH2)/(kH*SH))**2))
+    return np.sqrt((dL/(kL*SL))**2 + (dC/(kC*SC))**2 + (np.sqrt(dH2)/(kH*SH))**2)
 
-def deltaE2000(lab1, lab2, kL=1, kC=1, kH=1):
-    L1, a1, b1 = lab1
-    L2, a2, b2 = lab2
+def _delta_e2000(lab1, lab2, kL=1, kC=1, kH=1):
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
     avgLp = (L1 + L2) / 2.0
-    C1 = math.sqrt(a1*a1 + b1*b1)
-    C2 = math.sqrt(a2*a2 + b2*b2)
+    C1 = np.sqrt(a1*a1 + b1*b1)
+    C2 = np.sqrt(a2*a2 + b2*b2)
     avgC = (C1 + C2) / 2.0
-    G = 0.5 * (1 - math.sqrt((avgC**7) / (avgC**7 + 25**7)))
+    G = 0.5 * (1 - np.sqrt((avgC**7) / (avgC**7 + 25.0**7)))
     a1p = (1 + G) * a1
     a2p = (1 + G) * a2
-    C1p = math.sqrt(a1p*a1p + b1*b1)
-    C2p = math.sqrt(a2p*a2p + b2*b2)
+    C1p = np.sqrt(a1p*a1p + b1*b1)
+    C2p = np.sqrt(a2p*a2p + b2*b2)
     avgCp = (C1p + C2p) / 2.0
-    h1p = math.degrees(math.atan2(b1, a1p)) % 360
-    h2p = math.degrees(math.atan2(b2, a2p)) % 360
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
     dLp = L2 - L1
     dCp = C2p - C1p
+    no_hue = (C1p * C2p) == 0
     dhp = h2p - h1p
-    if C1p * C2p == 0: dhp = 0
-    elif abs(dhp) > 180:
-        if h2p <= h1p: dhp += 360
-        else: dhp -= 360
-    dHp = 2 * math.sqrt(C1p * C2p) * math.sin(math.radians(dhp) / 2.0)
-    if C1p * C2p == 0: avgHp = h1p + h2p
-    elif abs(h1p - h2p) > 180: avgHp = (h1p + h2p + 360) / 2.0
-    else: avgHp = (h1p + h2p) / 2.0
-    T = 1 - 0.17 * math.cos(math.radians(avgHp - 30)) + \
-        0.24 * math.cos(math.radians(2 * avgHp)) + \
-        0.32 * math.cos(math.radians(3 * avgHp + 6)) - \
-        0.20 * math.cos(math.radians(4 * avgHp - 63))
-    dRo = 30 * math.exp(-((avgHp - 275) / 25) ** 2)
-    RC = 2 * math.sqrt((avgCp ** 7) / (avgCp ** 7 + 25 ** 7))
-    SL = 1 + (0.015 * (avgLp - 50) ** 2) / math.sqrt(20 + (avgLp - 50) ** 2)
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    dhp = np.where(no_hue, 0.0, dhp)
+    dHp = 2 * np.sqrt(C1p * C2p) * np.sin(np.radians(dhp) / 2.0)
+    sumHp = h1p + h2p
+    avgHp = np.where(no_hue, sumHp, np.where(np.abs(h1p - h2p) > 180, (sumHp + 360) / 2.0, sumHp / 2.0))
+    T = 1 - 0.17 * np.cos(np.radians(avgHp - 30)) + \
+        0.24 * np.cos(np.radians(2 * avgHp)) + \
+        0.32 * np.cos(np.radians(3 * avgHp + 6)) - \
+        0.20 * np.cos(np.radians(4 * avgHp - 63))
+    dRo = 30 * np.exp(-((avgHp - 275) / 25) ** 2)
+    RC = 2 * np.sqrt((avgCp ** 7) / (avgCp ** 7 + 25.0 ** 7))
+    SL = 1 + (0.015 * (avgLp - 50) ** 2) / np.sqrt(20 + (avgLp - 50) ** 2)
     SC = 1 + 0.045 * avgCp
     SH = 1 + 0.015 * avgCp * T
-    RT = -math.sin(math.radians(2 * dRo)) * RC
-    dE = math.sqrt((dLp / (kL * SL)) ** 2 + (dCp / (kC * SC)) ** 2 + (dHp / (kH * SH)) ** 2 + RT * (dCp / (kC * SC)) * (dHp / (kH * SH)))
-    return float(dE)
+    RT = -np.sin(np.radians(2 * dRo)) * RC
+    tL = dLp / (kL * SL)
+    tC = dCp / (kC * SC)
+    tH = dHp / (kH * SH)
+    return np.sqrt(tL ** 2 + tC ** 2 + tH ** 2 + RT * tC * tH)
 
-def region_stats(img, cx, cy, r):
-    h, w = img.shape[:2]
-    
-    # Handle Alpha Channel if present
-    if img.shape[2] == 4:
-        img_bgr = img[:, :, :3]
-        mask_alpha = img[:, :, 3]
-    else:
-        img_bgr = img
-        mask_alpha = np.full((h, w), 255, dtype=np.uint8)
+def delta_e_batch(lab1, lab2, pairwise=False):
+    """
+    Vectorized ΔE76 / ΔE94 / ΔE2000 for arrays of Lab colors.
+    lab1, lab2: (N,3) arrays compared row by row. With pairwise=True every row
+    of lab1 (N,3) is compared against every row of lab2 (M,3), giving (N,M) results.
+    ΔE94 uses lab1 as the reference, as in deltaE94.
+    Returns dict with 'de76', 'de94' and 'de00' arrays.
+    """
+    lab1 = np.asarray(lab1, dtype=np.float64).reshape(-1, 3)
+    lab2 = np.asarray(lab2, dtype=np.float64).reshape(-1, 3)
+    if pairwise:
+        lab1 = lab1[:, None, :]
+        lab2 = lab2[None, :, :]
+    return {
+        "de76": _delta_e76(lab1, lab2),
+        "de94": _delta_e94(lab1, lab2),
+        "de00": _delta_e2000(lab1, lab2),
+    }
 
-    cx = int(np.clip(cx, r, w-1-r))
-    cy = int(np.clip(cy, r, h-1-r))
-    y, x = np.ogrid[:h, :w]
-    
-    # Circle mask
-    m = (x - cx)**2 + (y - cy)**2 <= r*r
-    
-    # Extract pixels in circle
-    bgr_in_circle = img_bgr[m]
-    alpha_in_circle = mask_alpha[m]
-    
-    # Filter for VALID pixels (Alpha > 0)
-    # This prevents black background from dragging down the average
-    valid_mask = alpha_in_circle > 0
-    bgr = bgr_in_circle[valid_mask]
+def deltaE76(lab1, lab2):
+    return float(_delta_e76(np.asarray(lab1, dtype=np.float64), np.asarray(lab2, dtype=np.float64)))
+
+def deltaE94(lab1, lab2, kL=1, kC=1, kH=1, K1=0.045, K2=0.015):
+    return float(_delta_e94(np.asarray(lab1, dtype=np.float64), np.asarray(lab2, dtype=np.float64), kL, kC, kH, K1, K2))
+
+def deltaE2000(lab1, lab2, kL=1, kC=1, kH=1):
+    return float(_delta_e2000(np.asarray(lab1, dtype=np.float64), np.asarray(lab2, dtype=np.float64), kL, kC, kH))
+
+def illuminant_lab_tensor(xyz_d65, illuminants=None):
+    """
+    Adapt D65 XYZ (N, 3), 0-100 scale as returned by srgb_to_xyz, to several
+    illuminants at once. Returns (names, Lab tensor of shape (I, N, 3)).
+    """
+    names = list(illuminants or WHITE_POINTS.keys())
+    M = np.stack([get_adaptation_matrix(k) for k in names])
+    white = np.stack([WHITE_POINTS[k] for k in names])
+    # White points are Y = 1, so bring XYZ to the same scale before adapting
+    xyz = np.asarray(xyz_d65, dtype=np.float64).reshape(-1, 3) / 100.0
+    adapted = np.einsum('ijk,nk->inj', M, xyz)
+    return names, xyz_to_lab(adapted, white[:, None, :])
+
+def illuminant_analysis(ref_xyz_d65, sam_xyz_d65, primary_ill='D65', primary_mean_de=None, primary_csi=None):
+    """
+    Metamerism check of ref vs sample under every illuminant in WHITE_POINTS,
+    in one vectorized pass. The primary illuminant reports the canonical values
+    of the main analysis when given.
+    Returns {illuminant: {'mean_de00', 'csi', 'status'}}.
+    """
+    names, ref_lab = illuminant_lab_tensor(ref_xyz_d65)
+    _, sam_lab = illuminant_lab_tensor(sam_xyz_d65)
+    de00 = delta_e_batch(ref_lab, sam_lab)['de00'].reshape(len(names), -1)
+    means = de00.mean(axis=1) if de00.shape[1] else np.zeros(len(names))
     
-    # Safety: if no valid pixels (e.g. circle in void), return black/safe defaults
-    if len(bgr) == 0: 
-        bgr = np.array([[0,0,0]], dtype=np.uint8)
-        
-    rgb = bgr[:, ::-1].astype(np.float32)
-    rgb01 = (rgb/255.0).mean(axis=0) # Mean of VALID pixels only
+    results = {}
+    for name, mean_de in zip(names, means):
+        if name == primary_ill and primary_mean_de is not None:
+            mean_de, csi = float(primary_mean_de), float(primary_csi)
+        else:
+            mean_de = float(mean_de)
+            csi = max(0.0, min(100.0, 100.0 - (mean_de * 10.0)))
+            
+        if csi >= 90.0: status = "PASS"
+        elif csi >= 70.0: status = "CONDITIONAL"
+        else: status = "FAIL"
+        results[name] = {"mean_de00": mean_de, "csi": csi, "status": status}
+    return results
+
+def delta_e_map(ref_img, sample_img, thresh_pass=2.0, thresh_cond=5.0,
+                tile_pixels=DE_MAP_TILE_PIXELS, preview_max=DE_MAP_PREVIEW_MAX):
+    """
+    Per-pixel ΔE2000 between two same-sized images (arrays or ImageContexts),
+    computed band by band so peak memory is bounded by tile_pixels instead of the
+    image size. Only a downsampled preview of the map is kept (longest side <=
+    preview_max). Pixels with zero alpha in either image are excluded from the statistics.
+    """
+    ref_ctx, sam_ctx = as_image_context(ref_img), as_image_context(sample_img)
+    h, w = ref_ctx.h, ref_ctx.w
+    step = max(1, int(math.ceil(max(h, w) / float(preview_max))))
+    band = max(step, (tile_pixels // max(w, 1)) // step * step)
+    prev_w = max(1, int(math.ceil(w / float(step))))
+    prev_h = max(1, int(math.ceil(h / float(step))))
+    preview = np.zeros((prev_h, prev_w), dtype=np.float32)
+
+    n_bins = int(DE_MAP_HIST_MAX * DE_MAP_HIST_RES) + 1
+    hist = np.zeros(n_bins, dtype=np.int64)
+    total, count, over_pass, over_cond, de_max = 0.0, 0, 0, 0, 0.0
+
+    for y0 in range(0, h, band):
+        y1 = min(h, y0 + band)
+        de = _delta_e2000(ref_ctx.lab_rows(y0, y1), sam_ctx.lab_rows(y0, y1))
+
+        valid = None
+        if ref_ctx.valid is not None:
+            valid = ref_ctx.valid[y0:y1]
+        if sam_ctx.valid is not None:
+            valid = sam_ctx.valid[y0:y1] if valid is None else (valid & sam_ctx.valid[y0:y1])
+        if valid is not None:
+            de[~valid] = 0
+            vals = de[valid]
+        else:
+            vals = de.ravel()
+
+        if vals.size:
+            total += float(vals.sum(dtype=np.float64))
+            count += vals.size
+            over_pass += int(np.count_nonzero(vals >= thresh_pass))
+            over_cond += int(np.count_nonzero(vals > thresh_cond))
+            de_max = max(de_max, float(vals.max()))
+            bins = np.minimum((vals * DE_MAP_HIST_RES).astype(np.int64), n_bins - 1)
+            hist += np.bincount(bins, minlength=n_bins)
+
+        rows = int(math.ceil((y1 - y0) / float(step)))
+        py0 = y0 // step
+        preview[py0:py0 + rows] = cv2.resize(de, (prev_w, rows), interpolation=cv2.INTER_AREA)
+
+    def percentile(q):
+        if count == 0: return 0.0
+        idx = int(np.searchsorted(np.cumsum(hist), q / 100.0 * count))
+        return min(de_max, (idx + 0.5) / DE_MAP_HIST_RES)
+
+    return {
+        "map": preview,
+        "scale": step,
+        "valid_pixels": count,
+        "mean": total / count if count else 0.0,
+        "max": de_max,
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "pct_over_pass": 100.0 * over_pass / count if count else 0.0,
+        "pct_over_conditional": 100.0 * over_cond / count if count else 0.0,
+        "thresholds": {"pass": float(thresh_pass), "conditional": float(thresh_cond)},
+    }
+
+SAMPLER_DIRECT_QUERIES = 64   # up to this many regions per query are summed directly, without prefix tables
+
+class RegionSampler:
+    """
+    Region statistics for one image from row-wise prefix sums of each BGR channel
+    and its square, weighted by alpha validity (alpha == 0 pixels are excluded).
+    The tables (~28 B/px) are only built for dense queries (grid mode): a few
+    regions (the default manual/random points) are summed straight from their
+    own pixels. Once built, a circle or box query only touches its own rows, so
+    it costs O(r) instead of a full-frame mask.
+    """
+
+    def __init__(self, img):
+        h, w = img.shape[:2]
+        self.h, self.w = h, w
+        self._bgr = img[:, :, :3]
+        self._valid = (img[:, :, 3] > 0) if img.shape[2] == 4 else None
+        self._sum = self._sq = self._count = None
+
+    def _build_tables(self):
+        h, w = self.h, self.w
+        bgr, valid = self._bgr, self._valid
+        # Integer tables keep sums exact; uint32 holds a full row of 255^2 up to ~66k px
+        dt = np.uint32 if w * 255 * 255 < 2**32 else np.uint64
+        # P[y, x] = sum(row_y[:x]), with a leading zero column
+        self._sum = np.zeros((h, w + 1, 3), dtype=dt)
+        self._sq = np.zeros((h, w + 1, 3), dtype=dt)
+        for c in range(3):
+            ch = bgr[:, :, c].astype(dt)
+            if valid is not None:
+                ch *= valid
+            np.cumsum(ch, axis=1, out=self._sum[:, 1:, c])
+            np.cumsum(ch * ch, axis=1, out=self._sq[:, 1:, c])
+        if valid is not None:
+            self._count = np.zeros((h, w + 1), dtype=dt)
+            np.cumsum(valid, axis=1, out=self._count[:, 1:])
+
+    def _direct_sums(self, ys, x0, x1):
+        """Per-region sums straight from the pixels of each region's bounding box (few regions)."""
+        N = ys.shape[0]
+        s = np.zeros((N, 3), dtype=np.float64)
+        sq = np.zeros((N, 3), dtype=np.float64)
+        n = np.zeros(N, dtype=np.float64)
+        for i in range(N):
+            xa, xb = int(x0[i].min()), int(x1[i].max())
+            if xb <= xa:
+                continue
+            inside = (np.arange(xa, xb) >= x0[i][:, None]) & (np.arange(xa, xb) < x1[i][:, None])
+            if self._valid is not None:
+                inside &= self._valid[ys[i], xa:xb]
+            px = self._bgr[ys[i], xa:xb][inside].astype(np.float64)
+            s[i] = px.sum(axis=0)
+            sq[i] = (px * px).sum(axis=0)
+            n[i] = px.shape[0]
+        return s, sq, n
+
+    def _span_stats(self, ys, x0, x1):
+        """Aggregate row spans [x0, x1) on rows ys, all shaped (N, K); empty spans have x1 == x0."""
+        ys = np.clip(ys, 0, self.h - 1)
+        if self._sum is None and ys.shape[0] <= SAMPLER_DIRECT_QUERIES:
+            s, sq, n = self._direct_sums(ys, x0, x1)
+        else:
+            if self._sum is None:
+                self._build_tables()
+            s = (self._sum[ys, x1] - self._sum[ys, x0]).sum(axis=1, dtype=np.float64)
+            sq = (self._sq[ys, x1] - self._sq[ys, x0]).sum(axis=1, dtype=np.float64)
+            if self._count is not None:
+                n = (self._count[ys, x1] - self._count[ys, x0]).sum(axis=1, dtype=np.float64)
+            else:
+                n = (x1 - x0).sum(axis=1).astype(np.float64)
+
+        safe_n = np.maximum(n, 1.0)[:, None]
+        mean = s / safe_n
+        std = np.sqrt(np.maximum(sq / safe_n - mean * mean, 0.0))
+        mean[n == 0] = 0.0
+        std[n == 0] = 0.0
+        return {"count": n.astype(np.int64), "mean": mean, "std": std}
+
+    def circles(self, cx, cy, r):
+        """
+        Batch circle query: pixels with (x-cx)^2 + (y-cy)^2 <= r^2 around each centre.
+        Returns arrays count (N,), mean (N, 3) and std (N, 3), BGR order, 0-255 scale.
+        """
+        cx = np.atleast_1d(np.asarray(cx, dtype=np.int64))
+        cy = np.atleast_1d(np.asarray(cy, dtype=np.int64))
+        r = int(r)
+        dy = np.arange(-r, r + 1)
+        hw = np.floor(np.sqrt(r * r - dy * dy)).astype(np.int64)
+
+        ys = cy[:, None] + dy[None, :]
+        x0 = np.clip(cx[:, None] - hw[None, :], 0, self.w)
+        x1 = np.clip(cx[:, None] + hw[None, :] + 1, 0, self.w)
+        x1 = np.where((ys >= 0) & (ys < self.h), x1, x0)
+        return self._span_stats(ys, x0, x1)
+
+    def boxes(self, x0, y0, x1, y1):
+        """
+        Batch box query over [x0, x1) x [y0, y1) per box (clipped to the image).
+        Returns arrays like circles().
+        """
+        x0 = np.clip(np.atleast_1d(np.asarray(x0, dtype=np.int64)), 0, self.w)
+        x1 = np.clip(np.atleast_1d(np.asarray(x1, dtype=np.int64)), 0, self.w)
+        y0 = np.clip(np.atleast_1d(np.asarray(y0, dtype=np.int64)), 0, self.h)
+        y1 = np.clip(np.atleast_1d(np.asarray(y1, dtype=np.int64)), 0, self.h)
+        x1 = np.maximum(x1, x0)
+
+        k = max(1, int((y1 - y0).max(initial=0)))
+        ys = y0[:, None] + np.arange(k)[None, :]
+        xs0 = np.broadcast_to(x0[:, None], ys.shape)
+        xs1 = np.where(ys < y1[:, None], x1[:, None], x0[:, None])
+        return self._span_stats(ys, xs0, xs1)
+
+def channel_histograms(img, valid=None):
+    """
+    (3, 256) B, G, R counts of an image; valid is an optional boolean mask of
+    pixels to count. cv2.calcHist walks the frame without widening it to an
+    index array, which is several times faster than np.bincount here.
+    """
+    mask = None if valid is None else valid.view(np.uint8)
+    return np.stack([cv2.calcHist([img], [i], mask, [256], [0, 256]).ravel() for i in range(3)]).astype(np.int64)
+
+def lightness_histogram(img, valid=None, bins=LIGHTNESS_HIST_BINS, band_pixels=HIST_BAND_PIXELS):
+    """L* histogram over [0, 100] with `bins` bins, converting to Lab band by band."""
+    h, w = img.shape[:2]
+    counts = np.zeros(bins, dtype=np.int64)
+    band = max(1, band_pixels // max(w, 1))
+    for y0 in range(0, h, band):
+        L = bgr_to_lab(img[y0:y0 + band, :, :3])[..., 0]
+        if valid is not None:
+            L = L[valid[y0:y0 + band]]
+        idx = np.clip((L * (bins / 100.0)).astype(np.int64), 0, bins - 1)
+        counts += np.bincount(idx.ravel(), minlength=bins)
+    return counts
+
+def histograms_json(img):
+    """Histograms of an image or ImageContext as plain lists for client-side rendering."""
+    ctx = as_image_context(img)
+    hists = ctx.histograms()
+    return {
+        'b': hists[0].tolist(), 'g': hists[1].tolist(), 'r': hists[2].tolist(),
+        'lightness': ctx.lightness_histogram().tolist(),
+        'valid_pixels': int(hists[0].sum()),
+    }
+
+def _histograms_of(src):
+    """Accepts precomputed (3, 256) histograms, an ImageContext or an image."""
+    if isinstance(src, np.ndarray) and src.shape == (3, 256):
+        return src
+    return as_image_context(src).histograms()
+
+class ImageContext:
+    """
+    Per-request cache for one image. Alpha validity, float Lab, a downscaled
+    pyramid, channel histograms and the RegionSampler are computed on first use
+    and shared by every color consumer (ΔE map, region stats, histograms, overlays).
+    """
+
+    def __init__(self, img):
+        self.img = img
+        self.h, self.w = img.shape[:2]
+        self._cache = {}
+
+    def _memo(self, key, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def release(self, key):
+        """Drop a cached entry (e.g. 'sampler') once no later consumer needs it."""
+        self._cache.pop(key, None)
+
+    @property
+    def bgr(self):
+        return self.img[:, :, :3]
+
+    @property
+    def valid(self):
+        """Boolean alpha-validity mask, or None when the image has no alpha channel."""
+        return self._memo('valid', lambda: (self.img[:, :, 3] > 0) if self.img.shape[2] == 4 else None)
+
+    @property
+    def sampler(self):
+        return self._memo('sampler', lambda: RegionSampler(self.img))
+
+    def level(self, n):
+        """Pyramid level n: the image halved n times with area averaging."""
+        if n <= 0:
+            return self.img
+        def build():
+            prev = self.level(n - 1)
+            ph, pw = prev.shape[:2]
+            return cv2.resize(prev, (max(1, pw // 2), max(1, ph // 2)), interpolation=cv2.INTER_AREA)
+        return self._memo(('level', n), build)
+
+    def fit(self, max_side):
+        """Coarsest pyramid level whose longest side is still >= max_side. Returns (img, scale)."""
+        n = 0
+        while max(self.h, self.w) / float(2 ** (n + 1)) >= max_side:
+            n += 1
+        img = self.level(n)
+        return img, img.shape[1] / float(self.w)
+
+    def lab(self, level=0):
+        """Float CIE Lab (D65) of a pyramid level, memoized."""
+        return self._memo(('lab', level), lambda: bgr_to_lab(self.level(level)[:, :, :3]))
+
+    def lab_rows(self, y0, y1):
+        """Full-resolution Lab for rows y0:y1; only converts the band unless the full frame is cached."""
+        lab = self._cache.get(('lab', 0))
+        return lab[y0:y1] if lab is not None else bgr_to_lab(self.bgr[y0:y1])
+
+    def histograms(self):
+        """(3, 256) B, G, R histograms of alpha-valid pixels."""
+        return self._memo('histograms', lambda: channel_histograms(self.img, self.valid))
+
+    def lightness_histogram(self):
+        """L* histogram of alpha-valid pixels (LIGHTNESS_HIST_BINS bins over 0-100)."""
+        return self._memo('lightness_histogram', lambda: lightness_histogram(self.img, self.valid))
+
+def as_image_context(img):
+    return img if isinstance(img, ImageContext) else ImageContext(img)
+
+def _clip_centers(centers, r, w, h):
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    cxs = np.clip(centers[:, 0], r, w-1-r).astype(np.int64)
+    cys = np.clip(centers[:, 1], r, h-1-r).astype(np.int64)
+    return cxs, cys
+
+def _region_from_moments(cx, cy, r, mean_bgr, std_bgr):
+    rgb01 = (np.asarray(mean_bgr)[::-1] / 255.0).astype(np.float32)
     rgb255 = (rgb01*255.0)
     
-    pixel = np.uint8([[rgb255[::-1]]])
-    lab = cv2.cvtColor(pixel, cv2.COLOR_BGR2LAB).astype(np.float32)[0,0]
-    lab_std = np.array([lab[0]*100/255.0, lab[1]-128.0, lab[2]-128.0], dtype=np.float32)
+    lab_std = rgb01_to_lab(rgb01)
     xyz_std = srgb_to_xyz(rgb01)
     cmyk = np.array(rgb_to_cmyk(tuple(rgb01)), dtype=np.float32)
-    rgb_std_dev = (rgb/255.0).std(axis=0)
+    rgb_std_dev = (np.asarray(std_bgr)[::-1] / 255.0).astype(np.float32)
     return {
         "cx": cx, "cy": cy, "r": int(r),
         "rgb01": rgb01, "rgb255": rgb255, "rgb_std": rgb_std_dev,
         "lab": lab_std, "xyz": xyz_std, "cmyk": cmyk
     }
 
+def region_stats_batch(img, centers, r, sampler=None):
+    """
+    Region stats for many circle centres at once. Pass a prebuilt RegionSampler
+    to reuse its tables across calls on the same image.
+    """
+    h, w = img.shape[:2]
+    if sampler is None:
+        sampler = RegionSampler(img)
+    cxs, cys = _clip_centers(centers, r, w, h)
+    st = sampler.circles(cxs, cys, r)
+    # Safety: circles with no valid pixels (e.g. in void) report black/safe defaults
+    return [_region_from_moments(int(cx), int(cy), r, m, sd)
+            for cx, cy, m, sd in zip(cxs, cys, st['mean'], st['std'])]
+
+def region_stats(img, cx, cy, r, sampler=None):
+    return region_stats_batch(img, [(cx, cy)], r, sampler)[0]
+
+def grid_color_stats(ref_img, sample_img, centers, r, ref_sampler=None, sam_sampler=None):
+    """
+    Color stats and ΔE for many cells at once, as compact (N, ...) arrays instead of
+    one dict per point. centers are LOCAL (crop) coordinates.
+    """
+    h, w = ref_img.shape[:2]
+    ref_sampler = ref_sampler or RegionSampler(ref_img)
+    sam_sampler = sam_sampler or RegionSampler(sample_img)
+    cxs, cys = _clip_centers(centers, r, w, h)
+    ref_st = ref_sampler.circles(cxs, cys, r)
+    sam_st = sam_sampler.circles(cxs, cys, r)
+
+    ref_rgb01 = (ref_st['mean'][:, ::-1] / 255.0).astype(np.float32)
+    sam_rgb01 = (sam_st['mean'][:, ::-1] / 255.0).astype(np.float32)
+    ref_lab = rgb01_to_lab(ref_rgb01)
+    sam_lab = rgb01_to_lab(sam_rgb01)
+    de = delta_e_batch(ref_lab, sam_lab)
+    return {
+        "ref_rgb01": ref_rgb01, "sam_rgb01": sam_rgb01,
+        "ref_lab": ref_lab, "sam_lab": sam_lab,
+        "ref_xyz": srgb_to_xyz(ref_rgb01), "sam_xyz": srgb_to_xyz(sam_rgb01),
+        "de76": de['de76'], "de94": de['de94'], "de00": de['de00'],
+        "valid_pixels": np.minimum(ref_st['count'], sam_st['count']),
+    }
+
 def is_point_valid(x, y, region, img_w, img_h):
     """
     Validate if a point (x, y) in GLOBAL coordinates is within the region and image bounds.
@@ -499,49 +910,132 @@ def is_point_valid(x, y, region, img_w, img_h):
         if rx is None or ry is None or w is None or h is None: return False
         return rx <= x <= rx + w and ry <= y <= ry + h
 
-def make_points_strict(region, n, img_w, img_h):
+def points_in_region(xs, ys, region, img_w, img_h):
     """
-    Generate exactly n random points uniformly distributed INSIDE the region 
-    and within image bounds using strict validation.
+    Vectorized is_point_valid: boolean mask for GLOBAL coordinate arrays xs, ys.
     """
-    points = []
-    if n <= 0: return points
+    xs = np.asarray(xs)
+    ys = np.asarray(ys)
+    ok = (xs >= 0) & (xs < img_w) & (ys >= 0) & (ys < img_h)
+    if not region:
+        return ok
+        
+    rtype = region.get('type', 'rect')
     
-    # Determine sampling bounding box
+    if rtype == 'circle':
+        cx = region.get('cx')
+        cy = region.get('cy')
+        r = region.get('r')
+        if cx is None or cy is None or r is None: return np.zeros_like(ok)
+        return ok & ((xs - cx)**2 + (ys - cy)**2 <= r**2)
+    else:
+        rx = region.get('x')
+        ry = region.get('y')
+        w = region.get('w')
+        h = region.get('h')
+        if rx is None or ry is None or w is None or h is None: return np.zeros_like(ok)
+        return ok & (xs >= rx) & (xs <= rx + w) & (ys >= ry) & (ys <= ry + h)
+
+def _region_bbox(region, img_w, img_h):
+    """Sampling bounding box (min_x, max_x, min_y, max_y) of a region, constrained to the image."""
     if not region:
         min_x, max_x = 0, img_w
         min_y, max_y = 0, img_h
-        rtype = 'full'
+    elif region.get('type', 'rect') == 'circle':
+        cx, cy, r = region['cx'], region['cy'], region['r']
+        min_x, max_x = cx - r, cx + r
+        min_y, max_y = cy - r, cy + r
     else:
-        rtype = region.get('type', 'rect')
-        if rtype == 'circle':
-            cx, cy, r = region['cx'], region['cy'], region['r']
-            min_x, max_x = cx - r, cx + r
-            min_y, max_y = cy - r, cy + r
-        else:
-            min_x, max_x = region['x'], region['x'] + region['w']
-            min_y, max_y = region['y'], region['y'] + region['h']
-            
-    # Constrain bbox to image
-    min_x = max(0, min_x)
-    max_x = min(img_w, max_x)
-    min_y = max(0, min_y)
-    max_y = min(img_h, max_y)
+        min_x, max_x = region['x'], region['x'] + region['w']
+        min_y, max_y = region['y'], region['y'] + region['h']
+    return max(0, min_x), min(img_w, max_x), max(0, min_y), min(img_h, max_y)
+
+def make_grid_points(region, pitch, img_w, img_h, max_points=None):
+    """
+    Regular grid of cell centres (GLOBAL coordinates) covering the region.
+    The pitch is widened when the grid would exceed max_points.
+    Returns an (N, 2) int array and the pitch actually used.
+    """
+    min_x, max_x, min_y, max_y = _region_bbox(region, img_w, img_h)
+    pitch = max(1.0, float(pitch))
+    area = max(0, max_x - min_x) * max(0, max_y - min_y)
+    if max_points and area / (pitch * pitch) > max_points:
+        pitch = math.sqrt(area / float(max_points))
+        
+    xs = np.round(np.arange(min_x + pitch / 2.0, max_x, pitch)).astype(np.int64)
+    ys = np.round(np.arange(min_y + pitch / 2.0, max_y, pitch)).astype(np.int64)
+    gx, gy = np.meshgrid(xs, ys)
+    gx, gy = gx.ravel(), gy.ravel()
+    keep = points_in_region(gx, gy, region, img_w, img_h)
+    return np.stack([gx[keep], gy[keep]], axis=1), pitch
+
+def make_points_strict(region, n, img_w, img_h, min_spacing=0, seed=None):
+    """
+    Generate n random points uniformly distributed INSIDE the region and within
+    image bounds. Candidates are drawn in batches from a NumPy Generator (seed
+    gives reproducible layouts) and validated with array ops.
+    With min_spacing > 0 accepted points also keep at least that distance from
+    each other (Poisson-disk dart throwing), e.g. 2*r for non-overlapping circles.
+    """
+    if n <= 0: return []
+    rng = np.random.default_rng(seed)
+    
+    min_x, max_x, min_y, max_y = _region_bbox(region, img_w, img_h)
+    lo_x, hi_x = int(min_x), (int(max_x - 1) if max_x > min_x else int(min_x))
+    lo_y, hi_y = int(min_y), (int(max_y - 1) if max_y > min_y else int(min_y))
     
-    # Generate with rejection sampling
+    acc_x = np.zeros(n, dtype=np.int64)
+    acc_y = np.zeros(n, dtype=np.int64)
+    count = 0
+    seen = set()
+    
+    # Background grid for the spacing test: one point per cell, neighbours within 2 cells
+    spacing = float(min_spacing or 0)
+    s2 = spacing * spacing
+    if spacing > 0:
+        cell = spacing / math.sqrt(2)
+        owner = np.full((int((hi_y - lo_y) / cell) + 5, int((hi_x - lo_x) / cell) + 5), -1, dtype=np.int64)
+        dy, dx = [a.ravel() for a in np.mgrid[-2:3, -2:3]]
+    
+    # Generate with batched rejection sampling
     attempts = 0
     max_attempts = n * 200  # Safety break
     
-    while len(points) < n and attempts < max_attempts:
-        attempts += 1
-        px = random.randint(int(min_x), int(max_x - 1) if max_x > min_x else int(min_x))
-        py = random.randint(int(min_y), int(max_y - 1) if max_y > min_y else int(min_y))
+    while count < n and attempts < max_attempts:
+        batch = min(max_attempts - attempts, max(256, 4 * (n - count)))
+        attempts += batch
+        xs = rng.integers(lo_x, hi_x + 1, batch)
+        ys = rng.integers(lo_y, hi_y + 1, batch)
+        keep = points_in_region(xs, ys, region, img_w, img_h)
+        xs, ys = xs[keep], ys[keep]
         
-        if is_point_valid(px, py, region, img_w, img_h):
-            if (px, py) not in points:
-                points.append((px, py))
+        if spacing > 0:
+            gx = ((xs - lo_x) / cell).astype(np.int64) + 2
+            gy = ((ys - lo_y) / cell).astype(np.int64) + 2
+            if count:
+                # Drop candidates too close to points accepted in earlier batches
+                near = owner[gy[:, None] + dy, gx[:, None] + dx]
+                d2 = (acc_x[near] - xs[:, None])**2 + (acc_y[near] - ys[:, None])**2
+                ok = ~np.any((near >= 0) & (d2 < s2), axis=1)
+                xs, ys, gx, gy = xs[ok], ys[ok], gx[ok], gy[ok]
+        
+        for i, (px, py) in enumerate(zip(xs.tolist(), ys.tolist())):
+            if (px, py) in seen:
+                continue
+            if spacing > 0:
+                # Candidates of the same batch can still collide with each other
+                nb = owner[gy[i]-2:gy[i]+3, gx[i]-2:gx[i]+3]
+                nb = nb[nb >= 0]
+                if nb.size and np.any((acc_x[nb] - px)**2 + (acc_y[nb] - py)**2 < s2):
+                    continue
+                owner[gy[i], gx[i]] = count
+            seen.add((px, py))
+            acc_x[count], acc_y[count] = px, py
+            count += 1
+            if count == n:
+                break
                 
-    return points
+    return list(zip(acc_x[:count].tolist(), acc_y[:count].tolist()))
 
 def make_points(h, w, r, n=5):
     # DEPRECATED: Kept for compatibility if called without region context
@@ -623,11 +1117,11 @@ def plot_spectral_proxy(mean_rgb_ref, mean_rgb_test, path):
     save_fig(path)
 
 def plot_rgb_histogram(img_bgr, path, title='RGB Histogram'):
-    """Plot RGB histogram for a single image."""
+    """Plot RGB histogram for a single image (array, ImageContext or precomputed (3, 256) histograms)."""
     fig, ax = plt.subplots(figsize=(5.5, 3.2))
+    hists = _histograms_of(img_bgr)
     for i, (color, label) in enumerate(zip(['blue', 'green', 'red'], ['B', 'G', 'R'])):
-        hist = cv2.calcHist([img_bgr], [i], None, [256], [0, 256]).flatten()
-        ax.bar(range(256), hist, color=color, alpha=0.45, width=1.0, label=label)
+        ax.bar(range(256), hists[i], color=color, alpha=0.45, width=1.0, label=label)
     ax.set_xlabel('Value', fontsize=9)
     ax.set_ylabel('Count', fontsize=9)
     ax.set_title(title, fontsize=11, fontweight='bold')
@@ -639,12 +1133,12 @@ def plot_rgb_histogram(img_bgr, path, title='RGB Histogram'):
 
 
 def plot_rgb_histograms_dual(ref_bgr, sample_bgr, path, ref_title='Reference RGB Histogram', sam_title='Sample RGB Histogram'):
-    """Plot side-by-side RGB histograms for Reference and Sample."""
+    """Plot side-by-side RGB histograms for Reference and Sample (arrays, ImageContexts or precomputed histograms)."""
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(10, 3.5))
     for ax, img, title in [(ax1, ref_bgr, ref_title), (ax2, sample_bgr, sam_title)]:
+        hists = _histograms_of(img)
         for i, (color, label) in enumerate(zip(['blue', 'green', 'red'], ['B', 'G', 'R'])):
-            hist = cv2.calcHist([img], [i], None, [256], [0, 256]).flatten()
-            ax.bar(range(256), hist, color=color, alpha=0.45, width=1.0, label=label)
+            ax.bar(range(256), hists[i], color=color, alpha=0.45, width=1.0, label=label)
         ax.set_xlabel('Value', fontsize=9)
         ax.set_ylabel('Count', fontsize=9)
         ax.set_title(title, fontsize=10, fontweight='bold')
@@ -655,14 +1149,14 @@ def plot_rgb_histograms_dual(ref_bgr, sample_bgr, path, ref_title='Reference RGB
     plt.close(fig)
 
 
-def plot_heatmap(de_map, title, path):
-    vmax = np.percentile(de_map, 99)
-    plt.figure(figsize=(6, 3))
-    im = plt.imshow(de_map, cmap="inferno", vmin=0, vmax=max(vmax, 5.0))
-    plt.title(title)
-    plt.axis("off")
-    plt.colorbar(im, fraction=0.046, pad=0.04)
-    save_fig(path)
+HEATMAP_FIG_SIZE = (1800, 900)     # px, 6 x 3 in at 300 dpi
+
+def plot_heatmap(de_map, title, path, vmax=None):
+    """ΔE heatmap with colorbar, drawn by the raster renderer (no pyplot)."""
+    if vmax is None:
+        vmax = np.percentile(de_map, 99)
+    panel = heatmap_panel(de_map, title, cmap="inferno", vmin=0, vmax=max(vmax, 5.0))
+    return save_figure(render_figure([panel], HEATMAP_FIG_SIZE), path)
 
 def plot_lab_scatter(reg_stats, path, ref_label='Reference', sam_label='Sample', title='a* vs b* Chromaticity Scatter'):
     """a* vs b* scatter plot with reference and sample overlay."""
@@ -758,7 +1252,17 @@ def analyze_color(ref_img_bgr, sample_img_bgr, config=None):
         else:
             print(f"WARNING: Invalid manual point rejected: {px}, {py}")
 
-    if sampling_mode == 'manual':
+    grid_pts = None
+    if sampling_mode == 'grid':
+        # Dense coverage; per-point detail is kept for the worst cells only (see below)
+        r = int(cfg.get('grid_radius') or r)
+        pitch = float(cfg.get('grid_pitch') or GRID_PITCH_RADII * r)
+        grid_pts, pitch = make_grid_points(region_geo, pitch, global_w, global_h,
+                                           int(cfg.get('grid_max_points', GRID_MAX_POINTS)))
+        if len(grid_pts) == 0:
+            print("ERROR: No valid grid cells for analysis.")
+        
+    elif sampling_mode == 'manual':
         if len(valid_provided_points) != n_reg:
             print(f"CRITICAL: Manual mode point count mismatch. Expected {n_reg}, got {len(valid_provided_points)} valid points.")
         
@@ -769,13 +1273,15 @@ def analyze_color(ref_img_bgr, sample_img_bgr, config=None):
         needed = n_reg - len(points)
         
         if needed > 0:
-             random_points = make_points_strict(region_geo, needed, global_w, global_h)
+             random_points = make_points_strict(region_geo, needed, global_w, global_h,
+                                                min_spacing=cfg.get('sampling_min_spacing', 0),
+                                                seed=cfg.get('sampling_seed'))
              points.extend([(px, py, False) for px, py in random_points])
     
     # Final check
     points = points[:n_reg]
     
-    if len(points) == 0 and n_reg > 0:
+    if len(points) == 0 and n_reg > 0 and grid_pts is None:
          print("ERROR: No valid points for analysis.")
     
     if sample_img_bgr.shape != ref_img_bgr.shape:
@@ -785,9 +1291,29 @@ def analyze_color(ref_img_bgr, sample_img_bgr, config=None):
     thresh_cond = float(cfg['thresholds']['conditional'])
     global_thresh = float(cfg.get('global_threshold_de', 5.0))
     
+    # Shared per-image caches for every color consumer of this request
+    ref_ctx = ImageContext(ref_img_bgr)
+    sam_ctx = ImageContext(sample_img_bgr)
+    
+    grid = None
+    if grid_pts is not None and len(grid_pts):
+        local = np.clip(grid_pts - [crop_off_x, crop_off_y], 0, [w - 1, h - 1])
+        grid = grid_color_stats(ref_img_bgr, sample_img_bgr, local, r, ref_ctx.sampler, sam_ctx.sampler)
+        de00 = grid['de00']
+        grid.update({
+            "pos": grid_pts, "pitch": pitch, "radius": r,
+            "n_pass": int(np.sum(de00 < thresh_pass)),
+            "n_conditional": int(np.sum((de00 >= thresh_pass) & (de00 <= thresh_cond))),
+            "n_fail": int(np.sum(de00 > thresh_cond)),
+        })
+        # Region tables, overlays and plots show the highest-ΔE2000 cells
+        worst = np.argsort(-de00, kind='stable')[:n_reg]
+        points = [(int(x), int(y), False) for x, y in grid_pts[worst]]
+    
     reg_stats = []
     if points:
-        for i, point_data in enumerate(points):
+        positions, centers = [], []
+        for point_data in points:
             # Handle both old format (px, py) and new format (px, py, isManual)
             if isinstance(point_data, tuple) and len(point_data) == 3:
                 gx, gy, _ = point_data
@@ -801,11 +1327,17 @@ def analyze_color(ref_img_bgr, sample_img_bgr, config=None):
             lx = max(0, min(w - 1, lx))
             ly = max(0, min(h - 1, ly))
             
-            r_stat = region_stats(ref_img_bgr, lx, ly, r)
-            s_stat = region_stats(sample_img_bgr, lx, ly, r)
-            d76 = deltaE76(r_stat['lab'], s_stat['lab'])
-            d94 = deltaE94(r_stat['lab'], s_stat['lab'])
-            d00 = deltaE2000(r_stat['lab'], s_stat['lab'])
+            positions.append((gx, gy))
+            centers.append((lx, ly))
+
+        ref_regions = region_stats_batch(ref_img_bgr, centers, r, ref_ctx.sampler)
+        sam_regions = region_stats_batch(sample_img_bgr, centers, r, sam_ctx.sampler)
+
+        # All ΔE metrics for all points in one vectorized pass
+        de = delta_e_batch([s['lab'] for s in ref_regions], [s['lab'] for s in sam_regions])
+
+        for i, (pos, r_stat, s_stat) in enumerate(zip(positions, ref_regions, sam_regions)):
+            d00 = float(de['de00'][i])
             
             status = "FAIL"
             if d00 < thresh_pass: status = "PASS"
@@ -813,13 +1345,15 @@ def analyze_color(ref_img_bgr, sample_img_bgr, config=None):
 
             reg_stats.append({
                 "id": i+1, 
-                "pos": (gx, gy),
+                "pos": pos,
                 "ref": r_stat, "sam": s_stat,
-                "de76": d76, "de94": d94, "de00": d00,
+                "de76": float(de['de76'][i]), "de94": float(de['de94'][i]), "de00": d00,
                 "status": status
             })
 
-    if reg_stats:
+    if grid is not None:
+        mean_de00 = float(np.mean(grid['de00']))
+    elif reg_stats:
         all_de00 = [x['de00'] for x in reg_stats]
         mean_de00 = np.mean(all_de00)
     else:
@@ -832,28 +1366,48 @@ def analyze_color(ref_img_bgr, sample_img_bgr, config=None):
     else:
         overall_status = "FAIL"
     
-    # CSI computation (full-image Delta E 76 based)
-    small_ref = cv2.resize(ref_img_bgr, (0, 0), fx=0.25, fy=0.25)
-    small_sam = cv2.resize(sample_img_bgr, (0, 0), fx=0.25, fy=0.25)
-    s_ref_lab = cv2.cvtColor(small_ref, cv2.COLOR_BGR2LAB).astype(np.float32)
-    s_sam_lab = cv2.cvtColor(small_sam, cv2.COLOR_BGR2LAB).astype(np.float32)
-    diff_map_csi = np.sqrt(np.sum((s_ref_lab - s_sam_lab) ** 2, axis=2))
-    mean_delta_csi = np.mean(diff_map_csi)
-    csi_value = max(0, min(100, 100 * (1 - mean_delta_csi / 100.0)))
+    # Full-resolution ΔE2000 map (tiled); drives CSI and both heatmaps
+    # Prefix-sum tables are large and nothing after region sampling reads them
+    ref_ctx.release('sampler')
+    sam_ctx.release('sampler')
+    
+    de_map = delta_e_map(ref_ctx, sam_ctx, thresh_pass, thresh_cond)
+    csi_value = max(0, min(100, 100 * (1 - de_map['mean'] / 100.0)))
+    
+    # Metamerism check under all illuminants at once; PDF and API both read this
+    if grid is not None:
+        ref_xyz, sam_xyz = grid['ref_xyz'], grid['sam_xyz']
+    else:
+        ref_xyz = [x['ref']['xyz'] for x in reg_stats]
+        sam_xyz = [x['sam']['xyz'] for x in reg_stats]
+    illuminants = illuminant_analysis(ref_xyz, sam_xyz, cfg.get('primary_illuminant', 'D65'),
+                                      mean_de00, csi_value)
     
     return {
         "reg_stats": reg_stats,
         "mean_de00": mean_de00,
         "overall_status": overall_status,
         "csi_value": csi_value,
+        "de_map": de_map,
+        "grid": grid,
+        "illuminants": illuminants,
         "r": r,
         "points": points, # Return GLOBAL points
         "modified_sample": sample_img_bgr,
+        "ref_ctx": ref_ctx,
+        "sam_ctx": sam_ctx,
         "config": cfg
     }
 
-def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path, config=None, temp_dir=None, report_id=None, timestamp=None):
+def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path, config=None, report_id=None, timestamp=None,
+                          artifacts=None):
+    """
+    Build the color PDF. Figures are rendered into `artifacts` (an ArtifactStore,
+    per-call if not given) and embedded from memory, so the web view can serve the
+    same renders.
+    """
     cfg = config or DEFAULT_CONFIG
+    artifacts = artifacts if artifacts is not None else ArtifactStore()
     sections = cfg.get('sections', {})
     operator = cfg.get('operator', 'Unknown')
     tz_offset = cfg.get('timezone_offset', DEFAULT_TIMEZONE_OFFSET_HOURS)
@@ -901,12 +1455,24 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
     r = analysis_data['r']
     points = analysis_data['points']
     
-    # Pre-calc metrics
-    if reg_stats:
+    grid = analysis_data.get('grid')
+    
+    # Reuse the image caches from analyze_color when they belong to these images
+    ref_ctx = analysis_data.get('ref_ctx')
+    if ref_ctx is None or ref_ctx.img is not ref_img_bgr:
+        ref_ctx = ImageContext(ref_img_bgr)
+    sam_ctx = analysis_data.get('sam_ctx')
+    if sam_ctx is None or sam_ctx.img is not sample_img_bgr:
+        sam_ctx = ImageContext(sample_img_bgr)
+    
+    # Pre-calc metrics (over every grid cell in grid mode)
+    if grid is not None:
+        all_de76, all_de94, all_de00 = grid['de76'], grid['de94'], grid['de00']
+    elif reg_stats:
         all_de76 = [x['de76'] for x in reg_stats]
         all_de94 = [x['de94'] for x in reg_stats]
         all_de00 = [x['de00'] for x in reg_stats]
-        
+    if grid is not None or reg_stats:
         def get_stats_row(label, arr):
             return [label, f"{np.mean(arr):.2f}", f"{np.std(arr):.2f}", f"{np.min(arr):.2f}", f"{np.max(arr):.2f}", ""]
             
@@ -1052,8 +1618,12 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
             ly = gy - crop_off_y
             local_points.append((lx, ly))
     
-    overlay_ref = overlay_circles(ref_img_bgr, local_points, r)
-    overlay_sam = overlay_circles(sample_img_bgr, local_points, r)
+    # Overlays are drawn on a pyramid level close to the printed size
+    ov_ref, ov_scale = ref_ctx.fit(OVERLAY_MAX_SIDE)
+    ov_sam, _ = sam_ctx.fit(OVERLAY_MAX_SIDE)
+    ov_points = [(int(round(p[0] * ov_scale)), int(round(p[1] * ov_scale))) + tuple(p[2:]) for p in local_points]
+    overlay_ref = overlay_circles(ov_ref, ov_points, max(1, int(round(r * ov_scale))))
+    overlay_sam = overlay_circles(ov_sam, ov_points, max(1, int(round(r * ov_scale))))
     
     img_table_data = [
         [numpy_to_rl(overlay_ref, 3.2*inch, 2.5*inch), numpy_to_rl(overlay_sam, 3.2*inch, 2.5*inch)],
@@ -1105,12 +1675,16 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
 
             # 1) Detailed Lab* Color Space Analysis table
             detail_header = [tr('component'), tr('reference'), tr('sample'), tr('difference'), tr('interpretation')]
-            mean_ref_L = np.mean([s['ref']['lab'][0] for s in reg_stats])
-            mean_ref_a = np.mean([s['ref']['lab'][1] for s in reg_stats])
-            mean_ref_b = np.mean([s['ref']['lab'][2] for s in reg_stats])
-            mean_sam_L = np.mean([s['sam']['lab'][0] for s in reg_stats])
-            mean_sam_a = np.mean([s['sam']['lab'][1] for s in reg_stats])
-            mean_sam_b = np.mean([s['sam']['lab'][2] for s in reg_stats])
+            if grid is not None:
+                mean_ref_L, mean_ref_a, mean_ref_b = (float(v) for v in grid['ref_lab'].mean(axis=0))
+                mean_sam_L, mean_sam_a, mean_sam_b = (float(v) for v in grid['sam_lab'].mean(axis=0))
+            else:
+                mean_ref_L = np.mean([s['ref']['lab'][0] for s in reg_stats])
+                mean_ref_a = np.mean([s['ref']['lab'][1] for s in reg_stats])
+                mean_ref_b = np.mean([s['ref']['lab'][2] for s in reg_stats])
+                mean_sam_L = np.mean([s['sam']['lab'][0] for s in reg_stats])
+                mean_sam_a = np.mean([s['sam']['lab'][1] for s in reg_stats])
+                mean_sam_b = np.mean([s['sam']['lab'][2] for s in reg_stats])
             dL = mean_sam_L - mean_ref_L
             da = mean_sam_a - mean_ref_a
             db = mean_sam_b - mean_ref_b
@@ -1177,17 +1751,18 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
 
             # 4) Lab* Visualizations (a*b* scatter + Lab components bar)
             if sections.get('visualizations', True):
-                scatter_path = os.path.join(temp_dir, "lab_scatter.png")
-                bar_path = os.path.join(temp_dir, "lab_bars.png")
-                plot_lab_scatter(reg_stats, scatter_path, ref_label=tr('reference'), sam_label=tr('sample'), title=tr('lab_scatter_title'))
-                plot_lab_bars(reg_stats, bar_path, ref_label=tr('reference'), sam_label=tr('sample'), title=tr('lab_components_mean'))
+                labels = {'ref_label': tr('reference'), 'sam_label': tr('sample')}
+                scatter_kw = dict(labels, title=tr('lab_scatter_title'))
+                bars_kw = dict(labels, title=tr('lab_components_mean'))
+                scatter_png = artifacts.render('lab_scatter', lambda out: plot_lab_scatter(reg_stats, out, **scatter_kw), scatter_kw)
+                bars_png = artifacts.render('lab_bars', lambda out: plot_lab_bars(reg_stats, out, **bars_kw), bars_kw)
                 elements.append(KeepTogether([
                     Paragraph(tr('lab_visualizations'), StyleH2),
-                    RLImage(scatter_path, 4.5*inch, 3.5*inch),
+                    RLImage(io.BytesIO(scatter_png), 4.5*inch, 3.5*inch),
                     Spacer(1, 0.1*inch),
                 ]))
                 elements.append(KeepTogether([
-                    RLImage(bar_path, 4.5*inch, 2.8*inch),
+                    RLImage(io.BytesIO(bars_png), 4.5*inch, 2.8*inch),
                     Spacer(1, 0.15*inch),
                 ]))
 
@@ -1236,18 +1811,17 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
             cmds.append(('BACKGROUND', (4,i), (4,i), STATUS_COLORS.get(row[-1], colors.black)))
             cmds.append(('TEXTCOLOR', (4,i), (4,i), colors.white))
         t_de.setStyle(TableStyle(cmds))
-        elements.append(KeepTogether([
-            Paragraph(tr('diff_metrics'), StyleH1),
-            t_de,
-            Spacer(1, 0.2*inch),
-        ]))
+        de_block = [Paragraph(tr('diff_metrics'), StyleH1)]
+        if grid is not None:
+            de_block.append(Paragraph(tr('grid_sampling_note').format(
+                n=len(grid['de00']), pitch=grid['pitch'], radius=grid['radius'], k=len(reg_stats)), StyleSmall))
+        de_block.extend([t_de, Spacer(1, 0.2*inch)])
+        elements.append(KeepTogether(de_block))
         
         # ΔE Summary Statistics — immediately after Difference Metrics
         if reg_stats:
             de_sum_header = [tr('metric'), tr('average'), tr('std_dev'), tr('minimum'), tr('maximum'), tr('status')]
-            de76_vals = [x['de76'] for x in reg_stats]
-            de94_vals = [x['de94'] for x in reg_stats]
-            de00_vals = [x['de00'] for x in reg_stats]
+            de76_vals, de94_vals, de00_vals = all_de76, all_de94, all_de00
             de_sum_rows = [de_sum_header]
             de_sum_rows.append([tr('de_76_label'), f"{np.mean(de76_vals):.2f}", f"{np.std(de76_vals):.2f}", f"{np.min(de76_vals):.2f}", f"{np.max(de76_vals):.2f}", tr('informational')])
             de_sum_rows.append([tr('de_94_label'), f"{np.mean(de94_vals):.2f}", f"{np.std(de94_vals):.2f}", f"{np.min(de94_vals):.2f}", f"{np.max(de94_vals):.2f}", tr('informational')])
@@ -1271,39 +1845,12 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
     if sections.get('illuminant_analysis', True) and reg_stats:
         ill_data = [[tr('illuminant'), 'Mean ΔE2000', tr('csi'), tr('status')]]
         
+        illuminants = analysis_data.get('illuminants', {})
         for ill in test_illuminants:
             ill_key = ill.strip()
-            if ill_key not in WHITE_POINTS: continue
-            
-            if ill_key == primary_ill:
-                # Use the canonical values from the main analysis
-                mean_ill_de = float(mean_de00)
-                ill_csi = float(csi_value)
-            else:
-                # Chromatic adaptation for non-primary illuminants
-                ill_de_values = []
-                
-                for item in reg_stats:
-                    ref_xyz_d65 = item['ref']['xyz']
-                    ref_xyz_tgt = adapt_to_illuminant(ref_xyz_d65, ill_key)
-                    ref_lab_tgt = xyz_to_lab(ref_xyz_tgt, WHITE_POINTS[ill_key])
-                    
-                    sam_xyz_d65 = item['sam']['xyz']
-                    sam_xyz_tgt = adapt_to_illuminant(sam_xyz_d65, ill_key)
-                    sam_lab_tgt = xyz_to_lab(sam_xyz_tgt, WHITE_POINTS[ill_key])
-                    
-                    d00 = deltaE2000(ref_lab_tgt, sam_lab_tgt)
-                    ill_de_values.append(d00)
-                    
-                mean_ill_de = np.mean(ill_de_values) if ill_de_values else 0.0
-                ill_csi = max(0.0, min(100.0, 100.0 - (mean_ill_de * 10.0)))
-            
-            # Status
-            if ill_csi >= 90.0: status = "PASS"
-            elif ill_csi >= 70.0: status = "CONDITIONAL"
-            else: status = "FAIL"
-            
-            ill_data.append([ill_key, f"{mean_ill_de:.2f}", f"{ill_csi:.2f}", status])
+            res = illuminants.get(ill_key)
+            if res is None: continue
+            ill_data.append([ill_key, f"{res['mean_de00']:.2f}", f"{res['csi']:.2f}", res['status']])
             
         t_ill = make_table(ill_data, colWidths=[2.0*inch, 2.0*inch, 1.5*inch, 1.5*inch])
         
@@ -1341,10 +1888,9 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
         
         if sections.get('spectral', True) and reg_stats:
             spectral_desc = 'Grafik, RGB ortalamalarından spektral davranışı yaklaşık olarak göstermektedir.' if report_lang == 'tr' else 'The chart approximates spectral behavior from RGB averages.'
-            spec_path = os.path.join(temp_dir, "spec.png")
             mean_rgb_ref = np.mean([x['ref']['rgb01'] for x in reg_stats], axis=0)
             mean_rgb_sam = np.mean([x['sam']['rgb01'] for x in reg_stats], axis=0)
-            plot_spectral_proxy(mean_rgb_ref, mean_rgb_sam, spec_path)
+            spec_png = artifacts.render('spectral', lambda out: plot_spectral_proxy(mean_rgb_ref, mean_rgb_sam, out))
             kt_items = []
             if not viz_heading_used:
                 kt_items.append(viz_heading)
@@ -1352,17 +1898,16 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
             kt_items.extend([
                 Paragraph(tr('spectral_analysis') + " (" + tr('spectral_proxy') + ")", StyleH2),
                 Paragraph(spectral_desc, StyleSmall),
-                RLImage(spec_path, 6*inch, 2.6*inch),
+                RLImage(io.BytesIO(spec_png), 6*inch, 2.6*inch),
                 Spacer(1, 0.2*inch),
             ])
             elements.append(KeepTogether(kt_items))
         
         if sections.get('histograms', True):
-            hist_path = os.path.join(temp_dir, "hist_dual.png")
-            ref_hist_title = 'Referans RGB Histogramı' if report_lang == 'tr' else 'Reference RGB Histogram'
-            sam_hist_title = 'Numune RGB Histogramı' if report_lang == 'tr' else 'Sample RGB Histogram'
-            plot_rgb_histograms_dual(ref_img_bgr, sample_img_bgr, hist_path,
-                                     ref_title=ref_hist_title, sam_title=sam_hist_title)
+            hist_kw = {'ref_title': 'Referans RGB Histogramı' if report_lang == 'tr' else 'Reference RGB Histogram',
+                       'sam_title': 'Numune RGB Histogramı' if report_lang == 'tr' else 'Sample RGB Histogram'}
+            hist_png = artifacts.render('histograms', lambda out: plot_rgb_histograms_dual(ref_ctx, sam_ctx, out, **hist_kw),
+                                        hist_kw)
             hist_interp = tr('histogram_interpretation')
             kt_items = []
             if not viz_heading_used:
@@ -1370,7 +1915,7 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
                 viz_heading_used = True
             kt_items.extend([
                 Paragraph(tr('histograms_title'), StyleH2),
-                RLImage(hist_path, 6.5*inch, 2.5*inch),
+                RLImage(io.BytesIO(hist_png), 6.5*inch, 2.5*inch),
                 Spacer(1, 0.1*inch),
                 Paragraph(f"<i>{hist_interp}</i>", StyleSmall),
                 Spacer(1, 0.2*inch),
@@ -1378,19 +1923,30 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
             elements.append(KeepTogether(kt_items))
 
         if sections.get('visual_diff', True):
-            # Compute per-pixel ΔE map from ref and sample
-            ref_lab_full = cv2.cvtColor(ref_img_bgr, cv2.COLOR_BGR2LAB).astype(np.float32)
-            sam_lab_full = cv2.cvtColor(sample_img_bgr, cv2.COLOR_BGR2LAB).astype(np.float32)
-            diff_map = np.sqrt(np.sum((ref_lab_full - sam_lab_full) ** 2, axis=2))
-            heatmap_path = os.path.join(temp_dir, "hm.png")
-            plot_heatmap(diff_map, "ΔE Heatmap", heatmap_path)
+            # Per-pixel ΔE2000 map computed once in analyze_color
+            de_map = analysis_data.get('de_map')
+            if de_map is None:
+                thresholds = cfg.get('thresholds', {})
+                de_map = delta_e_map(ref_ctx, sam_ctx, float(thresholds.get('pass', 2.0)), float(thresholds.get('conditional', 5.0)))
+            heatmap_png = artifacts.render('heatmap', lambda out: plot_heatmap(de_map['map'], "ΔE2000 Heatmap", out,
+                                                                               vmax=de_map['p99']))
+            area_data = [
+                [tr('metric'), tr('value')],
+                ["P50 / P95 / P99", f"{de_map['p50']:.2f} / {de_map['p95']:.2f} / {de_map['p99']:.2f}"],
+                [tr('maximum'), f"{de_map['max']:.2f}"],
+                [f"{tr('area_over_pass')} (≥ {de_map['thresholds']['pass']:.1f})", f"{de_map['pct_over_pass']:.2f}%"],
+                [f"{tr('area_over_conditional')} (> {de_map['thresholds']['conditional']:.1f})", f"{de_map['pct_over_conditional']:.2f}%"],
+            ]
             kt_items = []
             if not viz_heading_used:
                 kt_items.append(viz_heading)
                 viz_heading_used = True
             kt_items.extend([
                 Paragraph(tr('visual_diff') + " " + tr('analysis'), StyleH2),
-                RLImage(heatmap_path, 6*inch, 3*inch),
+                RLImage(io.BytesIO(heatmap_png), 6*inch, 3*inch),
+                Spacer(1, 0.15*inch),
+                Paragraph(tr('de_area_statistics'), StyleH2),
+                make_table(area_data, colWidths=[3.0*inch, 2.0*inch]),
                 Spacer(1, 0.5*inch),
             ])
             elements.append(KeepTogether(kt_items))
@@ -1433,15 +1989,14 @@ def generate_pdf_headless(ref_img_bgr, sample_img_bgr, analysis_data, out_path,
 # MAIN ENTRY POINT
 # =================================================================================================
 
-def analyze_and_generate(ref_image, sample_image, config, output_path, report_id=None, timestamp=None):
+def analyze_and_generate(ref_image, sample_image, config, output_path, report_id=None, timestamp=None, artifacts=None):
     """
     Main function to run the full Color analysis pipeline.
     ref_image, sample_image: numpy arrays (BGR)
     config: configuration dictionary
     output_path: path to save the PDF
+    artifacts: optional ArtifactStore the report figures are rendered into (shared with the web view)
     """
-    import tempfile
-    
     # Ensure images are valid arrays
     if ref_image is None or sample_image is None:
         raise ValueError("Invalid image inputs")
@@ -1449,8 +2004,8 @@ def analyze_and_generate(ref_image, sample_image, config, output_path, report_id
     # Analyze
     analysis_data = analyze_color(ref_image, sample_image, config)
     
-    # Generate PDF (using temporary dir for assets)
-    with tempfile.TemporaryDirectory() as temp_dir:
-        generate_pdf_headless(ref_image, analysis_data['modified_sample'], analysis_data, output_path, config, temp_dir, report_id=report_id, timestamp=timestamp)
+    # Generate PDF (figures rendered in memory)
+    generate_pdf_headless(ref_image, analysis_data['modified_sample'], analysis_data, output_path, config,
+                          report_id=report_id, timestamp=timestamp, artifacts=artifacts)
         
     return output_path, analysis_data
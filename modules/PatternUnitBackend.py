@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
-import io, os, math, logging, tempfile
+import io, os, math, logging, threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 import numpy as np
 import cv2
@@ -9,12 +11,12 @@ import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 from .ReportTranslations import get_translator, translate_status
+from .RasterFigures import render_figure, heatmap_panel, image_panel, save_figure, encode_figure
+from .ArtifactStore import ArtifactStore
 
 # Scientific / Image Algo imports
-from skimage.metrics import structural_similarity as ssim
-from skimage.feature import graycomatrix, graycoprops
 
-from scipy.fft import fft2, fftshift
+from scipy.fft import rfft2, irfft2, next_fast_len
 # phaseCorrelate is in cv2
 
 from reportlab.lib.pagesizes import A4
@@ -82,6 +84,8 @@ DEFAULT_CONFIG = {
         'structural': True,
         'fourier': True,
         'glcm': True,
+        'phase_local': False,   # optional (costly) sections are opt-in
+        'repeat': False,
         'gradient_boundary': True,
         'phase_boundary': True,
         'summary': True,
@@ -281,142 +285,586 @@ def preprocess_to_structure(img):
     filtered = cv2.bilateralFilter(gray, 9, 75, 75)
     return filtered
 
-def method1_structural_ssim(ref, sample):
-    ref_gray = preprocess_to_structure(ref)
-    sample_gray = preprocess_to_structure(sample)
-    if ref_gray.shape != sample_gray.shape:
-        sample_gray = cv2.resize(sample_gray, (ref_gray.shape[1], ref_gray.shape[0]))
-    
-    score, diff_img = ssim(ref_gray, sample_gray, full=True)
-    diff_img = (diff_img * 255).astype(np.uint8)
-    diff_img_colored = cv2.applyColorMap(255 - diff_img, cv2.COLORMAP_JET)
+# Region masks (circle crops arrive as BGRA with alpha = 0 outside the circle)
+MASK_EDGE_MARGIN = 5         # px dropped inside the region edge: bilateral (radius 4) + Sobel (1) reach
+MASK_TAPER_SIGMA = 4.0       # px; soft edge of the FFT window of a masked image
+MASK_MIN_COVERAGE = 0.9      # windows / tiles with less of their area inside the region are skipped
+
+def alpha_mask(img):
+    """uint8 validity mask (255 = inside the region) from a BGRA alpha channel; None if every pixel is valid."""
+    if img.ndim == 3 and img.shape[2] == 4:
+        m = cv2.compare(img[:, :, 3], 0, cv2.CMP_GT)
+        if cv2.countNonZero(m) < m.size:
+            return m
+    return None
+
+def mask_coverage(mask, xs, ys, tw, th):
+    """(len(ys), len(xs)) fraction of each tw x th box at (xs[j], ys[i]) inside the mask (integral image)."""
+    ii = cv2.integral(mask // 255)
+    xs, ys = np.asarray(xs), np.asarray(ys)
+    return (ii[ys[:, None] + th, xs[None, :] + tw] - ii[ys[:, None], xs[None, :] + tw]
+            - ii[ys[:, None] + th, xs[None, :]] + ii[ys[:, None], xs[None, :]]) / float(tw * th)
+
+def erode_mask(mask, margin):
+    """Erode a validity mask by margin px; the image border does not count as an edge."""
+    if mask is None or margin <= 0:
+        return mask
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * margin + 1, 2 * margin + 1))
+    return cv2.erode(mask, kernel, borderType=cv2.BORDER_CONSTANT, borderValue=255)
+
+def mask_taper(mask, sigma=MASK_TAPER_SIGMA):
+    """float32 0-1 window that falls smoothly to 0 at the edge of a validity mask."""
+    inner = erode_mask(mask, int(math.ceil(2 * sigma)))
+    return cv2.GaussianBlur((inner > 0).astype(np.float32), (0, 0), sigma)
+
+def windowed_for_fft(gray, mask):
+    """
+    Masked image prepared for an FFT: the in-region mean is removed and the result
+    multiplied by mask_taper(), so neither the region edge nor the zeroed pixels
+    outside it leak into the spectrum.
+    """
+    x = cv2.subtract(gray, float(cv2.mean(gray, mask=mask)[0]), dtype=cv2.CV_32F)
+    return x * mask_taper(mask)
+
+# =================================================================================================
+# SSIM ENGINE
+# =================================================================================================
+
+SSIM_WIN_SIZE = 7                 # uniform window, same default as skimage
+SSIM_GAUSSIAN_WIN_SIZE = 11       # Wang et al. 2004: 11-tap Gaussian, sigma 1.5
+SSIM_GAUSSIAN_SIGMA = 1.5
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+MS_SSIM_WEIGHTS = (0.0448, 0.2856, 0.3001, 0.2363, 0.1333)
+
+def _ssim_filter(x, win_size, gaussian):
+    if gaussian:
+        return cv2.GaussianBlur(x, (win_size, win_size), SSIM_GAUSSIAN_SIGMA, borderType=cv2.BORDER_REFLECT)
+    return cv2.blur(x, (win_size, win_size), borderType=cv2.BORDER_REFLECT)
+
+def ssim_stats(img, win_size=None, gaussian=False, mask=None):
+    """
+    Local mean/variance of one image for SSIM, in float32. The image is centered on
+    its global mean first so E[x^2] - E[x]^2 does not lose precision in float32.
+    With a validity mask (uint8, 0 = outside the region) the statistics are
+    normalized convolutions over the valid pixels only, so pixels outside the
+    region never enter a window.
+    Stats can be computed once and reused for any number of fast_ssim() calls.
+    """
+    win_size = win_size or (SSIM_GAUSSIAN_WIN_SIZE if gaussian else SSIM_WIN_SIZE)
+    img = np.asarray(img)
+    if min(img.shape[:2]) < win_size:
+        raise ValueError(f"SSIM window {win_size} exceeds image extent {img.shape[:2]}")
+    offset = float(cv2.mean(img, mask=mask)[0])
+    xc = cv2.subtract(img, offset, dtype=cv2.CV_32F)
+    norm = None
+    if mask is not None:
+        m = (mask > 0).astype(np.float32)
+        xc *= m
+        wsum = _ssim_filter(m, win_size, gaussian)
+        norm = np.divide(1.0, wsum, out=np.zeros_like(wsum), where=wsum > 1e-6)
+    mu = _ssim_filter(xc, win_size, gaussian)
+    var = _ssim_filter(cv2.multiply(xc, xc), win_size, gaussian)
+    if norm is not None:
+        mu *= norm
+        var *= norm
+    var -= cv2.multiply(mu, mu)
+    return {'x': xc, 'offset': offset, 'mu': mu, 'var': var, 'win_size': win_size, 'gaussian': gaussian,
+            'mask': mask, 'norm': norm}
+
+def _ssim_maps(sa, sb, data_range):
+    """Returns (ssim_map, cs_map) from two ssim_stats() results."""
+    if sa['x'].shape != sb['x'].shape:
+        raise ValueError(f"SSIM inputs differ in shape: {sa['x'].shape} vs {sb['x'].shape}")
+    if (sa['win_size'], sa['gaussian']) != (sb['win_size'], sb['gaussian']):
+        raise ValueError("SSIM stats were computed with different windows")
+    if (sa.get('mask') is None) != (sb.get('mask') is None):
+        raise ValueError("SSIM stats must share the same validity mask")
+    win_size, gaussian = sa['win_size'], sa['gaussian']
+    n = win_size * win_size
+    cov_norm = 1.0 if gaussian else n / (n - 1.0)
+    c1 = (SSIM_K1 * data_range) ** 2
+    c2 = (SSIM_K2 * data_range) ** 2
+
+    # Contrast-structure term; buffers are reused in place to keep 12 MP maps cheap.
+    cs = _ssim_filter(cv2.multiply(sa['x'], sb['x']), win_size, gaussian)
+    if sa.get('norm') is not None:
+        cs *= sa['norm']
+    cs -= cv2.multiply(sa['mu'], sb['mu'])
+    cs *= 2 * cov_norm
+    cs += c2
+    den = cv2.add(sa['var'], sb['var'])
+    den *= cov_norm
+    den += c2
+    cs /= den
+
+    # Luminance term on the un-centered means
+    mx = sa['mu'] + sa['offset']
+    my = sb['mu'] + sb['offset']
+    den = cv2.multiply(mx, mx, dst=den)
+    den += cv2.multiply(my, my)
+    den += c1
+    mx *= my
+    mx *= 2
+    mx += c1
+    mx /= den
+    mx *= cs
+    return mx, cs
+
+def _ssim_crop_mean(m, win_size, mask=None):
+    pad = (win_size - 1) // 2
+    inner = m[pad:m.shape[0] - pad, pad:m.shape[1] - pad]
+    if mask is not None:
+        inner_mask = mask[pad:m.shape[0] - pad, pad:m.shape[1] - pad]
+        if inner.size and cv2.countNonZero(inner_mask):
+            return float(cv2.mean(inner, mask=inner_mask)[0])
+    return float(inner.mean()) if inner.size else float(m.mean())
+
+def _ssim_fill_outside(m, mask):
+    """Pixels outside the validity mask read as identical (1) on SSIM maps."""
+    if mask is not None:
+        m[mask == 0] = 1.0
+    return m
+
+def _resize_map(m, out_size):
+    if out_size is None or (m.shape[1], m.shape[0]) == tuple(out_size):
+        return m
+    return cv2.resize(m, tuple(out_size), interpolation=cv2.INTER_LINEAR)
+
+def fast_ssim(a, b, data_range=255.0, win_size=None, gaussian=False, stats_a=None, stats_b=None, out_size=None):
+    """
+    Single-scale SSIM on float32 box (or Gaussian) local statistics. Matches
+    skimage.metrics.structural_similarity defaults (7x7 window, sample covariance,
+    border-cropped mean). Pass precomputed ssim_stats() to skip the per-image filters.
+    Returns (score 0-1, ssim map resized to out_size=(w, h) if given).
+    """
+    sa = stats_a or ssim_stats(a, win_size, gaussian)
+    sb = stats_b or ssim_stats(b, win_size, gaussian)
+    s_map, _ = _ssim_maps(sa, sb, data_range)
+    score = _ssim_crop_mean(s_map, sa['win_size'], sa.get('mask'))
+    return score, _resize_map(_ssim_fill_outside(s_map, sa.get('mask')), out_size)
+
+def ms_ssim(a, b, data_range=255.0, win_size=None, gaussian=True, weights=MS_SSIM_WEIGHTS, stats_a=None, stats_b=None, out_size=None):
+    """
+    Multi-scale SSIM over a Gaussian pyramid (cv2.pyrDown). Levels that would be
+    smaller than two windows are dropped and the remaining weights renormalized.
+    stats_a / stats_b are optional ssim_stats() for the full-resolution level.
+    The returned map is the weighted geometric combination of the per-level maps
+    (contrast-structure on fine levels, full SSIM on the coarsest), resized to
+    out_size or to the input size.
+    """
+    win_size = win_size or (SSIM_GAUSSIAN_WIN_SIZE if gaussian else SSIM_WIN_SIZE)
+    xa = np.asarray(stats_a['x'] + stats_a['offset'] if stats_a else a, dtype=np.float32)
+    xb = np.asarray(stats_b['x'] + stats_b['offset'] if stats_b else b, dtype=np.float32)
+    mask = stats_a.get('mask') if stats_a else None
+    h, w = xa.shape[:2]
+    out_size = tuple(out_size) if out_size is not None else (w, h)
+
+    levels = 1
+    while levels < len(weights) and min(h, w) / float(2 ** levels) >= 2 * win_size:
+        levels += 1
+    wts = np.asarray(weights[:levels], dtype=np.float64)
+    wts = wts / wts.sum()
+
+    score = 1.0
+    combined = None
+    for lvl in range(levels):
+        sa = stats_a if (lvl == 0 and stats_a and stats_a['win_size'] == win_size and stats_a['gaussian'] == gaussian) \
+            else ssim_stats(xa, win_size, gaussian, mask)
+        sb = stats_b if (lvl == 0 and stats_b and stats_b['win_size'] == win_size and stats_b['gaussian'] == gaussian) \
+            else ssim_stats(xb, win_size, gaussian, mask)
+        s_map, cs_map = _ssim_maps(sa, sb, data_range)
+        m = _ssim_fill_outside(s_map if lvl == levels - 1 else cs_map, mask)
+        score *= max(_ssim_crop_mean(m, win_size, mask), 0.0) ** wts[lvl]
+        term = np.power(np.maximum(_resize_map(m, out_size), 0.0), wts[lvl], dtype=np.float32)
+        combined = term if combined is None else combined * term
+        if lvl < levels - 1:
+            xa = cv2.pyrDown(xa)
+            xb = cv2.pyrDown(xb)
+            if mask is not None:
+                mask = cv2.resize(mask, (xa.shape[1], xa.shape[0]), interpolation=cv2.INTER_NEAREST)
+    return float(score), combined
+
+CLAHE_CLIP_LIMIT = 2.0
+CLAHE_TILE_GRID = (8, 8)
+
+class MemoCache:
+    """
+    Compute-once cache shared by PatternImage and PatternContext. Thread-safe: the
+    method graph runs nodes concurrently, and a per-key lock makes a second caller
+    wait for the first computation instead of repeating it.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _memo(self, key, fn):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._cache:
+                self._cache[key] = fn()
+        return self._cache[key]
+
+    def release(self, key):
+        self._cache.pop(key, None)
+
+class PatternImage(MemoCache):
+    """
+    Per-request cache for one pattern image. The composited BGR, grayscale and
+    bilateral-filtered structure image are computed on first use.
+    """
+
+    def __init__(self, img):
+        super().__init__()
+        self.img = img
+        self.h, self.w = img.shape[:2]
+
+    @property
+    def bgr(self):
+        """Image composited over black (transparent pixels become black)."""
+        return self._memo('bgr', lambda: composite_over_black(self.img))
+
+    @property
+    def gray(self):
+        return self._memo('gray', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def structure(self):
+        """Bilateral-filtered gray, same as preprocess_to_structure()."""
+        return self._memo('structure', lambda: cv2.bilateralFilter(self.gray, 9, 75, 75))
+
+    @property
+    def mask(self):
+        """alpha_mask() of the image: 255 inside the selected region, None when every pixel is valid."""
+        return self._memo('mask', lambda: alpha_mask(self.img))
+
+    @property
+    def spectrum(self):
+        """real_spectrum() of the gray image (windowed to the region when masked)."""
+        def build():
+            if self.mask is None:
+                return real_spectrum(self.gray)
+            return real_spectrum(windowed_for_fft(self.gray, self.mask))
+        return self._memo('spectrum', build)
+
+def as_pattern_image(img):
+    return img if isinstance(img, PatternImage) else PatternImage(img)
+
+class PatternContext(MemoCache):
+    """
+    Shared preprocessing for one reference/sample pair. Built once per pattern
+    request and passed to every method so the bilateral filter, CLAHE and Sobel
+    passes run once per image instead of once per method.
+    """
+
+    def __init__(self, ref, sample, gradient_range=None):
+        super().__init__()
+        self.ref = as_pattern_image(ref)
+        self.sample = as_pattern_image(sample)
+        # Optional {'ref': (lo, hi), 'sample': (lo, hi)} for the structure gradients;
+        # tiled mode passes whole-scan ranges so every tile is normalized alike.
+        self.gradient_range = gradient_range
+
+    def image(self, which):
+        return self.ref if which == 'ref' else self.sample
+
+    def valid(self, space='structure'):
+        """
+        Pixels inside both images' regions, in structure() ('structure') or
+        common_gray() ('common') geometry, eroded by MASK_EDGE_MARGIN so filter
+        windows straddling the region edge are left out. uint8 mask, or None
+        when neither image is masked.
+        """
+        def build():
+            if self.ref.mask is None and self.sample.mask is None:
+                return None
+            w, h = (self.ref.w, self.ref.h) if space == 'structure' else self.common_size
+            m = np.full((h, w), 255, np.uint8)
+            for img in (self.ref, self.sample):
+                if img.mask is not None:
+                    mk = img.mask
+                    if (img.w, img.h) != (w, h):
+                        mk = cv2.resize(mk, (w, h), interpolation=cv2.INTER_NEAREST)
+                    cv2.bitwise_and(m, mk, dst=m)
+            return erode_mask(m, MASK_EDGE_MARGIN)
+        return self._memo(('valid', space), build)
+
+    def structure(self, which):
+        """Bilateral-filtered gray; the sample is resized to the reference shape."""
+        if which == 'ref':
+            return self.ref.structure
+        def build():
+            s = self.sample.structure
+            if s.shape != (self.ref.h, self.ref.w):
+                s = cv2.resize(s, (self.ref.w, self.ref.h))
+            return s
+        return self._memo(('structure', which), build)
+
+    @property
+    def common_size(self):
+        """(w, h) both images are resized to for the structural difference analysis."""
+        return (min(self.ref.w, self.sample.w), min(self.ref.h, self.sample.h))
+
+    def common_gray(self, which):
+        """Gray of the composited image resized to common_size."""
+        def build():
+            img = self.image(which)
+            w, h = self.common_size
+            bgr = img.bgr if (img.w, img.h) == (w, h) else cv2.resize(img.bgr, (w, h))
+            return cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        return self._memo(('common_gray', which), build)
+
+    def clahe(self, which):
+        """CLAHE-normalized common_gray."""
+        def build():
+            clahe = cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILE_GRID)
+            return clahe.apply(self.common_gray(which))
+        return self._memo(('clahe', which), build)
+
+    def _normalized_gradient(self, which, source, hi_value):
+        g = self.gradient(which, source)
+        if source == 'structure' and self.gradient_range:
+            lo, hi = self.gradient_range[which]
+            return np.clip((g - lo) * (hi_value / max(hi - lo, 1e-12)), 0, hi_value)
+        return cv2.normalize(g, None, 0, hi_value, cv2.NORM_MINMAX)
+
+    def gradient_norm(self, which, source='structure'):
+        """gradient() min-max normalized to 0-1."""
+        return self._memo(('gradient_norm', which, source), lambda: self._normalized_gradient(which, source, 1))
+
+    def gradient_u8(self, which, source='structure'):
+        """gradient() min-max normalized to uint8."""
+        return self._memo(('gradient_u8', which, source),
+                          lambda: self._normalized_gradient(which, source, 255).astype(np.uint8))
+
+    def ssim_stats(self, which, source='structure', gaussian=False):
+        """ssim_stats() of structure(), clahe() or gradient_u8(), shared by every SSIM call on it."""
+        def build():
+            if source == 'structure':
+                img = self.structure(which)
+            elif source == 'clahe':
+                img = self.clahe(which)
+            else:
+                img = self.gradient_u8(which)
+            return ssim_stats(img, gaussian=gaussian, mask=self.valid('common' if source == 'clahe' else 'structure'))
+        return self._memo(('ssim_stats', which, source, gaussian), build)
+
+    def ssim(self, source='structure', multiscale=False):
+        """(score 0-1, map) between ref and sample for the given source image."""
+        if multiscale:
+            return ms_ssim(None, None, stats_a=self.ssim_stats('ref', source, True),
+                           stats_b=self.ssim_stats('sample', source, True))
+        return fast_ssim(None, None, stats_a=self.ssim_stats('ref', source),
+                         stats_b=self.ssim_stats('sample', source))
+
+    def spectrum(self, which, source='clahe'):
+        """real_spectrum() of clahe() (or common_gray()), shared by the frequency diff; windowed when masked."""
+        src = self.clahe if source == 'clahe' else self.common_gray
+        def build():
+            mask = self.valid('common')
+            return real_spectrum(src(which) if mask is None else windowed_for_fft(src(which), mask))
+        return self._memo(('spectrum', which, source), build)
+
+    def gradient(self, which, source='structure'):
+        """Sobel gradient magnitude (float64) of structure() or clahe()."""
+        def build():
+            src = self.structure(which) if source == 'structure' else self.clahe(which)
+            gx = cv2.Sobel(src, cv2.CV_64F, 1, 0, ksize=3)
+            gy = cv2.Sobel(src, cv2.CV_64F, 0, 1, ksize=3)
+            g = cv2.magnitude(gx, gy)
+            # The region edge is a step to black, not pattern: outside pixels count as flat
+            mask = self.valid('structure' if source == 'structure' else 'common')
+            if mask is not None:
+                g[mask == 0] = 0
+            return g
+        return self._memo(('gradient', which, source), build)
+
+def as_pattern_context(ref, sample, ctx=None):
+    return ctx if ctx is not None else PatternContext(ref, sample)
+
+def similarity_colormap(s_map, colormap):
+    """Colorize an SSIM map (1 = identical) so that differences are hot."""
+    s_u8 = (s_map * 255).astype(np.uint8)
+    return cv2.applyColorMap(255 - s_u8, colormap)
+
+def method1_structural_ssim(ref, sample, ctx=None, multiscale=False):
+    ctx = as_pattern_context(ref, sample, ctx)
+    score, diff_img = ctx.ssim('structure', multiscale=multiscale)
+    diff_img_colored = similarity_colormap(diff_img, cv2.COLORMAP_JET)
     return score * 100, diff_img_colored
 
-def method3_gradient_similarity(ref, sample):
-    ref_gray = preprocess_to_structure(ref)
-    sample_gray = preprocess_to_structure(sample)
-    if ref_gray.shape != sample_gray.shape:
-        sample_gray = cv2.resize(sample_gray, (ref_gray.shape[1], ref_gray.shape[0]))
-        
-    ref_gx = cv2.Sobel(ref_gray, cv2.CV_64F, 1, 0, ksize=3)
-    ref_gy = cv2.Sobel(ref_gray, cv2.CV_64F, 0, 1, ksize=3)
-    ref_mag = np.sqrt(ref_gx**2 + ref_gy**2)
-    
-    sample_gx = cv2.Sobel(sample_gray, cv2.CV_64F, 1, 0, ksize=3)
-    sample_gy = cv2.Sobel(sample_gray, cv2.CV_64F, 0, 1, ksize=3)
-    sample_mag = np.sqrt(sample_gx**2 + sample_gy**2)
-    
-    ref_mag_norm = cv2.normalize(ref_mag, None, 0, 1, cv2.NORM_MINMAX)
-    sample_mag_norm = cv2.normalize(sample_mag, None, 0, 1, cv2.NORM_MINMAX)
+def gradient_similarity_maps(ctx):
+    """(SSIM score 0-1 of the gradient magnitudes, SSIM map, |normalized magnitude difference|)."""
+    score, s_map = ctx.ssim('gradient')
+    return score, s_map, np.abs(ctx.gradient_norm('ref') - ctx.gradient_norm('sample'))
+
+def method3_gradient_similarity(ref, sample, ctx=None):
+    ctx = as_pattern_context(ref, sample, ctx)
+    score, diff_img, gradient_diff = gradient_similarity_maps(ctx)
     
     # Visualization
-    ref_mag_uint8 = cv2.normalize(ref_mag, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
-    sample_mag_uint8 = cv2.normalize(sample_mag, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
-    score, diff_img = ssim(ref_mag_uint8, sample_mag_uint8, full=True)
-    diff_img = (diff_img * 255).astype(np.uint8)
-    diff_img_colored = cv2.applyColorMap(255 - diff_img, cv2.COLORMAP_HOT)
-    
-    gradient_diff = np.abs(ref_mag_norm - sample_mag_norm)
-    return score * 100, diff_img_colored, {'gradient_diff': gradient_diff}
-
-
+    diff_img_colored = similarity_colormap(diff_img, cv2.COLORMAP_HOT)
+    return score * 100, diff_img_colored, {'gradient_diff': gradient_diff, 'mask': ctx.valid('structure')}
 
-def method6_phase_correlation(ref, sample):
-    ref_gray = preprocess_to_structure(ref)
-    sample_gray = preprocess_to_structure(sample)
-    if ref_gray.shape != sample_gray.shape:
-        sample_gray = cv2.resize(sample_gray, (ref_gray.shape[1], ref_gray.shape[0]))
-        
-    ref_float = np.float32(ref_gray)
-    sample_float = np.float32(sample_gray)
+def phase_correlation_maps(ctx):
+    """(phase correlation response 0-100, uint8 absolute structure difference)."""
+    ref_gray = ctx.structure('ref')
+    sample_gray = ctx.structure('sample')
+    mask = ctx.valid('structure')
     
     try:
-        shift, response = cv2.phaseCorrelate(ref_float, sample_float)
+        if mask is None:
+            shift, response = cv2.phaseCorrelate(np.float32(ref_gray), np.float32(sample_gray))
+        else:
+            # Region-tapered window in place of the default Hanning over the bounding box
+            a = cv2.subtract(ref_gray, float(cv2.mean(ref_gray, mask=mask)[0]), dtype=cv2.CV_32F)
+            b = cv2.subtract(sample_gray, float(cv2.mean(sample_gray, mask=mask)[0]), dtype=cv2.CV_32F)
+            shift, response = cv2.phaseCorrelate(a, b, mask_taper(mask))
         score = response * 100
     except:
         score = 0.0
-        
-    phase_diff = cv2.absdiff(ref_gray, sample_gray)
+    diff = cv2.absdiff(ref_gray, sample_gray)
+    if mask is not None:
+        diff[mask == 0] = 0
+    return score, diff
+
+def method6_phase_correlation(ref, sample, ctx=None):
+    ctx = as_pattern_context(ref, sample, ctx)
+    score, phase_diff = phase_correlation_maps(ctx)
     diff_img = cv2.applyColorMap(phase_diff, cv2.COLORMAP_INFERNO)
     phase_diff_norm = phase_diff.astype(np.float32) / 255.0
-    return score, diff_img, {'phase_diff': phase_diff_norm}
+    return score, diff_img, {'phase_diff': phase_diff_norm, 'mask': ctx.valid('structure')}
 
-def create_gradient_red_boundaries(sample, gradient_data):
-    gradient_diff = gradient_data['gradient_diff']
-    threshold = np.percentile(gradient_diff, 70)
-    diff_mask = (gradient_diff > threshold).astype(np.uint8) * 255
+BOUNDARY_QUANTILE = 0.70         # pixels above this quantile of the diff map are "different"
+BOUNDARY_MIN_AREA = 100          # contours smaller than this (px^2) are ignored
+BOUNDARY_FILL_ALPHA = 0.4
+BOUNDARY_RGB = (255, 0, 0)
+QUANTILE_HIST_BINS = 4096
+
+def histogram_quantile(x, q, bins=QUANTILE_HIST_BINS):
+    """
+    Same value as np.percentile(x, q*100) (linear interpolation), found without
+    sorting: a histogram locates the bin holding each order statistic and only
+    that bin is partitioned. Empty input gives NaN.
+    """
+    flat = np.asarray(x).ravel()
+    n = flat.size
+    if n == 0:
+        return float('nan')
+    lo, hi = float(flat.min()), float(flat.max())
+    if hi == lo:
+        return lo
+    idx = ((flat - lo) * (bins / (hi - lo))).astype(np.intp)
+    np.minimum(idx, bins - 1, out=idx)
+    cdf = np.cumsum(np.bincount(idx, minlength=bins))
+
+    def order_stat(k):
+        b = int(np.searchsorted(cdf, k, side='right'))
+        before = int(cdf[b - 1]) if b > 0 else 0
+        vals = flat[idx == b]
+        return float(np.partition(vals, k - before)[k - before])
+
+    pos = q * (n - 1)
+    k0 = int(math.floor(pos))
+    k1 = min(k0 + 1, n - 1)
+    v0 = order_stat(k0)
+    if k1 == k0 or pos == k0:
+        return v0
+    v1 = order_stat(k1)
+    return v0 + (v1 - v0) * (pos - k0)
+
+def red_boundary_overlay(sample, diff_map, quantile=BOUNDARY_QUANTILE, min_area=BOUNDARY_MIN_AREA, mask=None,
+                         pixel_scale=1.0):
+    """
+    Shared engine for the gradient/phase boundary overlays. Thresholds diff_map at
+    its quantile, cleans the mask, and draws every significant contour in one pass:
+    outlines on one copy of the sample, a single alpha blend of all filled regions
+    on another. With a validity mask the quantile and coefficients only count
+    pixels inside it. pixel_scale (original-image px per diff_map px) applies
+    min_area in original pixels and reports the geometry in them.
+    Returns (contoured_rgb, filled_rgb, binary_coef, weighted_coef, n_contours, geometry)
+    where geometry holds per-contour 'bboxes' (N,4 x,y,w,h), 'areas' (N,),
+    'centroids' (N,2 x,y) and the raw 'contours' (diff_map pixels).
+    """
+    inside = diff_map if mask is None else diff_map[mask > 0]
+    threshold = histogram_quantile(inside, quantile) if inside.size else float(np.max(diff_map))
+    diff_mask = (diff_map > threshold).astype(np.uint8) * 255
     kernel = np.ones((7, 7), np.uint8)
     diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_CLOSE, kernel, iterations=2)
     diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_OPEN, kernel, iterations=1)
     diff_mask = cv2.dilate(diff_mask, np.ones((5, 5), np.uint8), iterations=2)
+    if mask is not None:
+        cv2.bitwise_and(diff_mask, mask, dst=diff_mask)
     
     contours, _ = cv2.findContours(diff_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    sample_vis = composite_over_black(sample)
-    sample_rgb = cv2.cvtColor(sample_vis, cv2.COLOR_BGR2RGB)
+    sample_rgb = cv2.cvtColor(as_pattern_image(sample).bgr, cv2.COLOR_BGR2RGB)
     if sample_rgb.shape[:2] != diff_mask.shape:
         sample_rgb = cv2.resize(sample_rgb, (diff_mask.shape[1], diff_mask.shape[0]))
     
+    areas = np.array([cv2.contourArea(c) for c in contours], dtype=np.float64)
+    keep = np.flatnonzero(areas > min_area / pixel_scale ** 2)
+    sig_cnts = [contours[i] for i in keep]
+    areas = areas[keep]
+    
     contoured = sample_rgb.copy()
     filled = sample_rgb.copy()
-    
-    sig_cnts = [cnt for cnt in contours if cv2.contourArea(cnt) > 100]
-    cv2.drawContours(contoured, sig_cnts, -1, (255, 0, 0), thickness=4)
-    for c in sig_cnts:
-        m = np.zeros(diff_mask.shape, dtype=np.uint8)
-        cv2.drawContours(m, [c], -1, 255, -1)
-        filled[m == 255] = filled[m == 255] * 0.6 + np.array([255, 0, 0]) * 0.4
-    cv2.drawContours(filled, sig_cnts, -1, (255, 0, 0), thickness=4)
-    
-    total = gradient_diff.size
-    colored = np.count_nonzero(diff_mask)
+    cv2.drawContours(contoured, sig_cnts, -1, BOUNDARY_RGB, thickness=4)
+    if sig_cnts:
+        fill_mask = np.zeros(diff_mask.shape, dtype=np.uint8)
+        cv2.drawContours(fill_mask, sig_cnts, -1, 255, -1)
+        sel = fill_mask > 0
+        filled[sel] = filled[sel] * (1.0 - BOUNDARY_FILL_ALPHA) + np.array(BOUNDARY_RGB) * BOUNDARY_FILL_ALPHA
+    cv2.drawContours(filled, sig_cnts, -1, BOUNDARY_RGB, thickness=4)
+    
+    total = diff_map.size if mask is None else cv2.countNonZero(mask)
+    colored = cv2.countNonZero(diff_mask)
     black = total - colored
     bin_coef = (100 - (colored/black)*100) if black > 0 else 0
     
-    diff_norm = gradient_diff / (np.max(gradient_diff) + 1e-10)
-    col_ints = diff_norm[diff_mask > 0]
-    w_sum = np.sum(col_ints)
+    diff_norm = diff_map / (np.max(diff_map) + 1e-10)
+    w_sum = float(np.sum(diff_norm[diff_mask > 0], dtype=np.float64))
     wei_coef = (100 - (w_sum/black)*100) if black > 0 else 0
     
-    return contoured, filled, bin_coef, wei_coef, len(sig_cnts)
+    if sig_cnts:
+        bboxes = np.array([cv2.boundingRect(c) for c in sig_cnts], dtype=np.int32)
+        moments = [cv2.moments(c) for c in sig_cnts]
+        centroids = np.array([(m['m10'] / m['m00'], m['m01'] / m['m00']) if m['m00'] else
+                              (bx + bw / 2.0, by + bh / 2.0)
+                              for m, (bx, by, bw, bh) in zip(moments, bboxes)], dtype=np.float64)
+    else:
+        bboxes = np.zeros((0, 4), dtype=np.int32)
+        centroids = np.zeros((0, 2), dtype=np.float64)
+    if pixel_scale != 1.0:
+        bboxes = np.round(bboxes * pixel_scale).astype(np.int32)
+        areas = areas * pixel_scale ** 2
+        centroids = centroids * pixel_scale
+    geometry = {'bboxes': bboxes, 'areas': areas, 'centroids': centroids, 'contours': sig_cnts}
+    
+    return contoured, filled, bin_coef, wei_coef, len(sig_cnts), geometry
+
+def create_gradient_red_boundaries(sample, gradient_data):
+    return red_boundary_overlay(sample, gradient_data['gradient_diff'], mask=gradient_data.get('mask'),
+                                pixel_scale=gradient_data.get('pixel_scale', 1.0))
 
 def create_phase_red_boundaries(sample, phase_data):
-    phase_diff = phase_data['phase_diff']
-    # Same logic as gradient
-    threshold = np.percentile(phase_diff, 70)
-    diff_mask = (phase_diff > threshold).astype(np.uint8) * 255
-    kernel = np.ones((7, 7), np.uint8)
-    diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_CLOSE, kernel, iterations=2)
-    diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_OPEN, kernel, iterations=1)
-    diff_mask = cv2.dilate(diff_mask, np.ones((5, 5), np.uint8), iterations=2)
-    
-    contours, _ = cv2.findContours(diff_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    sample_vis = composite_over_black(sample)
-    sample_rgb = cv2.cvtColor(sample_vis, cv2.COLOR_BGR2RGB)
-    if sample_rgb.shape[:2] != diff_mask.shape:
-        sample_rgb = cv2.resize(sample_rgb, (diff_mask.shape[1], diff_mask.shape[0]))
-    
-    contoured = sample_rgb.copy()
-    filled = sample_rgb.copy()
-    
-    sig_cnts = [cnt for cnt in contours if cv2.contourArea(cnt) > 100]
-    cv2.drawContours(contoured, sig_cnts, -1, (255, 0, 0), thickness=4)
-    for c in sig_cnts:
-        m = np.zeros(diff_mask.shape, dtype=np.uint8)
-        cv2.drawContours(m, [c], -1, 255, -1)
-        filled[m == 255] = filled[m == 255] * 0.6 + np.array([255, 0, 0]) * 0.4
-    cv2.drawContours(filled, sig_cnts, -1, (255, 0, 0), thickness=4)
-    
-    total = phase_diff.size
-    colored = np.count_nonzero(diff_mask)
-    black = total - colored
-    bin_coef = (100 - (colored/black)*100) if black > 0 else 0
-    
-    diff_norm = phase_diff / (np.max(phase_diff) + 1e-10)
-    col_ints = diff_norm[diff_mask > 0]
-    w_sum = np.sum(col_ints)
-    wei_coef = (100 - (w_sum/black)*100) if black > 0 else 0
-    
-    return contoured, filled, bin_coef, wei_coef, len(sig_cnts)
+    return red_boundary_overlay(sample, phase_data['phase_diff'], mask=phase_data.get('mask'),
+                                pixel_scale=phase_data.get('pixel_scale', 1.0))
+
+def pattern_status(composite, cfg):
+    """PASS / CONDITIONAL / FAIL of a pattern composite against global_threshold (and 15 points below it)."""
+    global_thresh = float(cfg.get('global_threshold', 75.0))
+    if composite >= global_thresh:
+        return "PASS"
+    elif composite >= (global_thresh - 15):
+        return "CONDITIONAL"
+    return "FAIL"
 
 def determine_status(value, pass_t, cond_t, lower_is_better=False):
     if lower_is_better:
@@ -428,59 +876,255 @@ def determine_status(value, pass_t, cond_t, lower_is_better=False):
         elif value >= cond_t: return "CONDITIONAL"
         else: return "FAIL"
 
+# =================================================================================================
+# FFT ENGINE
+# =================================================================================================
+
+FFT_WORKERS = -1          # scipy.fft worker threads (-1 = all cores)
+FFT_PAD_FAST_LEN = True   # zero-pad to scipy.fft.next_fast_len sizes
+
+def real_spectrum(gray, pad=None):
+    """
+    Half-plane spectrum of a real image: float32 input, complex64 rfft2 output.
+    With pad (default FFT_PAD_FAST_LEN) the image is zero-padded to the next 5-smooth size.
+    Returns dict with 'F' (H, W//2+1), 'shape' (h, w) of the input and 'fft_shape' (H, W).
+    """
+    if pad is None:
+        pad = FFT_PAD_FAST_LEN
+    x = np.asarray(gray, dtype=np.float32)
+    h, w = x.shape[:2]
+    fft_shape = (next_fast_len(h, real=True), next_fast_len(w, real=True)) if pad else (h, w)
+    F = rfft2(x, s=fft_shape, workers=FFT_WORKERS)
+    return {'F': F, 'shape': (h, w), 'fft_shape': fft_shape}
+
+def full_magnitude(F, width):
+    """
+    Full (unshifted) magnitude spectrum from an rfft2 half plane, using the
+    Hermitian symmetry |F(-ky, -kx)| = |F(ky, kx)| of real input.
+    """
+    half = np.abs(F)
+    H, nh = half.shape
+    if width <= nh:
+        return half[:, :width]
+    rows = (-np.arange(H)) % H
+    cols = width - np.arange(nh, width)
+    return np.hstack([half, half[rows][:, cols]])
+
+FFT_NUM_PEAKS = 5
+FFT_PEAK_MIN_SEPARATION = 3       # bins between reported peaks
+FFT_PEAK_REL_SEPARATION = 0.15    # ... or this fraction of the stronger peak's radius
+FFT_PEAK_CANDIDATES = 64          # local maxima kept per requested peak before separation
+RADIAL_PROFILE_BINS = 128         # over 0..0.5 cycles/pixel
+ANGULAR_PROFILE_BINS = 36         # over 0..180 degrees
+
+SPECTRUM_INDEX_CACHE_SIZE = 4     # FFT shapes whose index maps are kept (LRU; a ref/sample pair shares one)
+
+def spectrum_index_maps(fft_shape):
+    """
+    Per-bin geometry of an rfft2 half plane, cached per FFT shape (the most
+    recent SPECTRUM_INDEX_CACHE_SIZE shapes; callers must not modify it). Rows are in
+    fftshift order. Returns dict with signed 'ky'/'kx' bin offsets, 'radial'
+    (RADIAL_PROFILE_BINS bin index, or -1 past Nyquist / at DC) and 'angular'
+    (ANGULAR_PROFILE_BINS orientation bin, -1 at DC) index maps.
+    """
+    return _spectrum_index_maps(tuple(int(n) for n in fft_shape))
+
+@lru_cache(maxsize=SPECTRUM_INDEX_CACHE_SIZE)
+def _spectrum_index_maps(fft_shape):
+    H, W = fft_shape
+    nh = W // 2 + 1
+    ky = (np.arange(H) - H // 2)[:, None]
+    kx = np.arange(nh)[None, :]
+    fy, fx = ky / float(H), kx / float(W)
+    freq = np.sqrt(fy**2 + fx**2)
+    radial = np.floor(freq / 0.5 * RADIAL_PROFILE_BINS).astype(np.int32)
+    radial[radial >= RADIAL_PROFILE_BINS] = -1
+    theta = np.degrees(np.arctan2(-fy, fx)) % 180.0
+    angular = np.minimum((theta / 180.0 * ANGULAR_PROFILE_BINS).astype(np.int32), ANGULAR_PROFILE_BINS - 1)
+    dc = (ky == 0) & (kx == 0)
+    radial[dc] = -1
+    angular[dc] = -1
+    return {'ky': ky, 'kx': kx, 'radial': radial, 'angular': angular}
+
+def half_magnitude(spec):
+    """|F| of a real_spectrum() half plane, rows in fftshift order (cached on the spectrum)."""
+    if 'mag' not in spec:
+        spec['mag'] = np.fft.fftshift(np.abs(spec['F']), axes=0)
+    return spec['mag']
+
+def spectrum_autocorrelation(spec, sigma=0.0):
+    """
+    Normalized circular autocorrelation (1 at zero lag, mean removed) from a
+    real_spectrum() by Wiener-Khinchin: irfft2(|F|^2). sigma > 0 applies a Gaussian
+    low-pass of that many pixels first (the autocorrelation of the blurred image).
+    Zero lag sits at (H//2, W//2) after fftshift; cached on the spectrum per sigma.
+    On a zero-padded spectrum the mean is removed over the image extent (not the
+    padded grid), so the step from image to padding does not swamp |F|^2.
+    """
+    key = ('acorr', sigma)
+    if key not in spec:
+        H, W = spec['fft_shape']
+        F = spec['F']
+        h, w = spec['shape']
+        if (h, w) != (H, W):
+            # F of the mean-removed image = F - mean * F(ones(h, w)); the box DFT is separable
+            box = np.fft.fft(np.ones(h), H)[:, None] * np.fft.rfft(np.ones(w), W)[None, :]
+            F = F - (F[0, 0].real / (h * w)) * box
+        power = np.abs(F) ** 2
+        if sigma > 0:
+            f2 = np.fft.fftfreq(H)[:, None] ** 2 + np.fft.rfftfreq(W)[None, :] ** 2
+            power *= np.exp(-4 * np.pi**2 * sigma**2 * f2)
+        power[0, 0] = 0
+        ac = irfft2(power, s=spec['fft_shape'], workers=FFT_WORKERS)
+        ac /= ac[0, 0] if ac[0, 0] > 0 else 1.0
+        spec[key] = np.fft.fftshift(ac).astype(np.float32)
+    return spec[key]
+
+def window_autocorrelation(window, fft_shape):
+    """
+    fftshifted autocorrelation of a (non-negative) window at the padding of
+    real_spectrum(), 1 at zero lag: the fraction of overlap left at each lag, used
+    to undo the falloff a region mask puts on spectrum_autocorrelation().
+    """
+    power = np.abs(rfft2(np.asarray(window, np.float32), s=fft_shape, workers=FFT_WORKERS)) ** 2
+    ac = irfft2(power, s=fft_shape, workers=FFT_WORKERS)
+    ac /= ac[0, 0] if ac[0, 0] > 0 else 1.0
+    return np.fft.fftshift(ac).astype(np.float32)
+
+def padding_overlap(shape, fft_shape):
+    """
+    window_autocorrelation() of the unpadded (h, w) box inside the padded grid,
+    in closed form: the fraction of the image still overlapping itself at each lag.
+    """
+    def axis(n, N):
+        d = np.abs(np.fft.fftshift(np.fft.fftfreq(N) * N))
+        return (np.maximum(n - d, 0) + np.maximum(n - (N - d), 0)) / float(n)
+    return (axis(shape[0], fft_shape[0])[:, None] * axis(shape[1], fft_shape[1])[None, :]).astype(np.float32)
+
+def _binned_mean(values, index, nbins):
+    sel = index >= 0
+    idx = index[sel]
+    sums = np.bincount(idx, weights=values[sel], minlength=nbins)
+    counts = np.bincount(idx, minlength=nbins)
+    return np.divide(sums, counts, out=np.zeros(nbins), where=counts > 0)
+
+def spectrum_profiles(spec):
+    """
+    Radial and angular power profiles of a real_spectrum(), each normalized to sum
+    to 1 so profiles from images of any size or brightness are directly comparable.
+    """
+    maps = spectrum_index_maps(spec['fft_shape'])
+    power = half_magnitude(spec).astype(np.float64) ** 2
+    radial = _binned_mean(power, maps['radial'], RADIAL_PROFILE_BINS)
+    angular = _binned_mean(power, maps['angular'], ANGULAR_PROFILE_BINS)
+    radial /= radial.sum() or 1.0
+    angular /= angular.sum() or 1.0
+    return {
+        'radial_profile': radial,
+        'radial_frequency': (np.arange(RADIAL_PROFILE_BINS) + 0.5) * (0.5 / RADIAL_PROFILE_BINS),
+        'angular_profile': angular,
+        'angular_bins': (np.arange(ANGULAR_PROFILE_BINS) + 0.5) * (180.0 / ANGULAR_PROFILE_BINS),
+    }
+
+def profile_similarity(p, q):
+    """Histogram intersection (0-100) of two normalized spectrum profiles."""
+    return float(np.minimum(p, q).sum() * 100.0)
+
+def find_spectrum_peaks(spec, num_peaks=FFT_NUM_PEAKS, min_separation=FFT_PEAK_MIN_SEPARATION):
+    """
+    Top spectral peaks of a real_spectrum() in one pass over the half plane:
+    local maxima (3x3 dilation) outside the DC neighbourhood, minus the redundant
+    ky<0 half of the kx=0 column, then a greedy pick by magnitude that keeps peaks at
+    least max(min_separation, FFT_PEAK_REL_SEPARATION * radius) bins apart.
+    Returns a list of (ky, kx, magnitude) in padded-grid bins.
+    """
+    maps = spectrum_index_maps(spec['fft_shape'])
+    ky, kx = maps['ky'], maps['kx']
+    # Zero the DC neighbourhood first so its leakage cannot mask nearby peaks
+    mag = half_magnitude(spec).copy()
+    mag[(np.abs(ky) <= 2) & (kx <= 2)] = 0
+
+    peak_mask = mag >= cv2.dilate(mag, np.ones((3, 3), np.uint8))
+    peak_mask &= mag > 1e-6
+    peak_mask &= ~((kx == 0) & (ky < 0))
+
+    rows, cols = np.nonzero(peak_mask)
+    vals = mag[rows, cols]
+    n_cand = min(vals.size, max(1, num_peaks) * FFT_PEAK_CANDIDATES)
+    if n_cand == 0:
+        return []
+    top = np.argpartition(-vals, n_cand - 1)[:n_cand]
+    top = top[np.argsort(-vals[top], kind='stable')]
+    cand_ky = ky[rows[top], 0]
+    cand_kx = kx[0, cols[top]]
+
+    picked = []
+    for y, x, m in zip(cand_ky, cand_kx, vals[top]):
+        ok = True
+        for py, px, _ in picked:
+            sep = max(min_separation, FFT_PEAK_REL_SEPARATION * math.hypot(py, px))
+            # Compare against the peak and its conjugate (-ky, -kx)
+            if min(math.hypot(y - py, x - px), math.hypot(y + py, x + px)) < sep:
+                ok = False
+                break
+        if ok:
+            picked.append((int(y), int(x), float(m)))
+            if len(picked) >= num_peaks:
+                break
+    return picked
+
+def magnitude_difference_spatial(spec1, spec2):
+    """
+    |ifft2(|F1| - |F2|)| cropped to the input size. The magnitude difference of
+    two real images is real and even, so its inverse is an irfft2 of the half plane.
+    """
+    if spec1['fft_shape'] != spec2['fft_shape']:
+        raise ValueError(f"Spectra differ in shape: {spec1['fft_shape']} vs {spec2['fft_shape']}")
+    d = np.abs(np.abs(spec1['F']) - np.abs(spec2['F']))
+    spatial = irfft2(d, s=spec1['fft_shape'], workers=FFT_WORKERS)
+    h, w = spec1['shape']
+    return np.abs(spatial[:h, :w])
+
 # =================================================================================================
 # FOURIER DOMAIN ANALYSIS
 # =================================================================================================
 
-def fourier_domain_analysis(img_bgr):
+def fourier_domain_analysis(img_bgr, num_peaks=FFT_NUM_PEAKS, min_separation=FFT_PEAK_MIN_SEPARATION, pixel_scale=1.0):
     """
-    Perform 2D FFT analysis on a single image.
-    Returns dict with spectrum plot data, peaks table, and metrics.
+    Perform 2D FFT analysis on a single image (ndarray or PatternImage).
+    Returns dict with spectrum plot data, peaks table, radial/angular power
+    profiles and metrics. pixel_scale converts the fundamental period to
+    original-image pixels when the image is downscaled; peak 'px'/'py' stay
+    spectrum (plot) coordinates.
     """
-    gray = cv2.cvtColor(composite_over_black(img_bgr), cv2.COLOR_BGR2GRAY).astype(np.float64)
-    h, w = gray.shape
+    spec = as_pattern_image(img_bgr).spectrum
+    h, w = spec['shape']
+    H, W = spec['fft_shape']
 
-    # 2D FFT
-    f_transform = np.fft.fft2(gray)
-    f_shift = np.fft.fftshift(f_transform)
-    magnitude = np.abs(f_shift)
+    # 2D FFT (shared rfft2 half plane, expanded for plotting)
+    magnitude = np.fft.fftshift(full_magnitude(spec['F'], W))
     log_mag = np.log1p(magnitude)
 
-    cy, cx = h // 2, w // 2
-
-    # Find top peaks (exclude DC component)
-    mag_copy = magnitude.copy()
-    mag_copy[cy-2:cy+3, cx-2:cx+3] = 0  # zero out DC neighborhood
+    cy, cx = H // 2, W // 2
+    # Padded-grid offsets are reported in bins of the original image size
+    sy, sx = h / float(H), w / float(W)
 
-    num_peaks = 5
+    # Find top peaks (exclude DC component) on the half plane
     peaks = []
-    for _ in range(num_peaks):
-        idx = np.unravel_index(np.argmax(mag_copy), mag_copy.shape)
-        py, px = idx
-        peak_mag = mag_copy[py, px]
-        if peak_mag < 1e-6:
-            break
-        radius = math.sqrt((px - cx)**2 + (py - cy)**2)
-        angle = math.degrees(math.atan2(-(py - cy), px - cx))
+    for ky, kx, peak_mag in find_spectrum_peaks(spec, num_peaks, min_separation):
+        dx, dy = kx * sx, ky * sy
         peaks.append({
-            'radius': radius,
-            'angle': angle,
+            'radius': math.sqrt(dx**2 + dy**2),
+            'angle': math.degrees(math.atan2(-dy, dx)) + 0.0,  # no "-0.00" on the x axis
             'magnitude': peak_mag,
-            'px': int(px),
-            'py': int(py)
+            'px': int(cx + kx),
+            'py': int(cy + ky)
         })
-        # Suppress neighborhood to find next distinct peak
-        r_suppress = max(3, int(radius * 0.15))
-        y_lo = max(0, py - r_suppress)
-        y_hi = min(h, py + r_suppress + 1)
-        x_lo = max(0, px - r_suppress)
-        x_hi = min(w, px + r_suppress + 1)
-        mag_copy[y_lo:y_hi, x_lo:x_hi] = 0
 
     # Metrics
     if len(peaks) >= 1:
         dominant_peak = peaks[0]
-        fundamental_period = (1.0 / (dominant_peak['radius'] / max(h, w))) if dominant_peak['radius'] > 0 else 0.0
+        fundamental_period = (pixel_scale * max(h, w) / dominant_peak['radius']) if dominant_peak['radius'] > 0 else 0.0
         dominant_orientation = dominant_peak['angle']
     else:
         fundamental_period = 0.0
@@ -503,30 +1147,477 @@ def fourier_domain_analysis(img_bgr):
         'dominant_orientation': dominant_orientation,
         'anisotropy': anisotropy,
         'center': (cx, cy),
-        'shape': (h, w)
+        'shape': (h, w),
+        'fft_shape': (H, W),
+        **spectrum_profiles(spec),
     }
 
 
+FFT_SPECTRUM_FIG_SIZE = (1170, 900)     # px
+
 def plot_fft_spectrum(fda_result, out_path, title='2D FFT Power Spectrum'):
-    """Plot the 2D FFT power spectrum with peak markers."""
-    log_mag = fda_result['log_magnitude']
-    peaks = fda_result['peaks']
-    cx, cy = fda_result['center']
+    """Render the 2D FFT power spectrum with peak markers (raster renderer, no pyplot)."""
+    markers = [(p['px'], p['py'], f"P{i+1}") for i, p in enumerate(fda_result['peaks'])]
+    panel = heatmap_panel(fda_result['log_magnitude'], title, cmap='hot', label='Log Magnitude', markers=markers)
+    return save_figure(render_figure([panel], FFT_SPECTRUM_FIG_SIZE), out_path)
+
+
+# =================================================================================================
+# LOCAL PHASE CORRELATION (displacement field)
+# =================================================================================================
+
+PHASE_LOCAL_WINDOW = 64          # px, square windows
+PHASE_LOCAL_STEP = 32            # px between window origins (50% overlap)
+PHASE_LOCAL_BATCH = 1024         # windows per stacked FFT; bounds the working memory
+PHASE_LOCAL_MIN_RESPONSE = 0.1   # windows with a weaker correlation peak are unreliable (flat/featureless)
+PHASE_LOCAL_EPS = 1e-6
+PHASE_LOCAL_MAX_ARROWS = 32      # quiver arrows per axis in the distortion plot
+
+HANNING_CACHE_SIZE = 8
+
+@lru_cache(maxsize=HANNING_CACHE_SIZE)
+def hanning_window(size):
+    """2D float32 Hanning window (cached per size, HANNING_CACHE_SIZE most recent)."""
+    return cv2.createHanningWindow((size, size), cv2.CV_32F)
+
+def _window_grid(gray, window, step):
+    """(ny, nx, window, window) strided view of the overlapping windows of a 2D image."""
+    return np.lib.stride_tricks.sliding_window_view(gray, (window, window))[::step, ::step]
+
+def _parabolic_offset(left, center, right):
+    """Sub-pixel vertex offset (-0.5..0.5) of a parabola through three samples."""
+    denom = left - 2 * center + right
+    safe = np.abs(denom) > PHASE_LOCAL_EPS
+    return np.where(safe, 0.5 * (left - right) / np.where(safe, denom, 1), 0).clip(-0.5, 0.5)
 
+def batched_phase_correlation(a, b, window=None):
+    """
+    Phase correlation of every window pair in two (n, h, w) stacks with one rfft2
+    per stack. Windows are mean-removed and multiplied by window (e.g. Hanning).
+    Returns (dy, dx, response): shift of b relative to a (sub-pixel, same sign
+    convention as cv2.phaseCorrelate) and the normalized peak height (0-1).
+    """
+    n, h, w = a.shape
+    a = a - a.mean(axis=(1, 2), keepdims=True)
+    b = b - b.mean(axis=(1, 2), keepdims=True)
+    if window is not None:
+        a *= window
+        b *= window
+    Fa = rfft2(a, axes=(-2, -1), workers=FFT_WORKERS)
+    Fb = rfft2(b, axes=(-2, -1), workers=FFT_WORKERS)
+    R = Fb * np.conj(Fa)
+    R /= np.abs(R) + PHASE_LOCAL_EPS
+    r = irfft2(R, s=(h, w), axes=(-2, -1), workers=FFT_WORKERS)
+    
+    idx = r.reshape(n, -1).argmax(axis=1)
+    py, px = np.divmod(idx, w)
+    k = np.arange(n)
+    response = r[k, py, px]
+    dy = py + _parabolic_offset(r[k, (py - 1) % h, px], response, r[k, (py + 1) % h, px])
+    dx = px + _parabolic_offset(r[k, py, (px - 1) % w], response, r[k, py, (px + 1) % w])
+    # Peaks past the middle are negative shifts (circular correlation)
+    dy = (dy + h / 2) % h - h / 2
+    dx = (dx + w / 2) % w - w / 2
+    return dy, dx, response
+
+def local_phase_correlation(ctx, window=PHASE_LOCAL_WINDOW, step=PHASE_LOCAL_STEP, batch=PHASE_LOCAL_BATCH,
+                            min_response=PHASE_LOCAL_MIN_RESPONSE, pixel_scale=1.0):
+    """
+    Dense displacement field of the sample against the reference: Hanning-windowed
+    phase correlation over overlapping windows of the structure images, computed in
+    stacked batches. pixel_scale converts shifts to original-image pixels when ctx
+    holds downscaled images (tiled mosaics, triage levels).
+    Returns dict with 'shift' (ny, nx, 2) as (dx, dy) px, 'response', 'magnitude',
+    'valid' (response >= min_response), the grid geometry and summary stats
+    ('max_shift', 'mean_shift', 'shift_variance', 'reliable_fraction').
+    """
+    ref = ctx.structure('ref')
+    sample = ctx.structure('sample')
+    h, w = ref.shape[:2]
+    window = int(max(8, min(window, h, w)))
+    step = int(max(1, step))
+    grid_ref = _window_grid(ref, window, step)
+    grid_sample = _window_grid(sample, window, step)
+    ny, nx = grid_ref.shape[:2]
+    hann = hanning_window(window)
+    # Masked region: only windows (almost) inside it are correlated
+    mask = ctx.valid('structure')
+    inside = None
+    if mask is not None:
+        inside = mask_coverage(mask, np.arange(nx) * step, np.arange(ny) * step, window, window) >= MASK_MIN_COVERAGE
+    
+    shift = np.zeros((ny, nx, 2), np.float32)
+    response = np.zeros((ny, nx), np.float32)
+    rows = max(1, int(batch) // nx)
+    for i in range(0, ny, rows):
+        a = grid_ref[i:i + rows].reshape(-1, window, window)
+        b = grid_sample[i:i + rows].reshape(-1, window, window)
+        k = a.shape[0] // nx
+        sel = slice(None) if inside is None else inside[i:i + k].ravel()
+        if inside is not None and not sel.any():
+            continue
+        out = np.zeros((3, k * nx), np.float32)
+        out[:, sel] = batched_phase_correlation(a[sel].astype(np.float32), b[sel].astype(np.float32), hann)
+        dy, dx, resp = out.reshape(3, k, nx)
+        shift[i:i + k, :, 0] = dx
+        shift[i:i + k, :, 1] = dy
+        response[i:i + k] = resp
+    
+    shift *= pixel_scale
+    magnitude = np.hypot(shift[..., 0], shift[..., 1])
+    valid = response >= min_response
+    if inside is not None:
+        valid &= inside
+    if valid.any():
+        vs = shift[valid]
+        max_shift = float(magnitude[valid].max())
+        mean_shift = vs.mean(axis=0)
+        shift_variance = float(vs.var(axis=0).sum())
+    else:
+        max_shift, mean_shift, shift_variance = 0.0, np.zeros(2, np.float32), 0.0
+    
+    return {
+        'shift': shift,
+        'response': response,
+        'magnitude': magnitude,
+        'valid': valid,
+        'window': window,
+        'step': step,
+        'shape': (h, w),
+        'pixel_scale': pixel_scale,
+        'max_shift': max_shift,
+        'mean_shift': (float(mean_shift[0]), float(mean_shift[1])),
+        'shift_variance': shift_variance,
+        'reliable_fraction': float(valid.mean()),
+        'mean_response': float(response.mean()),
+    }
+
+def displacement_heatmap(field):
+    """
+    Full-size float32 map of the local shift magnitude (px), interpolated between
+    window centres; unreliable windows count as 0.
+    """
+    mag = np.where(field['valid'], field['magnitude'], 0).astype(np.float32)
+    h, w = field['shape']
+    ny, nx = mag.shape
+    step, half = field['step'], field['window'] // 2
+    span_h, span_w = (ny - 1) * step + 1, (nx - 1) * step + 1
+    grid = cv2.resize(mag, (span_w, span_h), interpolation=cv2.INTER_LINEAR)
+    return cv2.copyMakeBorder(grid, half, h - half - span_h, half, w - half - span_w, cv2.BORDER_REPLICATE)
+
+def plot_displacement_field(field, sample_gray, out_path, tr=None):
+    """Distortion heatmap (shift magnitude) over the sample with shift vectors of the reliable windows."""
+    label = tr if tr else (lambda k: {'phase_local_heatmap_title': 'Local Shift Magnitude',
+                                      'shift_magnitude_px': 'Shift (px)'}.get(k, k))
+    heat = displacement_heatmap(field)
+    h, w = field['shape']
+    
     fig, ax = plt.subplots(figsize=(6.5, 5))
-    im = ax.imshow(log_mag, cmap='hot', aspect='auto')
+    ax.imshow(sample_gray, cmap='gray', aspect='equal')
+    im = ax.imshow(heat, cmap='inferno', alpha=0.6, aspect='equal', vmin=0, vmax=max(field['max_shift'], 1e-3))
     cbar = fig.colorbar(im, ax=ax, shrink=0.85)
-    cbar.set_label('Log Magnitude', fontsize=9)
+    cbar.set_label(label('shift_magnitude_px'), fontsize=9)
+    
+    ny, nx = field['magnitude'].shape
+    stride = max(1, int(np.ceil(max(ny, nx) / PHASE_LOCAL_MAX_ARROWS)))
+    ys = field['window'] // 2 + field['step'] * np.arange(0, ny, stride)
+    xs = field['window'] // 2 + field['step'] * np.arange(0, nx, stride)
+    sub = (slice(None, None, stride), slice(None, None, stride))
+    valid = field['valid'][sub]
+    gx, gy = np.meshgrid(xs, ys)
+    u, v = field['shift'][sub][..., 0], field['shift'][sub][..., 1]
+    if valid.any():
+        ax.quiver(gx[valid], gy[valid], u[valid], v[valid], color='cyan', angles='xy', pivot='mid', width=0.003)
+    
+    ax.set_xlim(0, w)
+    ax.set_ylim(h, 0)
+    ax.axis('off')
+    ax.set_title(label('phase_local_heatmap_title'), fontsize=11, fontweight='bold')
+    fig.tight_layout()
+    fig.savefig(out_path, dpi=180, bbox_inches='tight')
+    plt.close(fig)
+
 
-    # Mark peaks
-    for i, p in enumerate(peaks):
-        ax.plot(p['px'], p['py'], 'g^', markersize=8, markeredgecolor='white', markeredgewidth=0.5)
-        ax.annotate(f"P{i+1}", (p['px'], p['py']), textcoords="offset points",
-                    xytext=(5, -8), fontsize=7, color='lime', fontweight='bold')
+# =================================================================================================
+# REPEAT UNIT ANALYSIS
+# =================================================================================================
 
-    ax.set_xlabel('Frequency X', fontsize=9)
-    ax.set_ylabel('Frequency Y', fontsize=9)
-    ax.set_title(title, fontsize=11, fontweight='bold')
+REPEAT_MIN_PERIOD = 16           # px; shorter lags are yarn/thread texture, not the design repeat
+REPEAT_TEXTURE_SIGMA = 2.0       # px; Gaussian low-pass on the autocorrelation against weave texture
+REPEAT_MIN_CORRELATION = 0.3     # autocorrelation a lag needs to count as a repeat
+REPEAT_MIN_OVERLAP = 0.25        # masked region: lags with less window overlap than this are ignored
+REPEAT_MIN_ANGLE = 20.0          # degrees between the two period vectors
+REPEAT_REFINE_RADIUS = 0.15      # period refinement search, fraction of the period length
+REPEAT_LATTICE_RANGE = 4         # |i|, |j| searched for axis-aligned lattice vectors
+REPEAT_MAX_TILES = 4096          # beyond this, neighbouring repeats are grouped into one tile
+REPEAT_WORST = 5
+
+def _autocorrelation_peaks(ac, shape, min_period=REPEAT_MIN_PERIOD, min_corr=REPEAT_MIN_CORRELATION):
+    """
+    Maxima of an fftshifted autocorrelation over a min_period neighbourhood (so the
+    slope of the zero-lag hump does not qualify), for lags that fit at least twice
+    into shape. Returns a list of (dx, dy, corr) with sub-pixel lags, folded into
+    the upper half plane (the autocorrelation is point-symmetric), strongest first.
+    """
+    H, W = ac.shape
+    cy, cx = H // 2, W // 2
+    h, w = shape
+    ry, rx = min(h // 2, cy - 1), min(w // 2, cx - 1)
+    win = ac[cy - ry - 1:cy + ry + 2, cx - rx - 1:cx + rx + 2]
+    k = int(min_period) | 1
+    peak_mask = win >= cv2.dilate(win, np.ones((k, k), np.uint8))
+    peak_mask &= win >= min_corr
+    peak_mask[[0, -1], :] = False
+    peak_mask[:, [0, -1]] = False
+    rows, cols = np.nonzero(peak_mask)
+    dy = rows - (ry + 1)
+    dx = cols - (rx + 1)
+    keep = ((dy > 0) | ((dy == 0) & (dx > 0))) & (np.hypot(dx, dy) >= min_period)
+    rows, cols, dy, dx = rows[keep], cols[keep], dy[keep], dx[keep]
+    c = win[rows, cols]
+    fy = dy + _parabolic_offset(win[rows - 1, cols], c, win[rows + 1, cols])
+    fx = dx + _parabolic_offset(win[rows, cols - 1], c, win[rows, cols + 1])
+    order = np.argsort(-c, kind='stable')
+    return [(float(fx[i]), float(fy[i]), float(c[i])) for i in order]
+
+def _refine_period(v, gray, radius):
+    """
+    Refine a period vector on the image itself: normalized cross-correlation of the
+    image with its copy shifted by v +/- radius (cv2.matchTemplate), peak to
+    sub-pixel. Removes the wrap-around bias of the circular autocorrelation.
+    """
+    h, w = gray.shape[:2]
+    vx, vy = int(round(v[0])), int(round(v[1]))
+    r = int(radius)
+    # Template rows/cols whose shifted copies (+/- r) stay inside the image
+    x0, x1 = max(0, r - vx), min(w, w - vx - r)
+    y0, y1 = max(0, r - vy), min(h, h - vy - r)
+    if x1 - x0 < 2 * r + 1 or y1 - y0 < 2 * r + 1:
+        return float(v[0]), float(v[1])
+    tmpl = gray[y0:y1, x0:x1]
+    search = gray[y0 + vy - r:y1 + vy + r, x0 + vx - r:x1 + vx + r]
+    ncc = cv2.matchTemplate(search, tmpl, cv2.TM_CCOEFF_NORMED)
+    py, px = np.unravel_index(int(ncc.argmax()), ncc.shape)
+    dy = _parabolic_offset(ncc[py - 1, px], ncc[py, px], ncc[py + 1, px]) if 0 < py < ncc.shape[0] - 1 else 0.0
+    dx = _parabolic_offset(ncc[py, px - 1], ncc[py, px], ncc[py, px + 1]) if 0 < px < ncc.shape[1] - 1 else 0.0
+    return float(vx + px - r + dx), float(vy + py - r + dy)
+
+def repeat_unit(img, min_period=REPEAT_MIN_PERIOD, min_corr=REPEAT_MIN_CORRELATION, sigma=REPEAT_TEXTURE_SIGMA):
+    """
+    Repeat unit of a pattern (ndarray or PatternImage) from the autocorrelation of
+    its shared spectrum: the two shortest strong, non-collinear lags are the period
+    vectors (refined on the image); the axis-aligned repeat (period_x, period_y) is
+    the shortest horizontal/vertical lattice vector, so half-drop and brick repeats
+    get their true rectangular unit.
+    Returns dict with 'vectors', 'correlation', 'period_x', 'period_y' or None if
+    the image shows no repeat.
+    """
+    img = as_pattern_image(img)
+    spec = img.spectrum
+    ac = spectrum_autocorrelation(spec, sigma)
+    overlap = None
+    if img.mask is not None:
+        # Masked region: divide out the window overlap so long lags are not penalised
+        overlap = window_autocorrelation(mask_taper(img.mask), spec['fft_shape'])
+    elif tuple(spec['shape']) != tuple(spec['fft_shape']):
+        # Same for the zero padding of the shared spectrum
+        overlap = padding_overlap(spec['shape'], spec['fft_shape'])
+    if overlap is not None:
+        ac = np.divide(ac, overlap, out=np.zeros_like(ac), where=overlap >= REPEAT_MIN_OVERLAP)
+    peaks = _autocorrelation_peaks(ac, spec['shape'], min_period, min_corr)
+    if not peaks:
+        return None
+    # Strong lags only (relative to the best repeat), shortest first
+    best = peaks[0][2]
+    strong = sorted((p for p in peaks if p[2] >= 0.5 * best), key=lambda p: math.hypot(p[0], p[1]))
+    v1 = strong[0]
+    sin_min = math.sin(math.radians(REPEAT_MIN_ANGLE))
+    v2 = None
+    for p in strong[1:]:
+        cross = abs(v1[0] * p[1] - v1[1] * p[0])
+        if cross >= sin_min * math.hypot(v1[0], v1[1]) * math.hypot(p[0], p[1]):
+            v2 = p
+            break
+    if v2 is None:
+        return None
+    gray = img.gray
+    if img.mask is not None:
+        # Flat fill outside the region so its edge does not pull the refinement
+        gray = gray.copy()
+        gray[img.mask == 0] = int(round(cv2.mean(img.gray, mask=img.mask)[0]))
+    vectors = [_refine_period(v, gray, max(2, REPEAT_REFINE_RADIUS * math.hypot(v[0], v[1]))) for v in (v1, v2)]
+
+    r = np.arange(-REPEAT_LATTICE_RANGE, REPEAT_LATTICE_RANGE + 1)
+    i, j = [g.ravel() for g in np.meshgrid(r, r)]
+    lx = i * vectors[0][0] + j * vectors[1][0]
+    ly = i * vectors[0][1] + j * vectors[1][1]
+    h, w = spec['shape']
+    horiz = np.abs(lx[(np.abs(ly) <= 1.5) & (np.abs(lx) >= min_period)])
+    vert = np.abs(ly[(np.abs(lx) <= 1.5) & (np.abs(ly) >= min_period)])
+    if horiz.size == 0 or vert.size == 0 or horiz.min() > w / 2 or vert.min() > h / 2:
+        return None
+    return {
+        'vectors': vectors,
+        'correlation': [v1[2], v2[2]],
+        'period_x': float(horiz.min()),
+        'period_y': float(vert.min()),
+    }
+
+def _repeat_stack(img, ys, xs, th, tw):
+    """(len(ys) * len(xs), th, tw) float32 stack of the tiles at the given origins."""
+    return np.stack([img[y:y + th, x:x + tw] for y in ys for x in xs]).astype(np.float32)
+
+def _stack_box_mean(x, k):
+    """k x k box mean of every tile in an (n, h, w) stack, 'valid' part only (integral image)."""
+    s = np.zeros((x.shape[0], x.shape[1] + 1, x.shape[2] + 1), np.float64)
+    np.cumsum(np.cumsum(x, axis=1, dtype=np.float64), axis=2, out=s[:, 1:, 1:])
+    return ((s[:, k:, k:] - s[:, :-k, k:] - s[:, k:, :-k] + s[:, :-k, :-k]) / (k * k)).astype(np.float32)
+
+def batched_tile_scores(a, b, data_range=255.0, win_size=SSIM_WIN_SIZE):
+    """
+    Tile-against-tile scores of two (n, h, w) stacks in one vectorized pass:
+    mean local SSIM (uniform window, same constants as fast_ssim) and normalized
+    cross-correlation. Returns (ssim, ncc), each of shape (n,).
+    """
+    # Per-tile centering keeps the float32 moments precise
+    oa = a.mean(axis=(1, 2), keepdims=True, dtype=np.float64).astype(np.float32)
+    ob = b.mean(axis=(1, 2), keepdims=True, dtype=np.float64).astype(np.float32)
+    a = a - oa
+    b = b - ob
+    ea = (a * a).sum(axis=(1, 2), dtype=np.float64)
+    eb = (b * b).sum(axis=(1, 2), dtype=np.float64)
+    den = np.sqrt(ea * eb)
+    # Flat tile pairs count as identical when both are flat, as uncorrelated otherwise
+    ncc = np.where(den > 0, (a * b).sum(axis=(1, 2), dtype=np.float64) / np.where(den > 0, den, 1),
+                   ((ea == 0) & (eb == 0)) * 1.0)
+
+    n = win_size * win_size
+    cov_norm = n / (n - 1.0)
+    c1 = (SSIM_K1 * data_range) ** 2
+    c2 = (SSIM_K2 * data_range) ** 2
+    mu_a, mu_b = _stack_box_mean(a, win_size), _stack_box_mean(b, win_size)
+    var_a = _stack_box_mean(a * a, win_size) - mu_a * mu_a
+    var_b = _stack_box_mean(b * b, win_size) - mu_b * mu_b
+    cov = _stack_box_mean(a * b, win_size) - mu_a * mu_b
+    cs = (2 * cov_norm * cov + c2) / (cov_norm * (var_a + var_b) + c2)
+    # Luminance term on the un-centered local means
+    mx, my = mu_a + oa, mu_b + ob
+    lum = (2 * mx * my + c1) / (mx * mx + my * my + c1)
+    ssim = (lum * cs).mean(axis=(1, 2))
+    return ssim, ncc
+
+REPEAT_BATCH_PIXELS = 1 << 22    # tile pixels scored per batch; bounds the working memory
+
+def repeat_unit_analysis(ctx, unit=None, worst=REPEAT_WORST, max_tiles=REPEAT_MAX_TILES, pixel_scale=1.0):
+    """
+    Repeat-aligned comparison. The repeat unit is estimated from the reference
+    spectrum (the FFT fourier_domain_analysis() already uses), both structure
+    images are cut into repeat tiles at the same positions and scored tile against
+    tile with batched_tile_scores(). pixel_scale converts reported sizes to
+    original-image pixels when ctx holds downscaled images.
+    Returns dict with 'unit', the tile grid ('xs', 'ys', 'tile_w', 'tile_h'),
+    'ssim' (0-100) and 'ncc' score grids of shape (ny, nx) (NaN for repeats outside a
+    masked region), the 'worst' repeats and summary stats, or None when the
+    reference shows no repeat.
+    """
+    unit = unit or repeat_unit(ctx.ref)
+    if unit is None:
+        return None
+    ref = ctx.structure('ref')
+    sample = ctx.structure('sample')
+    h, w = ref.shape[:2]
+    # Small units on large images: group neighbouring repeats into one tile
+    group = max(1, int(math.ceil(math.sqrt((w / unit['period_x']) * (h / unit['period_y']) / max_tiles))))
+    px, py = unit['period_x'] * group, unit['period_y'] * group
+    tw, th = int(px), int(py)
+    nx, ny = max(1, int(w // px)), max(1, int(h // py))
+    xs = [min(int(round(i * px)), w - tw) for i in range(nx)]
+    ys = [min(int(round(i * py)), h - th) for i in range(ny)]
+
+    # Masked region: repeats reaching outside it are not scored (NaN)
+    mask = ctx.valid('structure')
+    inside = np.ones((ny, nx), bool)
+    if mask is not None:
+        inside = mask_coverage(mask, xs, ys, tw, th) >= MASK_MIN_COVERAGE
+        if not inside.any():
+            return None
+
+    ssim = np.full((ny, nx), np.nan, np.float32)
+    ncc = np.full((ny, nx), np.nan, np.float32)
+    rows = max(1, REPEAT_BATCH_PIXELS // (nx * tw * th))
+    for i in range(0, ny, rows):
+        sel = ys[i:i + rows]
+        keep = inside[i:i + len(sel)]
+        if not keep.any():
+            continue
+        flat = keep.ravel()
+        s, c = batched_tile_scores(_repeat_stack(ref, sel, xs, th, tw)[flat],
+                                   _repeat_stack(sample, sel, xs, th, tw)[flat])
+        ssim[i:i + len(sel)][keep] = s * 100
+        ncc[i:i + len(sel)][keep] = c
+
+    # Worst repeats: lowest SSIM among those below the typical (median) repeat
+    worst_list = []
+    scored = ssim[inside]
+    median = float(np.median(scored))
+    for k in np.argsort(np.where(inside, ssim, np.inf), axis=None, kind='stable')[:worst]:
+        r, c = divmod(int(k), nx)
+        if not inside[r, c] or ssim[r, c] >= median:
+            break
+        worst_list.append({
+            'row': r,
+            'col': c,
+            'bbox': [int(round(v * pixel_scale)) for v in (xs[c], ys[r], tw, th)],
+            'ssim': float(ssim[r, c]),
+            'ncc': float(ncc[r, c]),
+        })
+
+    return {
+        'unit': unit,
+        'group': group,
+        'period_px': (unit['period_x'] * pixel_scale, unit['period_y'] * pixel_scale),
+        'xs': xs,
+        'ys': ys,
+        'tile_w': tw,
+        'tile_h': th,
+        'ssim': ssim,
+        'ncc': ncc,
+        'worst': worst_list,
+        'tiles': int(scored.size),
+        'mean_score': float(scored.mean()),
+        'min_score': float(scored.min()),
+        'median_score': median,
+        'mean_ncc': float(ncc[inside].mean()),
+    }
+
+def plot_repeat_scores(rep, sample_gray, out_path, tr=None):
+    """Per-repeat SSIM grid over the sample; the worst repeats are outlined and numbered."""
+    label = tr if tr else (lambda k: {'repeat_map_title': 'Per-Repeat Similarity',
+                                      'repeat_score_label': 'SSIM (%)'}.get(k, k))
+    xs, ys, tw, th = rep['xs'], rep['ys'], rep['tile_w'], rep['tile_h']
+    h, w = sample_gray.shape[:2]
+
+    fig, ax = plt.subplots(figsize=(6.5, 5))
+    ax.imshow(sample_gray, cmap='gray', aspect='equal')
+    im = ax.imshow(rep['ssim'], cmap='RdYlGn', alpha=0.5, vmin=min(rep['min_score'], 90.0), vmax=100.0,
+                   interpolation='nearest', aspect='equal',
+                   extent=[xs[0], xs[-1] + tw, ys[-1] + th, ys[0]])
+    cbar = fig.colorbar(im, ax=ax, shrink=0.85)
+    cbar.set_label(label('repeat_score_label'), fontsize=9)
+    for x in xs + [xs[-1] + tw]:
+        ax.axvline(x, color='white', linewidth=0.3, alpha=0.6)
+    for y in ys + [ys[-1] + th]:
+        ax.axhline(y, color='white', linewidth=0.3, alpha=0.6)
+    for i, wr in enumerate(rep['worst']):
+        x0, y0 = xs[wr['col']], ys[wr['row']]
+        ax.add_patch(plt.Rectangle((x0, y0), tw, th, fill=False, edgecolor='red', linewidth=1.5))
+        ax.annotate(f"W{i+1}", (x0, y0), textcoords="offset points", xytext=(2, -9),
+                    fontsize=7, color='red', fontweight='bold')
+
+    ax.set_xlim(0, w)
+    ax.set_ylim(h, 0)
+    ax.axis('off')
+    ax.set_title(label('repeat_map_title'), fontsize=11, fontweight='bold')
     fig.tight_layout()
     fig.savefig(out_path, dpi=180, bbox_inches='tight')
     plt.close(fig)
@@ -536,30 +1627,159 @@ def plot_fft_spectrum(fda_result, out_path, title='2D FFT Power Spectrum'):
 # GLCM TEXTURE ANALYSIS
 # =================================================================================================
 
-def glcm_texture_analysis(img_bgr):
+GLCM_LEVELS = 64
+GLCM_DISTANCES = (1,)
+GLCM_ANGLES = (0, np.pi/4, np.pi/2, 3*np.pi/4)
+GLCM_TILE = 64                     # px per side of a texture-map tile
+GLCM_PROPS = ('contrast', 'dissimilarity', 'homogeneity', 'energy', 'correlation', 'ASM')
+
+def _glcm_offsets(distances, angles):
+    """(d_row, d_col) pixel offsets, same convention as skimage.feature.graycomatrix."""
+    return [(int(round(math.sin(a) * d)), int(round(math.cos(a) * d))) for d in distances for a in angles]
+
+def _glcm_pairs(q, dr, dc):
+    """Views (first, second) of every in-bounds pixel pair q[r, c] -> q[r+dr, c+dc], plus the first pixel's origin."""
+    h, w = q.shape
+    r0, c0 = max(0, -dr), max(0, -dc)
+    r1, c1 = h - max(0, dr), w - max(0, dc)
+    return q[r0:r1, c0:c1], q[r0+dr:r1+dr, c0+dc:c1+dc], (r0, c0)
+
+def _glcm_pair_mask(mask, dr, dc):
+    """uint8 mask of the pairs from _glcm_pairs() whose two pixels are both inside the region."""
+    first, second, _ = _glcm_pairs(mask, dr, dc)
+    return cv2.bitwise_and(first, second)
+
+def glcm_matrix(q, levels=GLCM_LEVELS, distances=GLCM_DISTANCES, angles=GLCM_ANGLES, symmetric=True, normed=True,
+                mask=None):
+    """
+    Co-occurrence matrices of a quantized uint8 image (values < levels) for every
+    distance/angle in one call, one 2-D histogram per offset. With a validity mask
+    only pairs with both pixels inside it are counted.
+    Returns (levels, levels, n_dist, n_angle) like skimage's graycomatrix.
+    """
+    offsets = _glcm_offsets(distances, angles)
+    P = np.zeros((levels, levels, len(offsets)), dtype=np.float64)
+    for k, (dr, dc) in enumerate(offsets):
+        first, second, _ = _glcm_pairs(q, dr, dc)
+        pair_mask = None if mask is None else _glcm_pair_mask(mask, dr, dc)
+        # 2-D histogram of the (first, second) pairs; cv2 is ~3x faster than np.bincount here
+        P[:, :, k] = cv2.calcHist([np.ascontiguousarray(first), np.ascontiguousarray(second)], [0, 1], pair_mask,
+                                  [levels, levels], [0, levels, 0, levels])
+    if symmetric:
+        P += P.transpose(1, 0, 2)
+    if normed:
+        sums = P.sum(axis=(0, 1), keepdims=True)
+        sums[sums == 0] = 1
+        P /= sums
+    return P.reshape(levels, levels, len(distances), len(angles))
+
+def glcm_properties(P):
     """
-    Compute GLCM texture properties for a single image.
-    Returns dict with property values and the GLCM matrix.
+    The six graycoprops properties in closed form for co-occurrence matrices of
+    shape (levels, levels, ...). Each matrix is normalized first; returns
+    {prop: array of shape P.shape[2:]}.
     """
-    gray = cv2.cvtColor(composite_over_black(img_bgr), cv2.COLOR_BGR2GRAY)
+    levels = P.shape[0]
+    P = P.astype(np.float64, copy=True)
+    sums = P.sum(axis=(0, 1), keepdims=True)
+    sums[sums == 0] = 1
+    P /= sums
+
+    I, J = np.ogrid[0:levels, 0:levels]
+    d2 = (I - J) ** 2.0
+    weigh = lambda wts: np.tensordot(wts, P, axes=([0, 1], [0, 1]))
+    asm = np.sum(P ** 2, axis=(0, 1))
+
+    lv = np.arange(levels, dtype=np.float64)
+    pi_, pj_ = P.sum(axis=1), P.sum(axis=0)                  # marginals, (levels, ...)
+    mu_i = np.tensordot(lv, pi_, axes=(0, 0))
+    mu_j = np.tensordot(lv, pj_, axes=(0, 0))
+    var_i = np.tensordot(lv ** 2, pi_, axes=(0, 0)) - mu_i ** 2
+    var_j = np.tensordot(lv ** 2, pj_, axes=(0, 0)) - mu_j ** 2
+    cov = weigh(np.outer(lv, lv)) - mu_i * mu_j
+    std_i = np.sqrt(np.maximum(var_i, 0))
+    std_j = np.sqrt(np.maximum(var_j, 0))
+    flat = (std_i < 1e-15) | (std_j < 1e-15)
+    correlation = np.where(flat, 1.0, cov / np.where(flat, 1.0, std_i * std_j))
+
+    return {
+        'contrast': weigh(d2),
+        'dissimilarity': weigh(np.sqrt(d2)),
+        'homogeneity': weigh(1.0 / (1.0 + d2)),
+        'energy': np.sqrt(asm),
+        'correlation': correlation,
+        'ASM': asm,
+    }
+
+def glcm_texture_maps(q, levels=GLCM_LEVELS, tile=GLCM_TILE, distances=GLCM_DISTANCES, angles=GLCM_ANGLES,
+                      mask=None):
+    """
+    Per-tile GLCM property maps (each tile x tile block gets its own symmetric
+    co-occurrence matrices; properties are averaged over offsets). A pair belongs
+    to the tile of its first pixel. Tiles are processed one row band at a time so
+    memory stays at (tiles per row x levels^2). With a validity mask, pairs leaving
+    the region are dropped and tiles with no pair left are NaN.
+    Returns {prop: (n_tiles_y, n_tiles_x) float array, 'tile': tile}.
+    """
+    h, w = q.shape
+    ty, tx = -(-h // tile), -(-w // tile)
+    offsets = _glcm_offsets(distances, angles)
+    maps = {k: np.zeros((ty, tx), dtype=np.float64) for k in GLCM_PROPS}
+    ll = levels * levels
+    for dr, dc in offsets:
+        first, second, (r0, c0) = _glcm_pairs(q, dr, dc)
+        pair_mask = None if mask is None else _glcm_pair_mask(mask, dr, dc)
+        pair_idx_cols = (c0 + np.arange(first.shape[1])) // tile
+        for band in range(ty):
+            y0 = max(band * tile - r0, 0)
+            y1 = min((band + 1) * tile - r0, first.shape[0])
+            if y1 <= y0:
+                continue
+            idx = first[y0:y1].astype(np.int32) * levels + second[y0:y1]
+            idx += (pair_idx_cols * ll)[None, :].astype(np.int32)
+            if pair_mask is None:
+                idx = idx.ravel()
+            else:
+                idx = idx[pair_mask[y0:y1] > 0]
+                if not idx.size:
+                    for k in GLCM_PROPS:
+                        maps[k][band] = np.nan
+                    continue
+            P = np.bincount(idx, minlength=tx * ll).reshape(tx, levels, levels).astype(np.float64)
+            P += P.transpose(0, 2, 1)
+            props = glcm_properties(np.moveaxis(P, 0, -1))
+            if pair_mask is not None:
+                empty = P.sum(axis=(1, 2)) == 0
+                for k in GLCM_PROPS:
+                    props[k][empty] = np.nan
+            for k in GLCM_PROPS:
+                maps[k][band] += props[k]
+    for k in GLCM_PROPS:
+        maps[k] /= len(offsets)
+    maps['tile'] = tile
+    return maps
+
+def glcm_texture_analysis(img_bgr, distances=GLCM_DISTANCES, angles=GLCM_ANGLES, levels=GLCM_LEVELS, tile=None):
+    """
+    Compute GLCM texture properties for a single image (ndarray or PatternImage).
+    Returns dict with property values (mean over all distances/angles), the GLCM
+    matrix, and per-tile property maps when tile is given.
+    """
+    img = as_pattern_image(img_bgr)
+    gray = img.gray
     # Quantize to fewer levels for meaningful GLCM
-    gray_q = (gray // 4).astype(np.uint8)  # 64 levels
-    
-    # Compute GLCM at multiple angles, distance=1
-    distances = [1]
-    angles = [0, np.pi/4, np.pi/2, 3*np.pi/4]
-    glcm = graycomatrix(gray_q, distances=distances, angles=angles, levels=64, symmetric=True, normed=True)
+    gray_q = (gray // (256 // levels)).astype(np.uint8)
     
-    # Extract properties (mean across all angles)
-    props = {}
-    for prop_name in ['contrast', 'dissimilarity', 'homogeneity', 'energy', 'correlation', 'ASM']:
-        vals = graycoprops(glcm, prop_name)
-        props[prop_name] = float(np.mean(vals))
+    glcm = glcm_matrix(gray_q, levels, distances, angles, symmetric=True, normed=True, mask=img.mask)
+    props = {k: float(np.mean(v)) for k, v in glcm_properties(glcm).items()}
     
-    return {
+    result = {
         'properties': props,
         'glcm_matrix': glcm[:, :, 0, 0],  # First distance, first angle for visualization
     }
+    if tile:
+        result['maps'] = glcm_texture_maps(gray_q, levels, tile, distances, angles, mask=img.mask)
+    return result
 
 
 def plot_glcm_comparison(ref_props, sam_props, out_path, tr=None):
@@ -598,24 +1818,40 @@ def plot_glcm_comparison(ref_props, sam_props, out_path, tr=None):
     plt.close(fig)
 
 
+GLCM_HEATMAP_FIG_SIZE = (1800, 720)     # px
+
 def plot_glcm_heatmaps(ref_glcm_matrix, sam_glcm_matrix, out_path):
-    """Plot side-by-side GLCM matrix heatmaps for reference and sample."""
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(10, 4))
-    
-    im1 = ax1.imshow(ref_glcm_matrix, cmap='hot', aspect='auto')
-    ax1.set_title('Reference GLCM', fontsize=10, fontweight='bold')
-    ax1.set_xlabel('Gray Level j', fontsize=8)
-    ax1.set_ylabel('Gray Level i', fontsize=8)
-    fig.colorbar(im1, ax=ax1, shrink=0.8)
+    """Render side-by-side GLCM matrix heatmaps for reference and sample (raster renderer, no pyplot)."""
+    panels = [heatmap_panel(ref_glcm_matrix, 'Reference GLCM', cmap='hot'),
+              heatmap_panel(sam_glcm_matrix, 'Sample GLCM', cmap='hot')]
+    return save_figure(render_figure(panels, GLCM_HEATMAP_FIG_SIZE), out_path)
+
+
+def plot_glcm_texture_maps(ref_maps, sam_maps, out_path, props=('contrast', 'homogeneity'), tr=None):
+    """Per-tile GLCM property maps: reference, sample and absolute difference for each property."""
+    if tr is None:
+        tr = lambda k, d=None: (d if d else k.replace('_', ' ').title())
     
-    im2 = ax2.imshow(sam_glcm_matrix, cmap='hot', aspect='auto')
-    ax2.set_title('Sample GLCM', fontsize=10, fontweight='bold')
-    ax2.set_xlabel('Gray Level j', fontsize=8)
-    ax2.set_ylabel('Gray Level i', fontsize=8)
-    fig.colorbar(im2, ax=ax2, shrink=0.8)
+    fig, axes = plt.subplots(len(props), 3, figsize=(10, 3.0 * len(props)), squeeze=False)
+    for row, prop in enumerate(props):
+        ref_m, sam_m = ref_maps[prop], sam_maps[prop]
+        if ref_m.shape != sam_m.shape:
+            sam_m = cv2.resize(sam_m.astype(np.float32), (ref_m.shape[1], ref_m.shape[0]), interpolation=cv2.INTER_NEAREST)
+        vmin = float(min(np.nanmin(ref_m), np.nanmin(sam_m)))
+        vmax = float(max(np.nanmax(ref_m), np.nanmax(sam_m)))
+        label = tr(f'glcm_{prop.lower()}')
+        for col, (m, title, cmap, rng) in enumerate([
+                (ref_m, f'Reference - {label}', 'viridis', (vmin, vmax)),
+                (sam_m, f'Sample - {label}', 'viridis', (vmin, vmax)),
+                (np.abs(ref_m - sam_m), f'|Difference| - {label}', 'hot', (None, None))]):
+            ax = axes[row][col]
+            im = ax.imshow(m, cmap=cmap, vmin=rng[0], vmax=rng[1], interpolation='nearest')
+            ax.set_title(title, fontsize=9, fontweight='bold')
+            ax.axis('off')
+            fig.colorbar(im, ax=ax, shrink=0.8)
     
     fig.tight_layout()
-    fig.savefig(out_path, dpi=180, bbox_inches='tight')
+    fig.savefig(out_path, dpi=150, bbox_inches='tight')
     plt.close(fig)
 
 
@@ -623,21 +1859,50 @@ def plot_glcm_heatmaps(ref_glcm_matrix, sam_glcm_matrix, out_path):
 # PDF GENERATION
 # =================================================================================================
 
-def structural_difference_analysis(ref, sample):
-    # Prepare images (Grayscale -> Resize -> CLAHE)
-    h_target = min(ref.shape[0], sample.shape[0])
-    w_target = min(ref.shape[1], sample.shape[1])
-    
-    # Resize to match smaller dimension (or reference? safely use min)
-    img1 = cv2.resize(ref, (w_target, h_target))
-    img2 = cv2.resize(sample, (w_target, h_target))
-    
-    gray1 = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-    gray2 = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-    
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    normalized1 = clahe.apply(gray1)
-    normalized2 = clahe.apply(gray2)
+DEFECT_MIN_AREA = 50
+
+def filter_components(binary, min_area, intensity=None):
+    """
+    Keep 8-connected components of a binary mask with area >= min_area.
+    A label->keep lookup table is applied in one indexing pass. Returns
+    (filtered uint8 mask, defects) where defects is a table of the surviving
+    components as arrays: 'area' (N,), 'bbox' (N,4 x,y,w,h), 'centroid' (N,2 x,y)
+    and 'mean_intensity' (N,) of `intensity` over each component (0 if not given),
+    sorted by area, largest first.
+    """
+    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    areas = stats[:, cv2.CC_STAT_AREA]
+    keep = areas >= min_area
+    keep[0] = False  # background
+    lut = np.where(keep, 255, 0).astype(np.uint8)
+    filtered = lut[labels]
+
+    ids = np.flatnonzero(keep)
+    if intensity is not None and ids.size:
+        sums = np.bincount(labels.ravel(), weights=np.asarray(intensity, dtype=np.float64).ravel(), minlength=num_labels)
+        mean_intensity = sums[ids] / areas[ids]
+    else:
+        mean_intensity = np.zeros(ids.size, dtype=np.float64)
+    order = np.argsort(-areas[ids], kind='stable')
+    ids = ids[order]
+    defects = {
+        'area': areas[ids].astype(np.int64),
+        'bbox': stats[ids, :4].astype(np.int32),
+        'centroid': centroids[ids],
+        'mean_intensity': mean_intensity[order],
+    }
+    return filtered, defects
+
+def structural_fusion(ctx, min_area=DEFECT_MIN_AREA):
+    """
+    Steps 1-7 of the structural difference analysis (no figures): fuses the
+    intensity, edge, gradient, frequency and SSIM difference masks of the CLAHE
+    images and drops components smaller than min_area px. Returns the
+    intermediate masks and the defect table.
+    """
+    # Prepare images (Grayscale -> Resize to common size -> CLAHE)
+    normalized1 = ctx.clahe('ref')
+    normalized2 = ctx.clahe('sample')
     
     # 1. Simple Difference
     diff_normalized = cv2.absdiff(normalized1, normalized2)
@@ -653,13 +1918,8 @@ def structural_difference_analysis(ref, sample):
     edge_diff_dilated = cv2.dilate(edge_diff, kernel, iterations=2)
     
     # 3. Gradient
-    sobelx1 = cv2.Sobel(normalized1, cv2.CV_64F, 1, 0, ksize=3)
-    sobely1 = cv2.Sobel(normalized1, cv2.CV_64F, 0, 1, ksize=3)
-    gradient1 = np.sqrt(sobelx1**2 + sobely1**2)
-    
-    sobelx2 = cv2.Sobel(normalized2, cv2.CV_64F, 1, 0, ksize=3)
-    sobely2 = cv2.Sobel(normalized2, cv2.CV_64F, 0, 1, ksize=3)
-    gradient2 = np.sqrt(sobelx2**2 + sobely2**2)
+    gradient1 = ctx.gradient('ref', source='clahe')
+    gradient2 = ctx.gradient('sample', source='clahe')
     
     gradient1 = cv2.normalize(gradient1, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
     gradient2 = cv2.normalize(gradient2, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
@@ -670,18 +1930,13 @@ def structural_difference_analysis(ref, sample):
     gradient_cleaned = cv2.morphologyEx(gradient_cleaned, cv2.MORPH_CLOSE, kernel)
     
     # 4. Frequency
-    f1 = np.fft.fft2(normalized1)
-    f2 = np.fft.fft2(normalized2)
-    magnitude1 = np.abs(f1)
-    magnitude2 = np.abs(f2)
-    freq_diff = np.abs(magnitude1 - magnitude2)
-    freq_diff_spatial = np.abs(np.fft.ifft2(freq_diff))
+    freq_diff_spatial = magnitude_difference_spatial(ctx.spectrum('ref'), ctx.spectrum('sample'))
     freq_diff_spatial = cv2.normalize(freq_diff_spatial, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
     _, freq_thresh = cv2.threshold(freq_diff_spatial, 30, 255, cv2.THRESH_BINARY)
     freq_cleaned = cv2.morphologyEx(freq_thresh, cv2.MORPH_OPEN, kernel)
     
     # 5. SSIM
-    _, ssim_diff = ssim(normalized1, normalized2, full=True)
+    _, ssim_diff = ctx.ssim('clahe')
     ssim_diff = (ssim_diff * 255).astype(np.uint8)
     # ssim_diff is similarity map, we want difference
     ssim_diff_inv = 255 - ssim_diff
@@ -699,6 +1954,11 @@ def structural_difference_analysis(ref, sample):
         ssim_cleaned.astype(float) * 0.15
     )
     combined = combined.astype(np.uint8)
+    # Only pixels inside the selected region can be changed
+    valid = ctx.valid('common')
+    if valid is not None:
+        cv2.bitwise_and(combined, valid, dst=combined)
+        cv2.bitwise_and(gradient_cleaned, valid, dst=gradient_cleaned)
     _, combined_thresh = cv2.threshold(combined, 100, 255, cv2.THRESH_BINARY)
     
     kernel_large = np.ones((5, 5), np.uint8)
@@ -706,63 +1966,67 @@ def structural_difference_analysis(ref, sample):
     combined_final = cv2.morphologyEx(combined_final, cv2.MORPH_CLOSE, kernel_large)
     
     # 7. Noise Filtered
-    num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(combined_final, connectivity=8)
-    min_size = 50
-    combined_filtered = np.zeros_like(combined_final)
-    for i in range(1, num_labels):
-        if stats[i, cv2.CC_STAT_AREA] >= min_size:
-            combined_filtered[labels == i] = 255
-            
-    # 8. Pure Differences only (Red overlay)
-    img1_color = cv2.cvtColor(gray1, cv2.COLOR_GRAY2BGR)
-    diff_only = np.zeros_like(img1_color)
-    diff_only[combined_filtered > 0] = [0, 0, 255] # Red BGR
-    
-    # 9. Visualization Compilations
-    # Subplot: Gradient, Combined, Noise Filtered
-    fig1, axes = plt.subplots(1, 3, figsize=(18, 6))
-    
-    axes[0].imshow(gradient_cleaned, cmap='hot')
-    axes[0].set_title('Gradient Magnitude Diff', fontsize=14, fontweight='bold')
-    axes[0].axis('off')
-
-    axes[1].imshow(combined_final, cmap='hot')
-    axes[1].set_title('Combined (All Methods)', fontsize=14, fontweight='bold')
-    axes[1].axis('off')
-
-    axes[2].imshow(combined_filtered, cmap='hot')
-    axes[2].set_title('Noise Filtered', fontsize=14, fontweight='bold')
-    axes[2].axis('off')
-    
-    plt.tight_layout()
-    
-    # Save subplot to buffer
-    buf_subplot = io.BytesIO()
-    plt.savefig(buf_subplot, format='png', bbox_inches='tight', dpi=150)
-    buf_subplot.seek(0)
-    subplot_raw = buf_subplot.read()
-    buf_subplot.seek(0)
-    plt.close(fig1)
-    
-    # Prepare Pure Diff Image (using matplotlib or direct?)
-    # User code used plt for "Pure Differences Only" to add title. We can do that or just layout in ReportLab.
-    # Using PLT ensures consistency with user request "place large image... with title"
-    fig2, ax = plt.subplots(1, 1, figsize=(10, 8))
-    ax.imshow(cv2.cvtColor(diff_only, cv2.COLOR_BGR2RGB))
-    # ax.set_title('Pure Differences Only', fontsize=16, fontweight='bold')
-    ax.axis('off')
-    plt.tight_layout()
+    combined_filtered, defects = filter_components(combined_final, min_area, intensity=combined)
     
-    buf_diff = io.BytesIO()
-    plt.savefig(buf_diff, format='png', bbox_inches='tight', dpi=150)
-    buf_diff.seek(0)
-    diff_raw = buf_diff.read()
-    buf_diff.seek(0)
-    plt.close(fig2)
+    return {
+        'gradient_cleaned': gradient_cleaned,
+        'combined': combined,
+        'combined_final': combined_final,
+        'combined_filtered': combined_filtered,
+        'defects': defects,
+        'valid_pixels': None if valid is None else cv2.countNonZero(valid),
+    }
+
+STRUCTURAL_SUBPLOT_FIG_SIZE = (2100, 690)    # px, 7.0 x 2.3 in at 300 dpi
+STRUCTURAL_DIFF_FIG_SIZE = (1500, 1200)      # px, 5.0 x 4.0 in at 300 dpi
+
+def scale_defects(defects, pixel_scale):
+    """filter_components() defect table with areas, boxes and centroids in original-image pixels."""
+    if pixel_scale == 1.0:
+        return defects
+    return dict(defects,
+                area=np.round(defects['area'] * pixel_scale ** 2).astype(np.int64),
+                bbox=np.round(defects['bbox'] * pixel_scale).astype(np.int32),
+                centroid=defects['centroid'] * pixel_scale)
+
+def structural_report(fusion, total_pixels=None, changed_pixels=None, figures=True, pixel_scale=1.0):
+    """
+    Figures, metrics and verdict from structural_fusion() masks. total_pixels /
+    changed_pixels override the counts taken from the masks (tiled mode passes
+    full-resolution counts with downsampled mosaics); otherwise the change is
+    counted over fusion['valid_pixels'] when the region is masked. pixel_scale
+    converts counts and defect geometry taken from downscaled masks (triage
+    levels) to original-image pixels. figures=False skips the figures (their
+    keys are None) when only the score is needed.
+    """
+    gradient_cleaned = fusion['gradient_cleaned']
+    combined_final = fusion['combined_final']
+    combined_filtered = fusion['combined_filtered']
+    
+    subplot_img = diff_img = subplot_raw = diff_raw = None
+    if figures:
+        # 8. Pure Differences only (Red overlay)
+        diff_only = np.zeros(combined_filtered.shape[:2] + (3,), dtype=np.uint8)
+        diff_only[combined_filtered > 0] = [0, 0, 255] # Red BGR
+    
+        # 9. Visualization Compilations (raster renderer, no pyplot)
+        # Subplot: Gradient, Combined, Noise Filtered
+        panels = [heatmap_panel(m, t, cmap='hot', colorbar=False) for m, t in (
+            (gradient_cleaned, 'Gradient Magnitude Diff'),
+            (combined_final, 'Combined (All Methods)'),
+            (combined_filtered, 'Noise Filtered'))]
+        subplot_raw = encode_figure(render_figure(panels, STRUCTURAL_SUBPLOT_FIG_SIZE))
+        diff_raw = encode_figure(render_figure([image_panel(diff_only)], STRUCTURAL_DIFF_FIG_SIZE))
+        
+        subplot_img = RLImage(io.BytesIO(subplot_raw), width=7.0*inch, height=2.3*inch) # Aspect ratio approx 18:6 = 3:1
+        diff_img = RLImage(io.BytesIO(diff_raw), width=5.0*inch, height=4.0*inch) # Slightly smaller (was 6.0x4.8)
     
     # Metrics
-    total_pixels = gray1.shape[0] * gray1.shape[1]
-    changed_pixels = np.sum(combined_filtered > 0)
+    if total_pixels is None:
+        total_pixels = fusion.get('valid_pixels') or combined_filtered.shape[0] * combined_filtered.shape[1]
+        total_pixels = int(round(total_pixels * pixel_scale ** 2))
+    if changed_pixels is None:
+        changed_pixels = int(round(np.count_nonzero(combined_filtered) * pixel_scale ** 2))
     change_percentage = (changed_pixels / total_pixels) * 100
     
     similarity_score = max(0, 100 - change_percentage)
@@ -781,8 +2045,8 @@ def structural_difference_analysis(ref, sample):
         v_color = RED
         
     return {
-        'subplot_img': RLImage(buf_subplot, width=7.0*inch, height=2.3*inch), # Aspect ratio approx 18:6 = 3:1
-        'diff_img': RLImage(buf_diff, width=5.0*inch, height=4.0*inch), # Slightly smaller (was 6.0x4.8)
+        'subplot_img': subplot_img,
+        'diff_img': diff_img,
         'subplot_raw': subplot_raw,
         'diff_raw': diff_raw,
         'total_pixels': total_pixels,
@@ -790,14 +2054,21 @@ def structural_difference_analysis(ref, sample):
         'change_percentage': change_percentage,
         'similarity_score': similarity_score,
         'verdict': verdict,
-        'verdict_color': v_color
+        'verdict_color': v_color,
+        'defects': scale_defects(fusion['defects'], pixel_scale),
     }
 
+def structural_difference_analysis(ref, sample, ctx=None):
+    ctx = as_pattern_context(ref, sample, ctx)
+    return structural_report(structural_fusion(ctx))
+
 
 def generate_pdf_headless(ref_img, sample_img, scores, diff_images, composite_score, 
                           gradient_results, phase_results, output_path, config=None, report_id=None, timestamp=None,
-                          structural_results=None, fourier_results=None, glcm_results=None, is_combined=False):
+                          structural_results=None, fourier_results=None, glcm_results=None, phase_local=None,
+                          repeat_results=None, is_combined=False, artifacts=None, triage=None):
     cfg = config or DEFAULT_CONFIG
+    artifacts = artifacts if artifacts is not None else ArtifactStore()
     sections = cfg.get('sections', {})
     operator = cfg.get('operator', 'Unknown')
     tz_offset = cfg.get('timezone_offset', 3)
@@ -815,13 +2086,10 @@ def generate_pdf_headless(ref_img, sample_img, scores, diff_images, composite_sc
                             topMargin=MARGIN_T, bottomMargin=MARGIN_B)
     content = []
     
-    global_thresh = float(cfg.get('global_threshold', 75.0))
-    if composite_score >= global_thresh:
-        final_status = "PASS"
-    elif composite_score >= (global_thresh - 15): 
-        final_status = "CONDITIONAL"
-    else:
-        final_status = "FAIL"
+    # A triage-decided run carries the coarse-level verdict (PASS/FAIL), not a
+    # re-derived status of the composite below
+    decided = bool(triage and triage.get('decided'))
+    final_status = triage['status'] if decided else pattern_status(composite_score, cfg)
     
     # Cover
     content.append(Spacer(1, 0.5 * inch))
@@ -923,6 +2191,9 @@ def generate_pdf_headless(ref_img, sample_img, scores, diff_images, composite_sc
         
     m_table.setStyle(TableStyle(style_cmds))
     content.append(m_table)
+    if decided:
+        content.append(Spacer(1, 0.1*inch))
+        content.append(Paragraph(f"<i>{tr('triage_note').format(level=triage['level'], factor=2 ** triage['level'], composite=triage['composite'])}</i>", StyleSmall))
     content.append(PageBreak())
 
     # ── Large Pattern Section Title Banner (only in combined report) ──
@@ -1013,7 +2284,7 @@ def generate_pdf_headless(ref_img, sample_img, scores, diff_images, composite_sc
         bound_methods.append(('Gradient Similarity', gradient_results))
         
     for idx, (name, res) in enumerate(bound_methods):
-        cont, fill, b_coef, w_coef, _ = res
+        cont, fill, b_coef, w_coef = res[:4]
         bound_title = f"{name} - Sınır Algılama" if report_lang == 'tr' else f"{name} - Boundary Detection"
         
         img1 = numpy_to_rl(cont, 3.2*inch, 2.3*inch)
@@ -1049,6 +2320,32 @@ def generate_pdf_headless(ref_img, sample_img, scores, diff_images, composite_sc
             met_t,
         ]))
         content.append(Spacer(1, 0.3*inch))
+    
+    # Local Phase Correlation (displacement field)
+    if sections.get('phase_local', False) and phase_local and phase_local.get('heatmap_img') in artifacts:
+        dx, dy = phase_local['mean_shift']
+        lpc_t = Table([[tr('metric'), tr('value')],
+                       [tr('max_local_shift'), f"{phase_local['max_shift']:.2f} px"],
+                       [tr('mean_local_shift'), f"({dx:+.2f}, {dy:+.2f}) px"],
+                       [tr('shift_variance'), f"{phase_local['shift_variance']:.3f} px²"],
+                       [tr('reliable_windows'), f"{phase_local['reliable_fraction']*100:.1f}%"]],
+                      colWidths=[2.5*inch, 2*inch], hAlign="CENTER")
+        lpc_t.setStyle(TableStyle([
+            ("BACKGROUND", (0,0), (-1,0), NEUTRAL_L),
+            ("FONTNAME", (0,0), (-1,0), PDF_FONT_BOLD),
+            ("FONTNAME", (0,1), (-1,-1), PDF_FONT_REGULAR),
+            ("FONTSIZE", (0,0), (-1,-1), 9),
+            ("GRID", (0,0), (-1,-1), 0.5, NEUTRAL_L)
+        ]))
+        content.append(KeepTogether([
+            Paragraph(tr('phase_local_title'), StyleH1),
+            Paragraph(f"<i>{tr('phase_local_caption').format(window=phase_local['window'], step=phase_local['step'])}</i>", StyleSmall),
+            Spacer(1, 0.08*inch),
+            RLImage(artifacts.stream(phase_local['heatmap_img']), 5.0*inch, 3.8*inch),
+            Spacer(1, 0.15*inch),
+            lpc_t,
+        ]))
+        content.append(Spacer(1, 0.3*inch))
         
     # Structural Difference Analysis
     if sections.get('structural', True) and structural_results:
@@ -1111,14 +2408,14 @@ def generate_pdf_headless(ref_img, sample_img, scores, diff_images, composite_sc
         content.append(Spacer(1, 0.3 * inch))
 
         # FFT Spectrum Image
-        if fourier_results.get('spectrum_img_path') and os.path.exists(fourier_results['spectrum_img_path']):
+        if fourier_results.get('spectrum_img') in artifacts:
             content.append(KeepTogether([
                 Paragraph(tr('fourier_title'), StyleTitle),
                 Spacer(1, 0.1 * inch),
                 Paragraph(f"<i>{tr('fourier_subtitle')}</i>", StyleSmall),
                 Spacer(1, 0.15 * inch),
                 Paragraph(tr('fft_spectrum_title'), StyleH1),
-                RLImage(fourier_results['spectrum_img_path'], 5.0*inch, 3.8*inch),
+                RLImage(artifacts.stream(fourier_results['spectrum_img']), 5.0*inch, 3.8*inch),
                 Spacer(1, 0.15 * inch),
             ]))
         else:
@@ -1188,8 +2485,62 @@ def generate_pdf_headless(ref_img, sample_img, scores, diff_images, composite_sc
             t_met,
         ]))
 
+    # Repeat Unit Analysis
+    if sections.get('repeat', False) and repeat_results and repeat_results.get('map_img') in artifacts:
+        content.append(Spacer(1, 0.3 * inch))
+        px, py = repeat_results['period_px']
+        rep_data = [[tr('metric'), tr('value')],
+                    [tr('repeat_period'), f"{px:.1f} x {py:.1f} px"],
+                    [tr('repeats_compared'), f"{repeat_results['tiles']}"],
+                    [tr('repeat_mean_score'), f"{repeat_results['mean_score']:.2f}%"],
+                    [tr('repeat_min_score'), f"{repeat_results['min_score']:.2f}%"]]
+        t_rep = Table(rep_data, colWidths=[2.5*inch, 2.0*inch], hAlign="LEFT")
+        t_rep.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), BLUE2),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("FONTNAME", (0, 0), (-1, 0), PDF_FONT_BOLD),
+            ("FONTNAME", (0, 1), (-1, -1), PDF_FONT_REGULAR),
+            ("FONTSIZE", (0, 0), (-1, -1), 9),
+            ("GRID", (0, 0), (-1, -1), 0.5, NEUTRAL_L),
+            ("ALIGN", (1, 0), (-1, -1), "CENTER"),
+            ("BACKGROUND", (0, 1), (-1, -1), colors.whitesmoke),
+        ]))
+        content.append(KeepTogether([
+            Paragraph(tr('repeat_title'), StyleTitle),
+            Spacer(1, 0.1 * inch),
+            Paragraph(f"<i>{tr('repeat_subtitle')}</i>", StyleSmall),
+            Spacer(1, 0.15 * inch),
+            RLImage(artifacts.stream(repeat_results['map_img']), 5.0*inch, 3.8*inch),
+            Spacer(1, 0.15 * inch),
+            t_rep,
+            Spacer(1, 0.2 * inch),
+        ]))
+
+        worst = repeat_results.get('worst', [])
+        if worst:
+            worst_data = [['#', tr('repeat_position'), tr('repeat_bbox'), 'SSIM', 'NCC']]
+            for i, wr in enumerate(worst):
+                x, y, w, h = wr['bbox']
+                worst_data.append([f"W{i+1}", f"{wr['row']+1}, {wr['col']+1}", f"({x}, {y}) {w}x{h}",
+                                   f"{wr['ssim']:.2f}%", f"{wr['ncc']:.3f}"])
+            t_worst = Table(worst_data, colWidths=[0.6*inch, 1.2*inch, 2.0*inch, 1.1*inch, 1.0*inch], hAlign="LEFT")
+            t_worst.setStyle(TableStyle([
+                ("BACKGROUND", (0, 0), (-1, 0), BLUE2),
+                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+                ("FONTNAME", (0, 0), (-1, 0), PDF_FONT_BOLD),
+                ("FONTNAME", (0, 1), (-1, -1), PDF_FONT_REGULAR),
+                ("FONTSIZE", (0, 0), (-1, -1), 9),
+                ("GRID", (0, 0), (-1, -1), 0.5, NEUTRAL_L),
+                ("ALIGN", (1, 0), (-1, -1), "CENTER"),
+                ("BACKGROUND", (0, 1), (-1, -1), colors.whitesmoke),
+            ]))
+            content.append(KeepTogether([
+                Paragraph(tr('repeat_worst_title'), StyleH1),
+                t_worst,
+            ]))
+
     # GLCM Texture Analysis
-    if sections.get('glcm', False) and glcm_results:
+    if sections.get('glcm', True) and glcm_results:
         content.append(Spacer(1, 0.3 * inch))
 
         # GLCM Property Comparison Table
@@ -1226,15 +2577,25 @@ def generate_pdf_headless(ref_img, sample_img, scores, diff_images, composite_sc
         ]))
 
         # GLCM Bar Chart
-        if glcm_results.get('comparison_img_path') and os.path.exists(glcm_results['comparison_img_path']):
-            content.append(RLImage(glcm_results['comparison_img_path'], 5.5*inch, 2.8*inch))
+        if glcm_results.get('comparison_img') in artifacts:
+            content.append(RLImage(artifacts.stream(glcm_results['comparison_img']), 5.5*inch, 2.8*inch))
             content.append(Spacer(1, 0.2 * inch))
 
         # GLCM Heatmaps
-        if glcm_results.get('heatmap_img_path') and os.path.exists(glcm_results['heatmap_img_path']):
+        if glcm_results.get('heatmap_img') in artifacts:
             content.append(KeepTogether([
                 Paragraph(tr('glcm_heatmap_title'), StyleH1),
-                RLImage(glcm_results['heatmap_img_path'], 6.0*inch, 2.5*inch),
+                RLImage(artifacts.stream(glcm_results['heatmap_img']), 6.0*inch, 2.5*inch),
+                Spacer(1, 0.15 * inch),
+            ]))
+
+        # GLCM Texture Maps
+        if glcm_results.get('maps_img') in artifacts:
+            content.append(KeepTogether([
+                Paragraph(tr('glcm_maps_title'), StyleH1),
+                Paragraph(f"<i>{tr('glcm_maps_caption').format(tile=glcm_results.get('tile', GLCM_TILE))}</i>", StyleSmall),
+                Spacer(1, 0.08 * inch),
+                RLImage(artifacts.stream(glcm_results['maps_img']), 6.0*inch, 3.6*inch),
                 Spacer(1, 0.15 * inch),
             ]))
 
@@ -1266,117 +2627,510 @@ def generate_pdf_headless(ref_img, sample_img, scores, diff_images, composite_sc
 
     doc.build(content, onFirstPage=make_header_footer(ts, analysis_id, report_lang), onLaterPages=make_header_footer(ts, analysis_id, report_lang))
 
+# =================================================================================================
+# METHOD GRAPH
+# =================================================================================================
+
+PATTERN_WORKERS = min(4, os.cpu_count() or 1)   # cv2 / NumPy release the GIL, so nodes overlap
+
+# pyplot keeps global state; node code building pyplot figures holds this lock
+# (RasterFigures renders are self-contained and run without it)
+PLOT_LOCK = threading.Lock()
+
+def pattern_node(fn, *inputs):
+    """Graph node: fn is called with the outputs of the named input nodes, in order."""
+    return {'fn': fn, 'inputs': inputs}
+
+def run_pattern_graph(nodes, targets, workers=PATTERN_WORKERS):
+    """
+    Lazily evaluate a method graph {name: pattern_node(...)}. Only the targets and
+    their transitive inputs run; a node is submitted to the thread pool as soon as
+    its inputs are done, so independent methods run concurrently. A failing node
+    (error printed) yields None, and so does every node that depends on it.
+    Returns {name: output} for every node that was needed.
+    """
+    needed = set()
+    stack = [t for t in targets if t in nodes]
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(nodes[name]['inputs'])
+
+    results = {}
+    pending = set(needed)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as pool:
+        while pending or running:
+            resolved = False
+            for name in sorted(pending):
+                inputs = nodes[name]['inputs']
+                if not all(i in results for i in inputs):
+                    continue
+                pending.discard(name)
+                resolved = True
+                if any(results[i] is None for i in inputs):
+                    results[name] = None
+                else:
+                    running[pool.submit(nodes[name]['fn'], *[results[i] for i in inputs])] = name
+            if not running:
+                if not resolved:
+                    raise ValueError(f"Pattern method graph has a cycle through {sorted(pending)}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"Error in pattern method '{name}': {e}")
+                    import traceback
+                    traceback.print_exc()
+                    results[name] = None
+    return results
+
+# =================================================================================================
+# TILED MODE (very large scans)
+# =================================================================================================
+
+PATTERN_TILE = 1024                    # interior tile side in px
+PATTERN_TILE_OVERLAP = 32              # context margin around each tile (filters, morphology)
+PATTERN_MOSAIC_MAX_SIDE = 2048         # longest side of the stitched output mosaics
+PATTERN_TILED_AUTO_PIXELS = 40_000_000 # 'auto' mode switches to tiles above this size
+
+def _tile_interiors(h, w, tile):
+    for y0 in range(0, h, tile):
+        for x0 in range(0, w, tile):
+            yield y0, min(y0 + tile, h), x0, min(x0 + tile, w)
+
+def _sample_tile(sample, ref_hw, y0, y1, x0, x1):
+    """Sample region matching ref[y0:y1, x0:x1]; only that region is resized when the sizes differ."""
+    rh, rw = ref_hw
+    sh, sw = sample.shape[:2]
+    if (sh, sw) == (rh, rw):
+        return sample[y0:y1, x0:x1]
+    fy, fx = sh / float(rh), sw / float(rw)
+    sy0, sy1 = int(y0 * fy), max(int(y0 * fy) + 1, int(round(y1 * fy)))
+    sx0, sx1 = int(x0 * fx), max(int(x0 * fx) + 1, int(round(x1 * fx)))
+    return cv2.resize(sample[sy0:min(sy1, sh), sx0:min(sx1, sw)], (x1 - x0, y1 - y0))
+
+def _paste_mosaic(mosaic, part, y0, y1, x0, x1, scale):
+    my0, my1 = int(round(y0 * scale)), int(round(y1 * scale))
+    mx0, mx1 = int(round(x0 * scale)), int(round(x1 * scale))
+    if my1 <= my0 or mx1 <= mx0:
+        return
+    if part.shape[:2] != (my1 - my0, mx1 - mx0):
+        part = cv2.resize(part, (mx1 - mx0, my1 - my0), interpolation=cv2.INTER_AREA)
+    mosaic[my0:my1, mx0:mx1] = part
+
+def _tile_contexts(ref, sample, tile, overlap, gradient_range=None):
+    """Yields (ctx, interior slices, (iy0, iy1, ix0, ix1), (oy0, ox0)) for every tile of the reference grid."""
+    h, w = ref.shape[:2]
+    for iy0, iy1, ix0, ix1 in _tile_interiors(h, w, tile):
+        oy0, oy1 = max(0, iy0 - overlap), min(h, iy1 + overlap)
+        ox0, ox1 = max(0, ix0 - overlap), min(w, ix1 + overlap)
+        # Tiles thinner than the SSIM window borrow more context from the image
+        oy0 = max(0, min(oy0, oy1 - SSIM_GAUSSIAN_WIN_SIZE))
+        ox0 = max(0, min(ox0, ox1 - SSIM_GAUSSIAN_WIN_SIZE))
+        ctx = PatternContext(ref[oy0:oy1, ox0:ox1], _sample_tile(sample, (h, w), oy0, oy1, ox0, ox1),
+                             gradient_range=gradient_range)
+        inner = (slice(iy0 - oy0, iy1 - oy0), slice(ix0 - ox0, ix1 - ox0))
+        yield ctx, inner, (iy0, iy1, ix0, ix1), (oy0, ox0)
+
+def tiled_gradient_range(ref, sample, tile=PATTERN_TILE, overlap=PATTERN_TILE_OVERLAP):
+    """Whole-scan (min, max) of the structure gradient magnitude of ref and sample, one tile at a time."""
+    rng = {'ref': [np.inf, -np.inf], 'sample': [np.inf, -np.inf]}
+    for ctx, inner, _, _ in _tile_contexts(ref, sample, tile, overlap):
+        for which in rng:
+            lo, hi, _, _ = cv2.minMaxLoc(ctx.gradient(which)[inner])
+            rng[which] = [min(rng[which][0], lo), max(rng[which][1], hi)]
+    return {k: tuple(v) for k, v in rng.items()}
+
+def tiled_pattern_analysis(ref, sample, tile=PATTERN_TILE, overlap=PATTERN_TILE_OVERLAP,
+                           mosaic_max_side=PATTERN_MOSAIC_MAX_SIDE, multiscale=False):
+    """
+    Runs SSIM, gradient similarity, phase correlation and the structural fusion
+    tile by tile (each tile padded by `overlap` px of context), so working memory
+    is bounded by the tile size, not the scan size. The sample is mapped onto the
+    reference grid per tile.
+    Scores are pixel-weighted over tile interiors (phase correlation: the mean of
+    per-tile responses weighted by interior area). The tiled phase correlation is
+    therefore not the untiled score: each tile peaks on its own shift and small
+    tiles respond more weakly, so it usually comes out a few points apart (e.g.
+    96.4 tiled vs 98.6 untiled on the READYTOTEST 1/2 pair); compare tiled runs
+    with tiled runs. Gradient magnitudes are normalized with whole-scan ranges
+    from a first, gradient-only pass (structure images are recomputed in the main
+    pass, so nothing outlives its tile); CLAHE
+    and the structural fusion normalize per tile. Difference maps and both images
+    are stitched into mosaics whose longest side is mosaic_max_side.
+    Returns dict with 'scores' (0-100), 'mosaics', 'defects' (full-resolution
+    coordinates), 'total_pixels', 'changed_pixels', 'tiles' and 'mosaic_scale'.
+    """
+    h, w = ref.shape[:2]
+    scale = min(1.0, mosaic_max_side / float(max(h, w)))
+    mh, mw = max(1, int(round(h * scale))), max(1, int(round(w * scale)))
+    mosaics = {
+        'ref': np.zeros((mh, mw, 3), np.uint8),
+        'sample': np.zeros((mh, mw, 3), np.uint8),
+        'ssim': np.ones((mh, mw), np.float32),
+        'gradient_ssim': np.ones((mh, mw), np.float32),
+        'gradient_diff': np.zeros((mh, mw), np.float32),
+        'phase_diff': np.zeros((mh, mw), np.uint8),
+        'gradient_cleaned': np.zeros((mh, mw), np.uint8),
+        'combined_final': np.zeros((mh, mw), np.uint8),
+        'combined_filtered': np.zeros((mh, mw), np.uint8),
+    }
+    sums = {'ssim': 0.0, 'gradient': 0.0, 'phase': 0.0}
+    total = changed = n_tiles = 0
+    defect_parts = []
+
+    gradient_range = tiled_gradient_range(ref, sample, tile, overlap)
+    for ctx, inner, (iy0, iy1, ix0, ix1), (oy0, ox0) in _tile_contexts(ref, sample, tile, overlap, gradient_range):
+        n = (iy1 - iy0) * (ix1 - ix0)
+        paste = lambda key, arr: _paste_mosaic(mosaics[key], arr[inner], iy0, iy1, ix0, ix1, scale)
+
+        _, s_map = ctx.ssim('structure', multiscale=multiscale)
+        sums['ssim'] += float(s_map[inner].sum(dtype=np.float64))
+        paste('ssim', s_map)
+
+        _, g_map, g_diff = gradient_similarity_maps(ctx)
+        sums['gradient'] += float(g_map[inner].sum(dtype=np.float64))
+        paste('gradient_ssim', g_map)
+        paste('gradient_diff', g_diff.astype(np.float32))
+
+        p_score, p_diff = phase_correlation_maps(ctx)
+        sums['phase'] += p_score * n
+        paste('phase_diff', p_diff)
+
+        fusion = structural_fusion(ctx)
+        filtered = fusion['combined_filtered']
+        changed += int(np.count_nonzero(filtered[inner]))
+        for key in ('gradient_cleaned', 'combined_final', 'combined_filtered'):
+            paste(key, fusion[key])
+        d = fusion['defects']
+        if len(d['area']):
+            cx = d['centroid'][:, 0] + ox0
+            cy = d['centroid'][:, 1] + oy0
+            own = (cx >= ix0) & (cx < ix1) & (cy >= iy0) & (cy < iy1)  # each defect reported by one tile
+            defect_parts.append({
+                'area': d['area'][own],
+                'bbox': d['bbox'][own] + np.array([ox0, oy0, 0, 0], dtype=np.int32),
+                'centroid': np.stack([cx[own], cy[own]], axis=1),
+                'mean_intensity': d['mean_intensity'][own],
+            })
+
+        paste('ref', ctx.ref.bgr)
+        paste('sample', ctx.sample.bgr)
+        total += n
+        n_tiles += 1
+
+    if defect_parts:
+        defects = {k: np.concatenate([part[k] for part in defect_parts]) for k in defect_parts[0]}
+        order = np.argsort(-defects['area'], kind='stable')
+        defects = {k: v[order] for k, v in defects.items()}
+    else:
+        defects = {'area': np.zeros(0, np.int64), 'bbox': np.zeros((0, 4), np.int32),
+                   'centroid': np.zeros((0, 2)), 'mean_intensity': np.zeros(0)}
+
+    return {
+        'scores': {
+            'Structural SSIM': sums['ssim'] / total * 100,
+            'Gradient Similarity': sums['gradient'] / total * 100,
+            'Phase Correlation': sums['phase'] / total,
+            'Structural Match': max(0.0, 100 - changed / float(total) * 100),
+        },
+        'mosaics': mosaics,
+        'defects': defects,
+        'total_pixels': total,
+        'changed_pixels': changed,
+        'tiles': n_tiles,
+        'mosaic_scale': scale,
+    }
+
+def use_tiled_mode(ref_img, cfg):
+    mode = cfg.get('pattern_mode', 'auto')
+    if mode == 'tiled':
+        return True
+    return mode == 'auto' and ref_img.shape[0] * ref_img.shape[1] > PATTERN_TILED_AUTO_PIXELS
+
+# =================================================================================================
+# TRIAGE (coarse-to-fine early exit)
+# =================================================================================================
+
+TRIAGE_MAX_SIDE = 512      # triage runs on the pyramid level whose longest side is <= this
+TRIAGE_MARGIN = 10.0       # composite points a coarse result must clear the thresholds by
+
+def pyramid_level(img, max_side):
+    """Halve img with area averaging until its longest side is <= max_side. Returns (img, level)."""
+    level = 0
+    while max(img.shape[:2]) > max_side and min(img.shape[:2]) >= 2 * SSIM_GAUSSIAN_WIN_SIZE:
+        img = cv2.resize(img, (max(1, img.shape[1] // 2), max(1, img.shape[0] // 2)), interpolation=cv2.INTER_AREA)
+        level += 1
+    return img, level
+
+def pattern_triage(ref_img, sample_img, cfg):
+    """
+    Coarse pass: SSIM, gradient and phase scores on a low pyramid level. The sample
+    is decided there when their mean clears the PASS threshold (global_threshold)
+    or falls below the FAIL threshold (global_threshold - 15) by at least
+    triage_margin points; otherwise it must be escalated to full resolution.
+    Returns dict with 'decided', 'status', 'composite', 'scores', 'level' and the
+    coarse 'ctx' (reusable by the full pipeline when decided).
+    """
+    max_side = int(cfg.get('triage_max_side', TRIAGE_MAX_SIDE))
+    margin = float(cfg.get('triage_margin', TRIAGE_MARGIN))
+    pass_t = cfg.get('global_threshold', 75.0)
+    fail_t = pass_t - 15
+
+    ref_small, level = pyramid_level(as_pattern_image(ref_img).img, max_side)
+    sample_small, _ = pyramid_level(as_pattern_image(sample_img).img, max_side)
+    ctx = PatternContext(ref_small, sample_small)
+
+    scores = {
+        'Structural SSIM': ctx.ssim('structure', multiscale=cfg.get('ssim_multiscale', False))[0] * 100,
+        'Gradient Similarity': gradient_similarity_maps(ctx)[0] * 100,
+        'Phase Correlation': phase_correlation_maps(ctx)[0],
+    }
+    composite = sum(scores.values()) / len(scores)
+    if composite >= pass_t + margin:
+        status = 'PASS'
+    elif composite < fail_t - margin:
+        status = 'FAIL'
+    else:
+        status = None
+    return {
+        'decided': status is not None,
+        'status': status,
+        'composite': composite,
+        'scores': scores,
+        'level': level,
+        'margin': margin,
+        'ctx': ctx,
+    }
+
 # =================================================================================================
 # MAIN PIPELINE
 # =================================================================================================
 
-def analyze_and_generate(ref_img, sample_img, config, output_path, report_id=None, timestamp=None, is_combined=False):
+def analyze_and_generate(ref_img, sample_img, config, output_path, report_id=None, timestamp=None, is_combined=False,
+                         artifacts=None):
+    """
+    Run the pattern pipeline and write the PDF. Report figures are rendered once
+    into `artifacts` (an ArtifactStore, per-call if not given) under the names the
+    web view serves them by; the results reference them by name.
+    Tiled and triage-decided runs work on downscaled images: sizes and positions
+    (defects, boundary geometry, displacements, repeat boxes, fundamental period)
+    are reported in original-image pixels, while the difference maps, overlays,
+    contours, spectrum peak coordinates and local grids stay at the working size.
+    """
     cfg = config or DEFAULT_CONFIG
     sections = cfg.get('sections', {})
+    artifacts = artifacts if artifacts is not None else ArtifactStore()
     
     scores = {}
     diff_images = {}
-    active_count = 0
-    grad_res = None
-    phase_res = None
+    multiscale = cfg.get('ssim_multiscale', False)
+    
+    # Very large scans: methods 1-4 run tile by tile; everything downstream
+    # (overlays, Fourier, GLCM, PDF) works on the stitched mosaics.
+    tiled_res = None
+    if use_tiled_mode(ref_img, cfg):
+        tiled_res = tiled_pattern_analysis(ref_img, sample_img,
+                                           tile=int(cfg.get('pattern_tile', PATTERN_TILE)),
+                                           overlap=int(cfg.get('pattern_tile_overlap', PATTERN_TILE_OVERLAP)),
+                                           mosaic_max_side=int(cfg.get('pattern_mosaic_max_side', PATTERN_MOSAIC_MAX_SIDE)),
+                                           multiscale=multiscale)
+        mosaics = tiled_res['mosaics']
+        ref_img, sample_img = mosaics['ref'], mosaics['sample']
+    
+    # Coarse-to-fine triage: clear passes/fails are finished on the coarse level,
+    # reusing its context; only borderline samples run at full resolution.
+    triage = None
+    if cfg.get('pattern_triage', False) and tiled_res is None:
+        triage = pattern_triage(ref_img, sample_img, cfg)
+        if triage['decided']:
+            ref_img, sample_img = triage['ctx'].ref.img, triage['ctx'].sample.img
+    
+    # Shared preprocessing (composite, gray, bilateral, CLAHE, Sobel) for every method below
+    ctx = triage['ctx'] if triage and triage['decided'] else PatternContext(ref_img, sample_img)
+    # Original-image pixels per ctx pixel, for sizes reported by the local stages
+    if tiled_res:
+        pixel_scale = 1.0 / tiled_res['mosaic_scale']
+    elif triage and triage['decided']:
+        pixel_scale = float(2 ** triage['level'])
+    else:
+        pixel_scale = 1.0
+    # Pixels inside the selected region (circle crops); None for full/rect images and tiled runs
+    valid = None if tiled_res else ctx.valid('structure')
     
     # Dependency Logic:
-    # Analysis must run if the section is enabled OR if dependent sections (Recommendations, Conclusion, Summary) need the data.
+    # Scores must run if their section is enabled OR if dependent sections (Recommendations, Conclusion,
+    # Summary) need them. Maps, overlays and figures are only built for the sections that show them.
     any_deps_enabled = sections.get('recommendations_pattern', True) or sections.get('conclusion', True) or sections.get('summary', True)
-
-    # 1. SSIM
-    # Run if section is enabled OR if dependencies need scores
-    if sections.get('ssim', True) or any_deps_enabled:
-        sc, di = method1_structural_ssim(ref_img, sample_img)
-        scores['Structural SSIM'] = sc
-        diff_images['Structural SSIM'] = di
-        if sections.get('enable_ssim', True) or True: # It always counts towards composite if calculated
-            active_count += 1
+    report_tr = get_translator(cfg.get('report_lang', 'en'))
+    lang_params = {'lang': cfg.get('report_lang', 'en')}
+    
+    # Method graph: scores -> maps / overlays / figures. Each node pulls only its inputs;
+    # nodes run in a thread pool as soon as their inputs are ready.
+    def ssim_node():
+        if tiled_res:
+            return tiled_res['scores']['Structural SSIM'], mosaics['ssim']
+        score, s_map = ctx.ssim('structure', multiscale=multiscale)
+        return score * 100, s_map
+    
+    def gradient_node():
+        if tiled_res:
+            return tiled_res['scores']['Gradient Similarity'], mosaics['gradient_ssim'], mosaics['gradient_diff']
+        score, s_map, gradient_diff = gradient_similarity_maps(ctx)
+        return score * 100, s_map, gradient_diff
+    
+    def phase_node():
+        if tiled_res:
+            return tiled_res['scores']['Phase Correlation'], mosaics['phase_diff']
+        return phase_correlation_maps(ctx)
+    
+    def phase_local_node():
+        # Local mode: windowed phase correlation -> displacement field (stretch / misregistration)
+        res = local_phase_correlation(ctx,
+                                      window=int(cfg.get('phase_local_window', PHASE_LOCAL_WINDOW)),
+                                      step=int(cfg.get('phase_local_step', PHASE_LOCAL_STEP)),
+                                      pixel_scale=pixel_scale)
+        res['heatmap_img'] = 'phase_displacement'
+        with PLOT_LOCK:
+            artifacts.render('phase_displacement', lambda out: plot_displacement_field(
+                res, ctx.structure('sample'), out, tr=report_tr), lang_params)
+        return res
+    
+    def structural_node():
+        if tiled_res:
+            fusion = {k: mosaics[k] for k in ('gradient_cleaned', 'combined_final', 'combined_filtered')}
+            fusion['defects'] = tiled_res['defects']
+            kw = {'total_pixels': tiled_res['total_pixels'], 'changed_pixels': tiled_res['changed_pixels']}
+        else:
+            # DEFECT_MIN_AREA is in original pixels; triage levels are smaller by pixel_scale^2
+            fusion = structural_fusion(ctx, min_area=max(1, int(round(DEFECT_MIN_AREA / pixel_scale ** 2))))
+            kw = {'pixel_scale': pixel_scale}
+        res = structural_report(fusion, figures=sections.get('structural', True), **kw)
+        if res['subplot_raw']:
+            artifacts.put('structural_subplot', res['subplot_raw'])
+            artifacts.put('structural_pure', res['diff_raw'])
+        return res
+    
+    def fourier_node():
+        fft_kw = {'num_peaks': int(cfg.get('fft_num_peaks', FFT_NUM_PEAKS)),
+                  'min_separation': float(cfg.get('fft_peak_min_separation', FFT_PEAK_MIN_SEPARATION)),
+                  'pixel_scale': pixel_scale}
+        fda_sam = fourier_domain_analysis(ctx.sample, **fft_kw)
+        fda_ref = fourier_domain_analysis(ctx.ref, **fft_kw)
+        artifacts.render('fourier_spectrum', lambda out: plot_fft_spectrum(fda_sam, out))
+        return {
+            'spectrum_img': 'fourier_spectrum',
+            'peaks': fda_sam['peaks'],
+            'sample': fda_sam,
+            'ref': fda_ref,
+            'fundamental_period': fda_sam['fundamental_period'],
+            'dominant_orientation': fda_sam['dominant_orientation'],
+            'anisotropy': fda_sam['anisotropy'],
+            'radial_similarity': profile_similarity(fda_ref['radial_profile'], fda_sam['radial_profile']),
+            'angular_similarity': profile_similarity(fda_ref['angular_profile'], fda_sam['angular_profile']),
+        }
+    
+    def repeat_node():
+        # Repeat found from the reference spectrum, scored repeat by repeat
+        res = repeat_unit_analysis(ctx, worst=int(cfg.get('repeat_worst', REPEAT_WORST)), pixel_scale=pixel_scale)
+        if res:
+            res['map_img'] = 'repeat_scores'
+            with PLOT_LOCK:
+                artifacts.render('repeat_scores', lambda out: plot_repeat_scores(
+                    res, ctx.structure('sample'), out, tr=report_tr), lang_params)
+        return res
+    
+    def glcm_node():
+        glcm_kw = {
+            'distances': tuple(int(d) for d in cfg.get('glcm_distances', GLCM_DISTANCES)),
+            'tile': int(cfg.get('glcm_tile', GLCM_TILE)),
+        }
+        ref_glcm = glcm_texture_analysis(ctx.ref, **glcm_kw)
+        sam_glcm = glcm_texture_analysis(ctx.sample, **glcm_kw)
         
-    # 2. Gradient
-    if sections.get('gradient', True) or sections.get('gradient_boundary', True) or any_deps_enabled:
-        sc, di, data = method3_gradient_similarity(ref_img, sample_img)
-        grad_res = create_gradient_red_boundaries(sample_img, data) # Always needed if ran? Used in PDF generation.
-        # Store score if gradient specifically or dependants
-        if sections.get('gradient', True) or any_deps_enabled:
-            scores['Gradient Similarity'] = sc
-            diff_images['Gradient Similarity'] = di
-            active_count += 1
-            
-    # 3. Phase
-    if sections.get('phase', True) or sections.get('phase_boundary', True) or any_deps_enabled:
-        sc, di, data = method6_phase_correlation(ref_img, sample_img)
-        phase_res = create_phase_red_boundaries(sample_img, data)
-        if sections.get('phase', True) or any_deps_enabled:
-            scores['Phase Correlation'] = sc
-            diff_images['Phase Correlation'] = di
-            active_count += 1
-            
-    # 4. Structural Difference (Configurable)
-    structural_results = None
-    if sections.get('structural', True) or sections.get('recommendations_pattern', True) or any_deps_enabled:
-        try:
-            structural_results = structural_difference_analysis(ref_img, sample_img)
-            scores['Structural Match'] = structural_results['similarity_score']
-            active_count += 1
-        except Exception as e:
-            print(f"Error in structural difference analysis: {e}")
-            import traceback
-            traceback.print_exc()
-
-            
-    # 5. Fourier Domain Analysis
-    fourier_results = None
-    if sections.get('fourier', True):
-        try:
-            import tempfile as _tmpmod
-            _fda_tmp = _tmpmod.mkdtemp()
-            fda_sam = fourier_domain_analysis(sample_img)
-            fda_ref = fourier_domain_analysis(ref_img)
-            spectrum_path = os.path.join(_fda_tmp, "fft_spectrum.png")
-            plot_fft_spectrum(fda_sam, spectrum_path)
-            fourier_results = {
-                'spectrum_img_path': spectrum_path,
-                'peaks': fda_sam['peaks'],
-                'sample': fda_sam,
-                'ref': fda_ref,
-                'fundamental_period': fda_sam['fundamental_period'],
-                'dominant_orientation': fda_sam['dominant_orientation'],
-                'anisotropy': fda_sam['anisotropy'],
-            }
-        except Exception as e:
-            print(f"Error in Fourier domain analysis: {e}")
-            import traceback
-            traceback.print_exc()
-
-    # 6. GLCM Texture Analysis
-    glcm_results = None
-    if sections.get('glcm', False):
-        try:
-            import tempfile as _tmpmod
-            _glcm_tmp = _tmpmod.mkdtemp()
-            ref_glcm = glcm_texture_analysis(ref_img)
-            sam_glcm = glcm_texture_analysis(sample_img)
-            
-            report_lang = cfg.get('report_lang', 'en')
-            tr = get_translator(report_lang)
-            
-            comparison_path = os.path.join(_glcm_tmp, "glcm_comparison.png")
-            plot_glcm_comparison(ref_glcm, sam_glcm, comparison_path, tr=tr)
-            
-            heatmap_path = os.path.join(_glcm_tmp, "glcm_heatmap.png")
-            plot_glcm_heatmaps(ref_glcm['glcm_matrix'], sam_glcm['glcm_matrix'], heatmap_path)
-            
-            glcm_results = {
-                'ref': ref_glcm,
-                'sample': sam_glcm,
-                'comparison_img_path': comparison_path,
-                'heatmap_img_path': heatmap_path,
-            }
-        except Exception as e:
-            print(f"Error in GLCM texture analysis: {e}")
-            import traceback
-            traceback.print_exc()
+        maps_img = None
+        artifacts.render('glcm_heatmap', lambda out: plot_glcm_heatmaps(ref_glcm['glcm_matrix'], sam_glcm['glcm_matrix'], out))
+        with PLOT_LOCK:
+            artifacts.render('glcm_comparison', lambda out: plot_glcm_comparison(ref_glcm, sam_glcm, out, tr=report_tr),
+                             lang_params)
+            if 'maps' in ref_glcm and 'maps' in sam_glcm:
+                maps_img = 'glcm_texture_maps'
+                artifacts.render(maps_img, lambda out: plot_glcm_texture_maps(
+                    ref_glcm['maps'], sam_glcm['maps'], out, tr=report_tr), lang_params)
+        
+        return {
+            'ref': ref_glcm,
+            'sample': sam_glcm,
+            'comparison_img': 'glcm_comparison',
+            'heatmap_img': 'glcm_heatmap',
+            'maps_img': maps_img,
+            'tile': glcm_kw['tile'],
+        }
+    
+    nodes = {
+        # 1-3. Method scores and their difference maps / red-boundary overlays
+        'ssim': pattern_node(ssim_node),
+        'ssim_map': pattern_node(lambda r: similarity_colormap(r[1], cv2.COLORMAP_JET), 'ssim'),
+        'gradient': pattern_node(gradient_node),
+        'gradient_map': pattern_node(lambda r: similarity_colormap(r[1], cv2.COLORMAP_HOT), 'gradient'),
+        'gradient_boundary': pattern_node(
+            lambda r: create_gradient_red_boundaries(ctx.sample, {'gradient_diff': r[2], 'mask': valid,
+                                                                  'pixel_scale': pixel_scale}), 'gradient'),
+        'phase': pattern_node(phase_node),
+        'phase_map': pattern_node(lambda r: cv2.applyColorMap(r[1], cv2.COLORMAP_INFERNO), 'phase'),
+        'phase_boundary': pattern_node(
+            lambda r: create_phase_red_boundaries(ctx.sample, {'phase_diff': r[1].astype(np.float32) / 255.0,
+                                                               'mask': valid, 'pixel_scale': pixel_scale}), 'phase'),
+        'phase_local': pattern_node(phase_local_node),
+        # 4. Structural Difference (Configurable)
+        'structural': pattern_node(structural_node),
+        # 5. Fourier Domain Analysis, 5b. Repeat Unit Analysis
+        'fourier': pattern_node(fourier_node),
+        'repeat': pattern_node(repeat_node),
+        # 6. GLCM Texture Analysis
+        'glcm': pattern_node(glcm_node),
+    }
+    
+    # Requested outputs
+    wanted = {
+        'ssim': sections.get('ssim', True) or any_deps_enabled,
+        'ssim_map': sections.get('ssim', True),
+        'gradient': sections.get('gradient', True) or any_deps_enabled,
+        'gradient_map': sections.get('gradient', True),
+        'gradient_boundary': sections.get('gradient_boundary', True),
+        'phase': sections.get('phase', True) or any_deps_enabled,
+        'phase_map': sections.get('phase', True),
+        'phase_boundary': sections.get('phase_boundary', True),
+        # Optional stages only run when their (opt-in) section is requested
+        'phase_local': sections.get('phase_local', False),
+        'structural': sections.get('structural', True) or sections.get('recommendations_pattern', True) or any_deps_enabled,
+        'fourier': sections.get('fourier', True),
+        'repeat': sections.get('repeat', False),
+        'glcm': sections.get('glcm', True),
+    }
+    out = run_pattern_graph(nodes, [k for k, v in wanted.items() if v],
+                            workers=int(cfg.get('pattern_workers', PATTERN_WORKERS)))
+    
+    for name, key in (('ssim', 'Structural SSIM'), ('gradient', 'Gradient Similarity'), ('phase', 'Phase Correlation')):
+        if wanted[name] and out.get(name) is not None:
+            scores[key] = out[name][0]
+        if out.get(name + '_map') is not None:
+            diff_images[key] = out[name + '_map']
+    grad_res = out.get('gradient_boundary')
+    phase_res = out.get('phase_boundary')
+    phase_local = out.get('phase_local')
+    structural_results = out.get('structural')
+    if structural_results:
+        scores['Structural Match'] = structural_results['similarity_score']
+    fourier_results = out.get('fourier')
+    repeat_results = out.get('repeat')
+    glcm_results = out.get('glcm')
+    active_count = len(scores)
 
     # Composite
     weights = {'Structural SSIM': 0.25, 'Gradient Similarity': 0.25, 'Phase Correlation': 0.25, 'Structural Match': 0.25}
@@ -1384,18 +3138,32 @@ def analyze_and_generate(ref_img, sample_img, config, output_path, report_id=Non
     
     generate_pdf_headless(ref_img, sample_img, scores, diff_images, composite, grad_res, phase_res, output_path, cfg, 
                           report_id=report_id, timestamp=timestamp, structural_results=structural_results,
-                          fourier_results=fourier_results, glcm_results=glcm_results, is_combined=is_combined)
+                          fourier_results=fourier_results, glcm_results=glcm_results, phase_local=phase_local,
+                          repeat_results=repeat_results, is_combined=is_combined, artifacts=artifacts,
+                          triage=triage)
+    
+    # Same status as the PDF: a triage-decided run keeps the triage verdict, so
+    # final_status always equals triage['status'] when triage['decided']
+    if triage and triage['decided']:
+        final_status = triage['status']
+    else:
+        final_status = pattern_status(composite, cfg)
     
     results = {
         'scores': scores,
         'composite_score': composite,
-        'final_status': 'PASS' if composite >= cfg.get('global_threshold', 75.0) else ('CONDITIONAL' if composite >= (cfg.get('global_threshold', 75.0) - 15) else 'FAIL'),
+        'final_status': final_status,
         'diff_images': diff_images,
         'grad_boundary': grad_res,
         'phase_boundary': phase_res,
+        'phase_local': phase_local,
         'structural_results': structural_results,
         'fourier_results': fourier_results,
+        'repeat_results': repeat_results,
         'glcm_results': glcm_results,
+        'ctx': ctx,
+        'tiled': {k: tiled_res[k] for k in ('tiles', 'mosaic_scale', 'total_pixels')} if tiled_res else None,
+        'triage': {k: v for k, v in triage.items() if k != 'ctx'} if triage else None,
     }
     return output_path, results
 
@@ -0,0 +1,227 @@
+# modules/RasterFigures.py
+import os
+import numpy as np
+import cv2
+from PIL import Image, ImageDraw, ImageFont
+
+# =================================================================================================
+# RASTER FIGURES
+# =================================================================================================
+# Colormapped maps, colorbars, markers and titles drawn straight at the output size with
+# cv2/PIL. Used for the image-like figures (spectra, heatmaps, difference maps) that do not
+# need matplotlib axes; the result is an RGB array or encoded PNG/JPEG bytes.
+
+FIGURE_BG = (255, 255, 255)
+FIGURE_FG = (33, 33, 33)
+FIGURE_NAN_RGB = (235, 235, 235)   # NaN cells (e.g. tiles outside a masked region)
+FIGURE_PAD = 12                    # px around panels
+FIGURE_TITLE_SCALE = 0.045         # title font size as a fraction of the figure height
+FIGURE_TEXT_SCALE = 0.032          # tick / label font size
+FIGURE_MIN_FONT = 11
+COLORBAR_WIDTH = 0.045             # colorbar strip, fraction of the panel width
+COLORBAR_TICKS = 5
+MARKER_SIZE = 7                    # px half-height of a peak marker
+MARKER_RGB = (0, 128, 0)
+MARKER_LABEL_RGB = (0, 255, 0)
+JPEG_QUALITY = 90
+
+COLORMAPS = {
+    'hot': cv2.COLORMAP_HOT,
+    'inferno': cv2.COLORMAP_INFERNO,
+    'jet': cv2.COLORMAP_JET,
+    'viridis': cv2.COLORMAP_VIRIDIS,
+    'magma': cv2.COLORMAP_MAGMA,
+    'plasma': cv2.COLORMAP_PLASMA,
+}
+
+FONT_CANDIDATES = {
+    False: [r"C:\Windows\Fonts\arial.ttf", r"C:\Windows\Fonts\segoeui.ttf",
+            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "DejaVuSans.ttf"],
+    True: [r"C:\Windows\Fonts\arialbd.ttf", r"C:\Windows\Fonts\segoeuib.ttf",
+           "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", "DejaVuSans-Bold.ttf"],
+}
+_FONT_CACHE = {}
+
+def get_font(size, bold=False):
+    """TrueType font with Turkish glyphs (first available candidate), cached per size."""
+    key = (int(size), bool(bold))
+    if key not in _FONT_CACHE:
+        font = None
+        for path in FONT_CANDIDATES[bool(bold)]:
+            try:
+                if os.path.isabs(path) and not os.path.exists(path):
+                    continue
+                font = ImageFont.truetype(path, key[0])
+                break
+            except OSError:
+                continue
+        if font is None:
+            try:
+                font = ImageFont.load_default(key[0])
+            except TypeError:
+                # Pillow < 10.1: only the fixed-size bitmap default font
+                font = ImageFont.load_default()
+        _FONT_CACHE[key] = font
+    return _FONT_CACHE[key]
+
+def colorize(values, cmap='inferno', vmin=None, vmax=None):
+    """RGB uint8 image of a 2-D array through a cv2 colormap; NaN becomes FIGURE_NAN_RGB."""
+    v = np.asarray(values, dtype=np.float32)
+    finite = np.isfinite(v)
+    if vmin is None:
+        vmin = float(v[finite].min()) if finite.any() else 0.0
+    if vmax is None:
+        vmax = float(v[finite].max()) if finite.any() else 1.0
+    scale = 255.0 / (vmax - vmin) if vmax > vmin else 0.0
+    u8 = np.clip((np.where(finite, v, vmin) - vmin) * scale, 0, 255).astype(np.uint8)
+    rgb = cv2.cvtColor(cv2.applyColorMap(u8, COLORMAPS[cmap]), cv2.COLOR_BGR2RGB)
+    if not finite.all():
+        rgb[~finite] = FIGURE_NAN_RGB
+    return rgb
+
+def heatmap_panel(values, title=None, cmap='inferno', vmin=None, vmax=None, colorbar=True, label=None, markers=None):
+    """
+    Panel for render_figure(): a 2-D array shown through cmap with an optional
+    colorbar (and its label) and markers [(x, y, text), ...] in array coordinates.
+    """
+    v = np.asarray(values, dtype=np.float32)
+    finite = np.isfinite(v)
+    if vmin is None:
+        vmin = float(v[finite].min()) if finite.any() else 0.0
+    if vmax is None:
+        vmax = float(v[finite].max()) if finite.any() else 1.0
+    return {'rgb': colorize(v, cmap, vmin, vmax), 'title': title, 'cmap': cmap, 'vmin': vmin, 'vmax': vmax,
+            'colorbar': colorbar, 'label': label, 'markers': markers or []}
+
+def image_panel(img, title=None, bgr=True):
+    """Panel for render_figure() showing an image as is (gray, BGR or RGB)."""
+    img = np.asarray(img)
+    if img.ndim == 2:
+        rgb = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+    else:
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB) if bgr else img
+    return {'rgb': rgb, 'title': title, 'colorbar': False, 'markers': []}
+
+def _fit(rgb, box_w, box_h):
+    """Resize to fit box_w x box_h keeping the aspect ratio; nearest when enlarging (crisp cells)."""
+    h, w = rgb.shape[:2]
+    s = min(box_w / w, box_h / h)
+    size = (max(1, int(round(w * s))), max(1, int(round(h * s))))
+    return cv2.resize(rgb, size, interpolation=cv2.INTER_NEAREST if s > 1 else cv2.INTER_AREA), s
+
+def _layout_panel(canvas, panel, x0, y0, pw, ph, title_font, text_font):
+    """
+    Pixel pass for one panel in the (x0, y0, pw, ph) cell: writes the image and
+    colorbar into canvas and returns the text/marker ops for the PIL pass.
+    """
+    ops = []
+    top = y0
+    if panel.get('title'):
+        tw = title_font.getlength(panel['title'])
+        ops.append(('text', (x0 + (pw - tw) / 2, y0), panel['title'], title_font, FIGURE_FG, None))
+        top += int(title_font.size * 1.5)
+    bar_w = label_w = 0
+    if panel.get('colorbar'):
+        bar_w = max(8, int(pw * COLORBAR_WIDTH))
+        ticks = np.linspace(panel['vmin'], panel['vmax'], COLORBAR_TICKS)
+        label_w = int(max(text_font.getlength(f'{t:.3g}') for t in ticks)) + 10
+        if panel.get('label'):
+            label_w += int(text_font.size * 1.4)
+    side = bar_w + label_w + (FIGURE_PAD if bar_w else 0)
+    box_h = y0 + ph - top
+    img, s = _fit(panel['rgb'], pw - side, box_h)
+    ih, iw = img.shape[:2]
+    # Image and colorbar are centred together in the cell
+    ix, iy = x0 + (pw - iw - side) // 2, top + (box_h - ih) // 2
+    canvas[iy:iy + ih, ix:ix + iw] = img
+
+    for mx, my, text in panel.get('markers', []):
+        cx, cy = ix + (mx + 0.5) * s, iy + (my + 0.5) * s
+        ops.append(('marker', (cx, cy)))
+        if text:
+            ops.append(('text', (cx + MARKER_SIZE, cy + MARKER_SIZE), text, text_font, MARKER_LABEL_RGB, None))
+
+    if bar_w:
+        bx, by, bh = ix + iw + FIGURE_PAD, iy, ih
+        grad = np.linspace(panel['vmax'], panel['vmin'], bh, dtype=np.float32)[:, None].repeat(bar_w, axis=1)
+        canvas[by:by + bh, bx:bx + bar_w] = colorize(grad, panel['cmap'], panel['vmin'], panel['vmax'])
+        ops.append(('rect', [bx, by, bx + bar_w - 1, by + bh - 1]))
+        span = panel['vmax'] - panel['vmin']
+        for t in np.linspace(panel['vmin'], panel['vmax'], COLORBAR_TICKS):
+            ty = by + (1 - ((t - panel['vmin']) / span if span > 0 else 0.0)) * (bh - 1)
+            ops.append(('line', [bx + bar_w, ty, bx + bar_w + 4, ty]))
+            ops.append(('text', (bx + bar_w + 6, ty), f'{t:.3g}', text_font, FIGURE_FG, 'lm'))
+        if panel.get('label'):
+            ops.append(('vtext', (bx + bar_w + label_w, by + bh / 2), panel['label'], text_font))
+    return ops
+
+def _draw_ops(pil, ops):
+    """Text pass: titles, tick labels, markers and rotated labels in one PIL draw."""
+    draw = ImageDraw.Draw(pil)
+    for op in ops:
+        kind = op[0]
+        if kind == 'text':
+            _, xy, text, font, fill, anchor = op
+            draw.text(xy, text, font=font, fill=fill, anchor=anchor)
+        elif kind == 'marker':
+            cx, cy = op[1]
+            draw.polygon([(cx, cy - MARKER_SIZE), (cx - MARKER_SIZE, cy + MARKER_SIZE), (cx + MARKER_SIZE, cy + MARKER_SIZE)],
+                         fill=MARKER_RGB, outline=(255, 255, 255))
+        elif kind == 'rect':
+            draw.rectangle(op[1], outline=FIGURE_FG)
+        elif kind == 'line':
+            draw.line(op[1], fill=FIGURE_FG)
+        elif kind == 'vtext':
+            # Colorbar label, rotated, right-aligned at x and centred on y
+            _, (x, y), text, font = op
+            tag = Image.new('RGB', (int(font.getlength(text)) + 2, int(font.size * 1.3)), FIGURE_BG)
+            ImageDraw.Draw(tag).text((1, 0), text, font=font, fill=FIGURE_FG)
+            tag = tag.rotate(90, expand=True)
+            pil.paste(tag, (int(x - tag.width), int(y - tag.height / 2)))
+
+def render_figure(panels, size, title=None):
+    """
+    Lay out panels (heatmap_panel() / image_panel()) in one row on a white canvas
+    of size (w, h) px, with an optional figure title. Returns the RGB uint8 image.
+    """
+    w, h = size
+    canvas = np.full((h, w, 3), FIGURE_BG, np.uint8)
+    title_font = get_font(max(FIGURE_MIN_FONT, h * FIGURE_TITLE_SCALE), bold=True)
+    text_font = get_font(max(FIGURE_MIN_FONT, h * FIGURE_TEXT_SCALE))
+    ops = []
+    top = FIGURE_PAD
+    if title:
+        ops.append(('text', ((w - title_font.getlength(title)) / 2, top), title, title_font, FIGURE_FG, None))
+        top += int(title_font.size * 1.6)
+    n = len(panels)
+    pw = (w - FIGURE_PAD * (n + 1)) // n
+    ph = h - top - FIGURE_PAD
+    for i, panel in enumerate(panels):
+        ops += _layout_panel(canvas, panel, FIGURE_PAD + i * (pw + FIGURE_PAD), top, pw, ph, title_font, text_font)
+    pil = Image.fromarray(canvas)
+    _draw_ops(pil, ops)
+    return np.asarray(pil)
+
+def encode_figure(rgb, fmt='png'):
+    """PNG or JPEG bytes of an RGB figure."""
+    ext = '.jpg' if fmt.lower() in ('jpg', 'jpeg') else '.png'
+    params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY] if ext == '.jpg' else [cv2.IMWRITE_PNG_COMPRESSION, 3]
+    ok, buf = cv2.imencode(ext, cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), params)
+    if not ok:
+        raise ValueError(f"Could not encode figure as {fmt}")
+    return buf.tobytes()
+
+def save_figure(rgb, path):
+    """
+    Write an RGB figure to path (format from the extension) or to a writable
+    file object (PNG); returns the encoded bytes.
+    """
+    if hasattr(path, 'write'):
+        data = encode_figure(rgb)
+        path.write(data)
+        return data
+    ext = os.path.splitext(path)[1].lstrip('.') or 'png'
+    data = encode_figure(rgb, ext)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return data
@@ -333,9 +333,12 @@ TRANSLATIONS = {
         'recommendations_pattern': 'Recommendations',
         'fourier': 'Fourier Analysis',
         'glcm': 'GLCM Texture',
+        'repeat': 'Repeat Unit',
+        'phase_local': 'Local Displacement',
         'histograms': 'Histograms',
         'random': 'random',
         'manual': 'manual',
+        'grid': 'grid',
         'report_language': 'Report Language',
         'test_illuminants': 'Test Illuminants',
         'pattern_global_threshold': 'Pattern Global Threshold',
@@ -383,6 +386,10 @@ TRANSLATIONS = {
         'lab_detailed_analysis': 'Detailed Lab* Color Space Analysis',
         'lab_recommendations': 'Lab* Recommendations',
         'de_summary_statistics': 'ΔE Summary Statistics',
+        'grid_sampling_note': 'Dense grid sampling: {n} cells at {pitch:.0f} px pitch, radius {radius} px. Statistics cover all cells; the table lists the {k} highest-ΔE2000 cells.',
+        'de_area_statistics': 'ΔE2000 Area Statistics',
+        'area_over_pass': 'Area above pass threshold',
+        'area_over_conditional': 'Area above conditional threshold',
         'lab_scatter_title': 'a* vs b* Chromaticity Scatter',
         'lab_components_mean': 'Lab Components – Mean',
         'overall_magnitude': 'Overall Magnitude',
@@ -428,6 +435,30 @@ TRANSLATIONS = {
         'anisotropy_ratio': 'Anisotropy Ratio',
         'metric': 'Metric',
 
+        # Local Phase Correlation
+        'phase_local_title': 'Local Phase Displacement',
+        'triage_note': 'Decided by coarse-to-fine triage on pyramid level {level} (1/{factor} scale): coarse composite {composite:.1f}. All scores, maps and figures in this report are from that coarse level.',
+        'phase_local_caption': 'Windowed phase correlation over {window}x{window} px windows every {step} px; arrows show the local shift of the sample against the reference.',
+        'phase_local_heatmap_title': 'Local Shift Magnitude',
+        'shift_magnitude_px': 'Shift (px)',
+        'max_local_shift': 'Max Local Shift',
+        'mean_local_shift': 'Mean Shift (dx, dy)',
+        'shift_variance': 'Shift Variance',
+        'reliable_windows': 'Reliable Windows',
+
+        # Repeat Unit Analysis
+        'repeat_title': 'Repeat Unit Analysis',
+        'repeat_subtitle': 'The pattern repeat is estimated from the autocorrelation of the reference; both images are cut into repeat-aligned tiles and compared repeat by repeat.',
+        'repeat_map_title': 'Per-Repeat Similarity',
+        'repeat_score_label': 'SSIM (%)',
+        'repeat_period': 'Repeat Size (W x H)',
+        'repeats_compared': 'Repeats Compared',
+        'repeat_mean_score': 'Mean Repeat SSIM',
+        'repeat_min_score': 'Worst Repeat SSIM',
+        'repeat_worst_title': 'Worst Repeats',
+        'repeat_position': 'Row, Column',
+        'repeat_bbox': 'Position (x, y) / Size',
+
         # RGB Histograms
         'histograms_title': 'Histograms (RGB)',
         'histogram_interpretation': 'Interpretation: RGB histograms show the distribution of color values across the image. Similar histogram shapes between Reference and Sample indicate consistent color reproduction. Shifts in peak positions suggest color bias; narrower distributions indicate more uniform color.',
@@ -445,6 +476,8 @@ TRANSLATIONS = {
         'glcm_asm': 'ASM',
         'glcm_comparison_title': 'GLCM Property Comparison',
         'glcm_heatmap_title': 'GLCM Matrix Visualization',
+        'glcm_maps_title': 'GLCM Texture Maps',
+        'glcm_maps_caption': 'Properties computed per {tile}x{tile} px tile; bright cells in the difference maps localize texture deviations.',
         'glcm_interpretation': 'Interpretation: Higher contrast indicates greater local intensity variation. Homogeneity measures pixel pair smoothness. Energy and ASM reflect texture uniformity. Correlation measures linear dependency of gray levels.',
     },
     
@@ -771,9 +804,12 @@ TRANSLATIONS = {
         'recommendations_pattern': 'Öneriler',
         'fourier': 'Fourier Analizi',
         'glcm': 'GLCM Doku',
+        'repeat': 'Tekrar Birimi',
+        'phase_local': 'Yerel Kayma',
         'histograms': 'Histogramlar',
         'random': 'rastgele',
         'manual': 'manuel',
+        'grid': 'ızgara',
         'report_language': 'Rapor Dili',
         'test_illuminants': 'Test Aydınlatmaları',
         'pattern_global_threshold': 'Desen Genel Eşik',
@@ -821,6 +857,10 @@ TRANSLATIONS = {
         'lab_detailed_analysis': 'Detaylı Lab* Renk Uzayı Analizi',
         'lab_recommendations': 'Lab* Önerileri',
         'de_summary_statistics': 'ΔE Özet İstatistikleri',
+        'grid_sampling_note': 'Yoğun ızgara örnekleme: {pitch:.0f} px aralıkla {n} hücre, yarıçap {radius} px. İstatistikler tüm hücreleri kapsar; tablo en yüksek ΔE2000 değerine sahip {k} hücreyi listeler.',
+        'de_area_statistics': 'ΔE2000 Alan İstatistikleri',
+        'area_over_pass': 'Geçme eşiğini aşan alan',
+        'area_over_conditional': 'Koşullu eşiği aşan alan',
         'lab_scatter_title': 'a* - b* Krominans Dağılımı',
         'lab_components_mean': 'Lab Bileşenleri – Ortalama',
         'overall_magnitude': 'Genel Büyüklük',
@@ -866,6 +906,30 @@ TRANSLATIONS = {
         'anisotropy_ratio': 'Anizotropi Oranı',
         'metric': 'Metrik',
 
+        # Yerel Faz Korelasyonu
+        'phase_local_title': 'Yerel Faz Kayması',
+        'triage_note': 'Kabaca-inceye ön eleme ile piramit seviyesi {level} (1/{factor} ölçek) üzerinde karar verildi: kaba bileşik skor {composite:.1f}. Bu rapordaki tüm skorlar, haritalar ve şekiller bu kaba seviyeden alınmıştır.',
+        'phase_local_caption': '{window}x{window} px pencerelerde, her {step} px adımda pencereli faz korelasyonu; oklar numunenin referansa göre yerel kaymasını gösterir.',
+        'phase_local_heatmap_title': 'Yerel Kayma Büyüklüğü',
+        'shift_magnitude_px': 'Kayma (px)',
+        'max_local_shift': 'Maks. Yerel Kayma',
+        'mean_local_shift': 'Ortalama Kayma (dx, dy)',
+        'shift_variance': 'Kayma Varyansı',
+        'reliable_windows': 'Güvenilir Pencereler',
+
+        # Rapor (Desen Tekrarı) Analizi
+        'repeat_title': 'Desen Tekrarı (Rapor) Analizi',
+        'repeat_subtitle': 'Desen tekrarı referansın otokorelasyonundan tahmin edilir; iki görüntü tekrara hizalı karolara bölünür ve tekrar tekrar karşılaştırılır.',
+        'repeat_map_title': 'Tekrar Başına Benzerlik',
+        'repeat_score_label': 'SSIM (%)',
+        'repeat_period': 'Tekrar Boyutu (G x Y)',
+        'repeats_compared': 'Karşılaştırılan Tekrar',
+        'repeat_mean_score': 'Ortalama Tekrar SSIM',
+        'repeat_min_score': 'En Kötü Tekrar SSIM',
+        'repeat_worst_title': 'En Kötü Tekrarlar',
+        'repeat_position': 'Satır, Sütun',
+        'repeat_bbox': 'Konum (x, y) / Boyut',
+
         # RGB Histograms
         'histograms_title': 'Histogramlar (RGB)',
         'histogram_interpretation': 'Yorum: RGB histogramları, görüntüdeki renk değerlerinin dağılımını gösterir. Referans ve Numune arasındaki benzer histogram şekilleri tutarlı renk üretimini gösterir. Tepe konumlarındaki kaymalar renk sapmasına işaret eder; daha dar dağılımlar daha homojen rengi gösterir.',
@@ -883,6 +947,8 @@ TRANSLATIONS = {
         'glcm_asm': 'ASM',
         'glcm_comparison_title': 'GLCM Özellik Karşılaştırması',
         'glcm_heatmap_title': 'GLCM Matris Görselleştirmesi',
+        'glcm_maps_title': 'GLCM Doku Haritaları',
+        'glcm_maps_caption': 'Özellikler {tile}x{tile} piksellik karolar için hesaplanmıştır; fark haritalarındaki parlak hücreler doku sapmalarını konumlandırır.',
         'glcm_interpretation': 'Yorum: Yüksek kontrast, yerel yoğunluk varyasyonunun fazla olduğunu gösterir. Homojenlik piksel çifti düzgünlüğünü ölçer. Enerji ve ASM doku tekdüzeliğini yansıtır. Korelasyon gri seviyelerin doğrusal bağımlılığını ölçer.',
     }
 }
@@ -154,7 +154,7 @@ def generate_receipt(pdf_path, settings, processed_images, report_id, operator_n
         single_title = f"[ {tr('single_image_unit_settings')} ]"
         single_content.append(Paragraph(single_title, style_section_head))
         sampling_mode_val = settings.get('sampling_mode', 'random')
-        sampling_mode_translated = tr(sampling_mode_val) if sampling_mode_val in ['random', 'manual'] else sampling_mode_val
+        sampling_mode_translated = tr(sampling_mode_val) if sampling_mode_val in ['random', 'manual', 'grid'] else sampling_mode_val
         single_content.append(Paragraph(f"{tr('sampling_mode')}: {sampling_mode_translated}", style_item))
         single_content.append(Paragraph(f"{tr('sampling_count')}: {settings.get('region_count', 5)}", style_item))
         
@@ -196,7 +196,7 @@ def generate_receipt(pdf_path, settings, processed_images, report_id, operator_n
         left_content.append(Paragraph(f"{tr('color_scoring_method')}: {scoring_display}", style_item_bold))
         c_thresh = settings.get('thresholds', {})
         sampling_mode_val = settings.get('sampling_mode', 'random')
-        sampling_mode_translated = tr(sampling_mode_val) if sampling_mode_val in ['random', 'manual'] else sampling_mode_val
+        sampling_mode_translated = tr(sampling_mode_val) if sampling_mode_val in ['random', 'manual', 'grid'] else sampling_mode_val
         left_content.append(Paragraph(f"{tr('pass_threshold')}: {c_thresh.get('pass', 2.0)}", style_item))
         left_content.append(Paragraph(f"{tr('cond_threshold')}: {c_thresh.get('conditional', 5.0)}", style_item))
         left_content.append(Paragraph(f"{tr('global_thresh')}: {settings.get('global_threshold', 5.0)}", style_item))
@@ -277,15 +277,16 @@ def generate_receipt(pdf_path, settings, processed_images, report_id, operator_n
         ('ssim', 'ssim'), ('gradient', 'gradient'),
         ('phase', 'phase'), ('structural', 'structural'),
         ('fourier', 'fourier'), ('glcm', 'glcm'),
+        ('phase_local', 'phase_local', False), ('repeat', 'repeat', False),
         ('gradient_boundary', 'gradient_boundary'), ('phase_boundary', 'phase_boundary'), 
         ('recommendations_pattern', 'recommendations_pattern')
     ]
 
     def build_checklist(items_list):
         content = []
-        for key, label_key in items_list:
-            # Check key in sections dict (default True matches backend behavior)
-            is_checked = sections.get(key, True)
+        for key, label_key, *default in items_list:
+            # Check key in sections dict (defaults match backend behavior: on unless opt-in)
+            is_checked = sections.get(key, default[0] if default else True)
             mark = "☑" if is_checked else "☐"
             label = tr(label_key)
             content.append(Paragraph(f"{mark} {label}", style_item))
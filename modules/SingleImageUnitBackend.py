@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-import os, random
+import os
 import numpy as np
 import cv2
 from reportlab.lib import colors
@@ -15,7 +15,8 @@ from modules.ReportUtils import (
     BG_LIGHT_RED, BG_LIGHT_GREEN, BG_LIGHT_BLUE
 )
 from modules.ColorUnitBackend import (
-    rgb_to_cmyk, srgb_to_xyz, xyz_to_lab, adapt_to_illuminant, WHITE_POINTS,
+    rgb_to_cmyk, srgb_to_xyz, xyz_to_lab, rgb01_to_lab, adapt_to_illuminant, WHITE_POINTS, ImageContext,
+    is_point_valid, make_points_strict,
     badge, COMPANY_NAME, COMPANY_SUBTITLE, BLUE1, plot_rgb_histogram
 )
 from modules.ReportTranslations import get_translator
@@ -32,75 +33,6 @@ REPORT_TITLE = "Single Image Analysis Report"
 # LOGIC
 # =================================================================================================
 
-def is_point_valid(x, y, region, img_w, img_h):
-    """
-    Validate if a point (x, y) in GLOBAL coordinates is within the region and image bounds.
-    Reuse logic from ColorUnitBackend (could be moved to shared, but simple enough to duplicate for isolation if needed).
-    Actually, let's keep it self-contained here or import if we strictly want to avoid dupe. 
-    User requested isolation. Duplicating small logic is safer than importing from ColorUnitBackend which might fail if dependencies change.
-    """
-    if not (0 <= x < img_w and 0 <= y < img_h):
-        return False
-    
-    if not region: 
-        return True 
-        
-    rtype = region.get('type', 'rect')
-    
-    if rtype == 'circle':
-        cx = region.get('cx')
-        cy = region.get('cy')
-        r = region.get('r')
-        if cx is None or cy is None or r is None: return False
-        return (x - cx)**2 + (y - cy)**2 <= r**2
-    else:
-        rx = region.get('x')
-        ry = region.get('y')
-        w = region.get('w')
-        h = region.get('h')
-        if rx is None or ry is None or w is None or h is None: return False
-        return rx <= x <= rx + w and ry <= y <= ry + h
-
-def make_points_strict(region, n, img_w, img_h):
-    """
-    Generate exactly n random points uniformly distributed INSIDE the region.
-    """
-    points = []
-    if n <= 0: return points
-    
-    # Bbox
-    if not region:
-        min_x, max_x = 0, img_w
-        min_y, max_y = 0, img_h
-    else:
-        rtype = region.get('type', 'rect')
-        if rtype == 'circle':
-            cx, cy, r = region['cx'], region['cy'], region['r']
-            min_x, max_x = cx - r, cx + r
-            min_y, max_y = cy - r, cy + r
-        else:
-            min_x, max_x = region['x'], region['x'] + region['w']
-            min_y, max_y = region['y'], region['y'] + region['h']
-            
-    min_x = max(0, min_x)
-    max_x = min(img_w, max_x)
-    min_y = max(0, min_y)
-    max_y = min(img_h, max_y)
-    
-    attempts = 0
-    max_attempts = n * 200
-    
-    while len(points) < n and attempts < max_attempts:
-        attempts += 1
-        px = random.randint(int(min_x), int(max_x - 1) if max_x > min_x else int(min_x))
-        py = random.randint(int(min_y), int(max_y - 1) if max_y > min_y else int(min_y))
-        
-        if is_point_valid(px, py, region, img_w, img_h):
-            if (px, py) not in points:
-                points.append((px, py))
-                
-    return points
-
 def plot_single_spectral_proxy(mean_rgb, path):
     """
     Plot spectral curve proxy for a single image.
@@ -164,7 +96,9 @@ def analyze_and_generate(sample_img_bgr, settings, output_path, report_id=None,
     points = valid_manual[:n_reg]
     needed = n_reg - len(points)
     if needed > 0:
-        random_points = make_points_strict(region_geo, needed, global_w, global_h)
+        random_points = make_points_strict(region_geo, needed, global_w, global_h,
+                                           min_spacing=settings.get('sampling_min_spacing', 0),
+                                           seed=settings.get('sampling_seed'))
         points.extend([(px, py, False) for px, py in random_points])
     points = points[:n_reg]
     
@@ -173,15 +107,12 @@ def analyze_and_generate(sample_img_bgr, settings, output_path, report_id=None,
     measurements = []
     r_vis = max(12, int(min(h, w) * 0.04)) # generic radius for vis
     
-    # Handle Alpha
-    if sample_img_bgr.shape[2] == 4:
-        img_bgr = sample_img_bgr[:, :, :3]
-        mask_alpha = sample_img_bgr[:, :, 3]
-    else:
-        img_bgr = sample_img_bgr
-        mask_alpha = np.full((h, w), 255, dtype=np.uint8)
+    # Alpha is handled by the sampler (transparent pixels are excluded)
+    img_bgr = sample_img_bgr[:, :, :3]
         
-    for i, point_data in enumerate(points):
+    # Local area averaging (consistent with ColorUnit region_stats), all points in one query
+    local_pts = []
+    for point_data in points:
         # Handle both old format (px, py) and new format (px, py, isManual)
         if isinstance(point_data, tuple) and len(point_data) == 3:
             gx, gy, _ = point_data
@@ -192,27 +123,20 @@ def analyze_and_generate(sample_img_bgr, settings, output_path, report_id=None,
         ly = gy - crop_off_y
         lx = max(0, min(w - 1, lx))
         ly = max(0, min(h - 1, ly))
+        local_pts.append((gx, gy, int(lx), int(ly)))
+    
+    # Per-request image cache: region sampler here, histograms in the PDF and web views
+    ctx = ImageContext(sample_img_bgr)
+    circle_stats = None
+    if local_pts:
+        circle_stats = ctx.sampler.circles([p[2] for p in local_pts], [p[3] for p in local_pts], r_vis)
+        ctx.release('sampler')
         
-        # Local area averaging (consistent with ColorUnit region_stats)
-        cx, cy = int(lx), int(ly)
-        rad = r_vis
-        
-        y_grid, x_grid = np.ogrid[:h, :w]
-        mask = (x_grid - cx)**2 + (y_grid - cy)**2 <= rad*rad
-        
-        if not np.any(mask):
-            # Fallback to single pixel
-            bgr_val = img_bgr[ly, lx]
+    for i, (gx, gy, lx, ly) in enumerate(local_pts):
+        if circle_stats['count'][i] > 0:
+            bgr_val = circle_stats['mean'][i]
         else:
-            bgr_in_circle = img_bgr[mask]
-            alpha_in_circle = mask_alpha[mask]
-            valid_mask = alpha_in_circle > 0
-            
-            if np.any(valid_mask):
-                bgr_vals = bgr_in_circle[valid_mask]
-                bgr_val = bgr_vals.mean(axis=0)
-            else:
-                 bgr_val = img_bgr[ly, lx] # Fallback
+            bgr_val = img_bgr[ly, lx] # Fallback
         
         rgb_val = bgr_val[::-1]
         rgb01 = rgb_val / 255.0
@@ -224,9 +148,12 @@ def analyze_and_generate(sample_img_bgr, settings, output_path, report_id=None,
         primary_ill = settings.get('primary_illuminant', 'D65')
         xyz = adapt_to_illuminant(xyz_d65, primary_ill)
         
-        # Lab
-        white_point = WHITE_POINTS.get(primary_ill, WHITE_POINTS['D65'])
-        lab = xyz_to_lab(xyz, white_point)
+        # Lab (float pipeline; D65 matches the comparison backend exactly)
+        if primary_ill == 'D65' or primary_ill not in WHITE_POINTS:
+            lab = rgb01_to_lab(rgb01).astype(np.float64)
+        else:
+            # srgb_to_xyz is on a 0-100 scale, white points are Y = 1
+            lab = xyz_to_lab(xyz / 100.0, WHITE_POINTS[primary_ill])
         
         cmyk = rgb_to_cmyk(tuple(rgb01))
         
@@ -249,7 +176,7 @@ def analyze_and_generate(sample_img_bgr, settings, output_path, report_id=None,
         plot_single_spectral_proxy(mean_rgb, spectral_plot_path)
 
     # 4. Generate PDF
-    _generate_pdf(sample_img_bgr, measurements, points, output_path, settings, timestamp, report_id, spectral_plot_path)
+    _generate_pdf(sample_img_bgr, measurements, points, output_path, settings, timestamp, report_id, spectral_plot_path, ctx=ctx)
     
     # Cleanup plot
     if spectral_plot_path and os.path.exists(spectral_plot_path):
@@ -259,10 +186,11 @@ def analyze_and_generate(sample_img_bgr, settings, output_path, report_id=None,
     
     return {
         'output_path': output_path,
-        'points': points
+        'points': points,
+        'ctx': ctx
     }
 
-def _generate_pdf(sample_img, measurements, points, out_path, settings, timestamp, report_id, spectral_plot_path=None):
+def _generate_pdf(sample_img, measurements, points, out_path, settings, timestamp, report_id, spectral_plot_path=None, ctx=None):
     _temp_files = []  # Collect temp files for cleanup AFTER doc.build()
     doc = SimpleDocTemplate(out_path, pagesize=A4, 
                             leftMargin=MARGIN_L, rightMargin=MARGIN_R, 
@@ -558,7 +486,7 @@ def _generate_pdf(sample_img, measurements, points, out_path, settings, timestam
             _hist_tmp = _tmpmod_hist.mkdtemp()
             hist_path = os.path.join(_hist_tmp, "hist_single.png")
             hist_title = 'Numune RGB Histogramı' if report_lang == 'tr' else 'Sample RGB Histogram'
-            plot_rgb_histogram(sample_img, hist_path, title=hist_title)
+            plot_rgb_histogram(ctx if ctx is not None else sample_img, hist_path, title=hist_title)
             hist_interp = tr('histogram_interpretation_single')
 
             kt_items = []
@@ -56,7 +56,7 @@ var T={en:{
 'rpt.spectral':'Spectral Proxy','rpt.histograms':'RGB Histograms','rpt.visual.diff':'Visual Diff','rpt.illuminant':'Illuminant Analysis',
 'rpt.recommendations':'Recommendations','rpt.ssim':'Structural SSIM','rpt.gradient':'Gradient Similarity',
 'rpt.phase':'Phase Correlation','rpt.structural':'Structural Difference','rpt.fourier':'Fourier Domain Analysis',
-'rpt.glcm':'GLCM Texture Analysis',
+'rpt.glcm':'GLCM Texture Analysis','rpt.repeat.unit':'Repeat Unit Analysis','rpt.phase.local':'Local Phase Displacement',
 'rpt.grad.bound':'Gradient Boundary','rpt.phase.bound':'Phase Boundary',
 'rpt.summary':'Summary','rpt.conclusion':'Conclusion','rpt.pattern.rec':'Recommendations',
 'btab.console':'Console','btab.results':'Results','btab.clear':'Clear',
@@ -200,7 +200,7 @@ var T={en:{
 'rpt.spectral':'Spektral Vekil','rpt.histograms':'RGB Histogramları','rpt.visual.diff':'Görsel Fark','rpt.illuminant':'Aydınlatma Analizi',
 'rpt.recommendations':'Öneriler','rpt.ssim':'Yapısal SSIM','rpt.gradient':'Gradyan Benzerliği',
 'rpt.phase':'Faz Korelasyonu','rpt.structural':'Yapısal Fark','rpt.fourier':'Fourier Alan Analizi',
-'rpt.glcm':'GLCM Doku Analizi',
+'rpt.glcm':'GLCM Doku Analizi','rpt.repeat.unit':'Desen Tekrarı Analizi','rpt.phase.local':'Yerel Faz Kayması',
 'rpt.grad.bound':'Gradyan Sınırı','rpt.phase.bound':'Faz Sınırı',
 'rpt.summary':'Özet','rpt.conclusion':'Sonuç','rpt.pattern.rec':'Öneriler',
 'btab.console':'Konsol','btab.results':'Sonuçlar','btab.clear':'Temizle',
@@ -1383,7 +1383,7 @@ function updateReportSectionsForMode(){
     var colorOnlyIds=['rptColorSpaces','rptDiffMetrics','rptStats','rptVisualDiff'];
     /* All Pattern sections NOT in Single Image report */
     var patternIds=['rptEnableSsim','rptEnableGradient','rptEnablePhase','rptEnableStructural',
-        'rptEnableFourier','rptEnableGlcm','rptGradBound','rptPhaseBound','rptSummary','rptConclusion','rptPatternRec'];
+        'rptEnableFourier','rptEnableGlcm','rptEnablePhaseLocal','rptEnableRepeat','rptGradBound','rptPhaseBound','rptSummary','rptConclusion','rptPatternRec'];
     var ids=colorOnlyIds.concat(patternIds);
     var isSingle=State.singleMode;
     ids.forEach(function(id){
@@ -1396,7 +1396,7 @@ function updateReportSectionsForMode(){
         }else{
             el.disabled=false;
             if(id in _savedDualChecks){el.checked=_savedDualChecks[id];delete _savedDualChecks[id];}
-            else el.checked=true;
+            else el.checked=el.defaultChecked;
         }
         var lbl=el.closest('label');
         if(lbl) lbl.classList.toggle('disabled',isSingle);
@@ -1476,6 +1476,7 @@ function collectSettings(){
             'phase':chk('rptEnablePhase',true),'structural':chk('rptEnableStructural',true),
             'fourier':State.singleMode?true:chk('rptEnableFourier',true),
             'glcm':chk('rptEnableGlcm',true),
+            'phase_local':chk('rptEnablePhaseLocal',false),'repeat':chk('rptEnableRepeat',false),
             'gradient_boundary':chk('rptGradBound',true),'phase_boundary':chk('rptPhaseBound',true),
             'recommendations_pattern':chk('rptPatternRec',true)},
         sampling_points:pts,sampling_mode:State.samplingMode,
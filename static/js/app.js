@@ -2518,7 +2518,8 @@ function buildDetailedResults(data) {
             {key: 'gradient_boundary', title: t('rpt.gradient.boundary'), caption: t('rpt.gradient.boundary.caption')},
             {key: 'gradient_filled', title: t('rpt.gradient.filled'), caption: t('rpt.gradient.filled.caption')},
             {key: 'phase_boundary', title: t('rpt.phase.boundary'), caption: t('rpt.phase.boundary.caption')},
-            {key: 'phase_filled', title: t('rpt.phase.filled'), caption: t('rpt.phase.filled.caption')}
+            {key: 'phase_filled', title: t('rpt.phase.filled'), caption: t('rpt.phase.filled.caption')},
+            {key: 'phase_displacement', title: t('rpt.phase.displacement'), caption: t('rpt.phase.displacement.caption')}
         ]);
 
         html += '<div class="wrpt-section-title">' + t('rpt.structural.analysis') + '</div>';
@@ -2532,12 +2533,14 @@ function buildDetailedResults(data) {
         /* ══════════════════════════════════════
            TEXTURE & FREQUENCY ANALYSIS
            ══════════════════════════════════════ */
-        var hasTex = imgs.fourier_spectrum || imgs.glcm_heatmap;
+        var hasTex = imgs.fourier_spectrum || imgs.repeat_scores || imgs.glcm_heatmap;
         if (hasTex) {
             html += _wrptColStart('texture-detail', t('rpt.texture.frequency'), _wrptIcon('texture'));
             html += _wrptGallery(imgs, [
                 {key: 'fourier_spectrum', title: t('rpt.fourier'), caption: t('rpt.fourier.caption')},
-                {key: 'glcm_heatmap', title: t('rpt.glcm'), caption: t('rpt.glcm.caption')}
+                {key: 'repeat_scores', title: t('rpt.repeat'), caption: t('rpt.repeat.caption')},
+                {key: 'glcm_heatmap', title: t('rpt.glcm'), caption: t('rpt.glcm.caption')},
+                {key: 'glcm_texture_maps', title: t('rpt.glcm.maps'), caption: t('rpt.glcm.maps.caption')}
             ]);
             html += _wrptColEnd();
         }
@@ -3342,6 +3345,8 @@ function collectSettings() {
             'structural': getCheck('enable_structural', true),
             'fourier': isSingleMode ? getSingleSection('fourier', true) : getCheck('enable_fourier', true),
             'glcm': getCheck('enable_glcm', true),
+            'phase_local': getCheck('enable_phase_local', false),
+            'repeat': getCheck('enable_repeat', false),
             'gradient_boundary': getCheck('enable_grad_bound', true),
             'phase_boundary': getCheck('enable_phase_bound', true),
             'recommendations_pattern': getCheck('enable_rec', true),
@@ -4267,10 +4272,10 @@ function proceedResetSettings() {
     var stc = document.getElementById('structural_cond'); if (stc) stc.value = "70.0";
     var pt = document.getElementById('pattern_global_thresh'); if (pt) pt.value = "75.0";
 
-    var patternChecks = ['enable_ssim', 'enable_gradient', 'enable_phase', 'enable_grad_bound', 'enable_phase_bound', 'enable_summary', 'enable_concl', 'enable_rec', 'enable_structural', 'enable_fourier', 'enable_glcm'];
+    var patternChecks = ['enable_ssim', 'enable_gradient', 'enable_phase', 'enable_grad_bound', 'enable_phase_bound', 'enable_summary', 'enable_concl', 'enable_rec', 'enable_structural', 'enable_fourier', 'enable_glcm', 'enable_phase_local', 'enable_repeat'];
     patternChecks.forEach(function (id) {
         var el = document.getElementById(id);
-        if (el) el.checked = true;
+        if (el) el.checked = el.defaultChecked;  // opt-in sections are unchecked by default
     });
 
     // Single Image Report Sections
@@ -638,6 +638,8 @@ var I18n = {
             'structural.difference': 'Structural Difference',
             'fourier.domain.analysis': 'Fourier Domain Analysis',
             'glcm.texture.analysis': 'GLCM Texture Analysis',
+            'repeat.unit.analysis': 'Repeat Unit Analysis',
+            'phase.local.analysis': 'Local Phase Displacement',
             'pattern.unit.boundary': 'Pattern Unit: Boundary & Report',
             'gradient.boundary': 'Gradient Boundary',
             'phase.boundary': 'Phase Boundary',
@@ -700,14 +702,20 @@ var I18n = {
             'rpt.phase.boundary.caption': 'Significant phase difference regions outlined on the sample.',
             'rpt.phase.filled': 'Phase Filled',
             'rpt.phase.filled.caption': 'Phase difference regions with filled red overlay.',
+            'rpt.phase.displacement': 'Local Phase Displacement',
+            'rpt.phase.displacement.caption': 'Local shift of the sample from windowed phase correlation; bright areas and long arrows mark stretch or misregistration.',
             'rpt.multi.method': 'Multi-Method Comparison',
             'rpt.multi.method.caption': 'Gradient magnitude, combined methods, and noise-filtered difference maps.',
             'rpt.pure.diff': 'Pure Differences',
             'rpt.pure.diff.caption': 'Isolated pure difference regions (red on black).',
             'rpt.fourier': 'Fourier Spectrum (FFT)',
             'rpt.fourier.caption': '2D FFT magnitude spectrum showing frequency-domain characteristics.',
+            'rpt.repeat': 'Per-Repeat Similarity',
+            'rpt.repeat.caption': 'SSIM of each pattern repeat against the same repeat of the reference; outlined cells are the worst repeats.',
             'rpt.glcm': 'GLCM Texture Heatmap',
             'rpt.glcm.caption': 'Gray-Level Co-occurrence Matrix texture feature comparison heatmaps.',
+            'rpt.glcm.maps': 'GLCM Texture Maps',
+            'rpt.glcm.maps.caption': 'Per-tile contrast and homogeneity maps localizing texture deviations.',
             'rpt.histogram.single': 'RGB Histogram',
             'rpt.histogram.single.caption': 'RGB channel distribution of the sample image.',
             'rpt.spectral.single': 'Spectral Distribution (Proxy)',
@@ -1358,6 +1366,8 @@ var I18n = {
             'structural.difference': 'Yapısal Fark',
             'fourier.domain.analysis': 'Fourier Alan Analizi',
             'glcm.texture.analysis': 'GLCM Doku Analizi',
+            'repeat.unit.analysis': 'Desen Tekrarı Analizi',
+            'phase.local.analysis': 'Yerel Faz Kayması',
             'pattern.unit.boundary': 'Desen Birimi: Sınır ve Rapor',
             'gradient.boundary': 'Gradyan Sınırı',
             'phase.boundary': 'Faz Sınırı',
@@ -1420,14 +1430,20 @@ var I18n = {
             'rpt.phase.boundary.caption': 'Numune üzerinde önemli faz fark bölgeleri.',
             'rpt.phase.filled': 'Faz Dolgulu',
             'rpt.phase.filled.caption': 'Kırmızı dolgulu faz fark bölgeleri.',
+            'rpt.phase.displacement': 'Yerel Faz Kayması',
+            'rpt.phase.displacement.caption': 'Pencereli faz korelasyonu ile numunenin yerel kayması; parlak alanlar ve uzun oklar esneme veya baskı kaymasını gösterir.',
             'rpt.multi.method': 'Çoklu Yöntem Karşılaştırması',
             'rpt.multi.method.caption': 'Gradyan büyüklüğü, birleşik yöntemler ve gürültü filtrelenmiş fark haritaları.',
             'rpt.pure.diff': 'Saf Farklar',
             'rpt.pure.diff.caption': 'İzole edilmiş saf fark bölgeleri (siyah üzerine kırmızı).',
             'rpt.fourier': 'Fourier Spektrumu (FFT)',
             'rpt.fourier.caption': 'Frekans alanı özelliklerini gösteren 2D FFT büyüklük spektrumu.',
+            'rpt.repeat': 'Tekrar Başına Benzerlik',
+            'rpt.repeat.caption': 'Her desen tekrarının referanstaki aynı tekrara göre SSIM değeri; çerçeveli hücreler en kötü tekrarlardır.',
             'rpt.glcm': 'GLCM Doku Isı Haritası',
             'rpt.glcm.caption': 'Gri Seviye Eş-oluşum Matrisi doku özelliği karşılaştırma ısı haritaları.',
+            'rpt.glcm.maps': 'GLCM Doku Haritaları',
+            'rpt.glcm.maps.caption': 'Doku sapmalarını konumlandıran karo bazlı kontrast ve homojenlik haritaları.',
             'rpt.histogram.single': 'RGB Histogramı',
             'rpt.histogram.single.caption': 'Numune görüntüsünün RGB kanal dağılımı.',
             'rpt.spectral.single': 'Spektral Dağılım (Vekil)',
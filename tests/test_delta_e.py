@@ -0,0 +1,56 @@
+"""Regression tests for the vectorized ΔE engine (modules/ColorUnitBackend.py)."""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.ColorUnitBackend import delta_e_batch, deltaE76, deltaE94, deltaE2000
+
+# Sharma, Wu & Dalal (2005) CIEDE2000 test pairs and expected ΔE00
+SHARMA_PAIRS = [
+    ((50.0, 2.6772, -79.7751), (50.0, 0.0, -82.7485), 2.0425),
+    ((50.0, -1.0, 2.0), (50.0, 0.0, 0.0), 2.3669),
+    ((50.0, 2.49, -0.001), (50.0, -2.49, 0.0009), 7.1792),
+    ((50.0, 2.5, 0.0), (73.0, 25.0, -18.0), 27.1492),
+    ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+    ((2.0776, 0.0795, -1.135), (0.9033, -0.0636, -0.5514), 0.9082),
+]
+
+
+def _random_lab(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(0, 100, n), rng.uniform(-90, 90, n), rng.uniform(-90, 90, n)])
+
+
+def test_batch_matches_scalar():
+    lab1, lab2 = _random_lab(200, 1), _random_lab(200, 2)
+    # Include achromatic colors, where the ΔE2000 hue terms are special-cased
+    lab1[:5, 1:] = 0.0
+    lab2[3:8, 1:] = 0.0
+    batch = delta_e_batch(lab1, lab2)
+    for i in range(len(lab1)):
+        assert abs(batch['de76'][i] - deltaE76(lab1[i], lab2[i])) < 1e-12
+        assert abs(batch['de94'][i] - deltaE94(lab1[i], lab2[i])) < 1e-12
+        assert abs(batch['de00'][i] - deltaE2000(lab1[i], lab2[i])) < 1e-12
+
+
+def test_pairwise_matches_scalar():
+    lab1, lab2 = _random_lab(7, 3), _random_lab(5, 4)
+    batch = delta_e_batch(lab1, lab2, pairwise=True)
+    assert batch['de00'].shape == (7, 5)
+    for i in range(7):
+        for j in range(5):
+            assert abs(batch['de76'][i, j] - deltaE76(lab1[i], lab2[j])) < 1e-12
+            assert abs(batch['de94'][i, j] - deltaE94(lab1[i], lab2[j])) < 1e-12
+            assert abs(batch['de00'][i, j] - deltaE2000(lab1[i], lab2[j])) < 1e-12
+
+
+def test_de2000_reference_pairs():
+    lab1 = np.array([p[0] for p in SHARMA_PAIRS])
+    lab2 = np.array([p[1] for p in SHARMA_PAIRS])
+    expected = np.array([p[2] for p in SHARMA_PAIRS])
+    assert np.allclose(delta_e_batch(lab1, lab2)['de00'], expected, atol=1e-4)
+    # ΔE2000 is symmetric in its arguments
+    assert np.allclose(delta_e_batch(lab2, lab1)['de00'], expected, atol=1e-4)
@@ -0,0 +1,48 @@
+"""Regression tests for the float32 SSIM engine (modules/PatternUnitBackend.py)."""
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.PatternUnitBackend import fast_ssim, ssim_stats
+
+metrics = pytest.importorskip('skimage.metrics')
+
+
+def _pair(h=120, w=150):
+    rng = np.random.default_rng(0)
+    a = cv2.GaussianBlur((rng.random((h, w)) * 255).astype(np.uint8), (5, 5), 0)
+    noise = rng.normal(0, 12, (h, w))
+    b = np.clip(a.astype(np.float64) * 0.9 + 15 + noise, 0, 255).astype(np.uint8)
+    return a, b
+
+
+def test_box_ssim_matches_skimage():
+    a, b = _pair()
+    score, s_map = fast_ssim(a, b)
+    ref_score, ref_map = metrics.structural_similarity(a, b, data_range=255, full=True)
+    assert abs(score - ref_score) < 1e-5
+    assert np.abs(s_map - ref_map).max() < 1e-4
+
+
+def test_gaussian_ssim_matches_skimage():
+    a, b = _pair()
+    score, _ = fast_ssim(a, b, gaussian=True)
+    ref_score = metrics.structural_similarity(a, b, data_range=255, gaussian_weights=True, sigma=1.5,
+                                              use_sample_covariance=False)
+    assert abs(score - ref_score) < 1e-5
+
+
+def test_reused_stats_match_fresh_computation():
+    a, b = _pair()
+    sa, sb = ssim_stats(a), ssim_stats(b)
+    assert fast_ssim(a, b, stats_a=sa, stats_b=sb)[0] == fast_ssim(a, b)[0]
+
+
+def test_identical_images_score_one():
+    a, _ = _pair()
+    assert abs(fast_ssim(a, a.copy())[0] - 1.0) < 1e-6
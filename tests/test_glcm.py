@@ -0,0 +1,53 @@
+"""Regression tests for the in-house GLCM engine (modules/PatternUnitBackend.py)."""
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.PatternUnitBackend import GLCM_PROPS, glcm_matrix, glcm_properties
+
+feature = pytest.importorskip('skimage.feature')
+
+DISTANCES = (1, 2, 3)
+ANGLES = (0, np.pi / 4, np.pi / 2, 3 * np.pi / 4)
+
+
+def _quantized(levels=32, h=80, w=96):
+    rng = np.random.default_rng(0)
+    img = cv2.GaussianBlur((rng.random((h, w)) * 255).astype(np.uint8), (5, 5), 0)
+    return (img.astype(np.uint16) * levels // 256).astype(np.uint8)
+
+
+def test_glcm_matrix_matches_skimage():
+    q = _quantized()
+    for symmetric in (False, True):
+        P = glcm_matrix(q, levels=32, distances=DISTANCES, angles=ANGLES, symmetric=symmetric, normed=True)
+        ref = feature.graycomatrix(q, DISTANCES, ANGLES, levels=32, symmetric=symmetric, normed=True)
+        assert P.shape == ref.shape
+        assert np.abs(P - ref).max() < 1e-13
+
+
+def test_glcm_properties_match_skimage():
+    q = _quantized()
+    P = feature.graycomatrix(q, DISTANCES, ANGLES, levels=32, symmetric=True, normed=True)
+    props = glcm_properties(P)
+    for prop in GLCM_PROPS:
+        assert np.abs(props[prop] - feature.graycoprops(P, prop)).max() < 1e-13, prop
+
+
+def test_full_mask_matches_unmasked():
+    q = _quantized()
+    full = np.full(q.shape, 255, dtype=np.uint8)
+    P = glcm_matrix(q, levels=32, distances=DISTANCES, angles=ANGLES)
+    assert np.array_equal(glcm_matrix(q, levels=32, distances=DISTANCES, angles=ANGLES, mask=full), P)
+
+
+def test_flat_image_correlation_is_one():
+    q = np.full((20, 20), 5, dtype=np.uint8)
+    props = glcm_properties(glcm_matrix(q, levels=8))
+    assert np.all(props['correlation'] == 1.0)
+    assert np.all(props['contrast'] == 0.0)
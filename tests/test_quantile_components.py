@@ -0,0 +1,60 @@
+"""Regression tests for histogram_quantile and filter_components (modules/PatternUnitBackend.py)."""
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.PatternUnitBackend import filter_components, histogram_quantile
+
+
+def test_quantile_empty_input_is_nan():
+    assert math.isnan(histogram_quantile(np.array([], dtype=np.float32), 0.5))
+    assert math.isnan(histogram_quantile(np.zeros((0, 4), dtype=np.uint8), 0.99))
+
+
+def test_quantile_single_and_constant_values():
+    assert histogram_quantile(np.array([3.5]), 0.9) == 3.5
+    assert histogram_quantile(np.full((10, 10), 7, dtype=np.uint8), 0.25) == 7.0
+
+
+def test_quantile_matches_percentile():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(300, 200)).astype(np.float32)
+    x[:5] = 40.0   # heavy tail, so most values share a few bins
+    for q in (0.0, 0.01, 0.5, 0.9, 0.999, 1.0):
+        assert abs(histogram_quantile(x, q) - float(np.percentile(x, q * 100))) < 1e-5
+    ints = rng.integers(0, 5, 1001)
+    for q in (0.1, 0.5, 0.75):
+        assert histogram_quantile(ints, q) == float(np.percentile(ints, q * 100))
+
+
+def test_components_empty_mask():
+    filtered, defects = filter_components(np.zeros((40, 50), dtype=np.uint8), 1)
+    assert not filtered.any()
+    assert defects['area'].shape == (0,)
+    assert defects['bbox'].shape == (0, 4)
+    assert defects['mean_intensity'].shape == (0,)
+
+
+def test_components_full_mask():
+    binary = np.full((40, 50), 255, dtype=np.uint8)
+    intensity = np.full(binary.shape, 0.25)
+    filtered, defects = filter_components(binary, 10, intensity)
+    assert np.array_equal(filtered, binary)
+    assert defects['area'].tolist() == [2000]
+    assert defects['bbox'].tolist() == [[0, 0, 50, 40]]
+    assert np.allclose(defects['mean_intensity'], [0.25])
+
+
+def test_components_area_filter_and_order():
+    binary = np.zeros((40, 50), dtype=np.uint8)
+    binary[2:4, 2:4] = 255          # 4 px, dropped
+    binary[10:15, 10:20] = 255      # 50 px
+    binary[25:35, 30:45] = 255      # 150 px
+    filtered, defects = filter_components(binary, 5)
+    assert defects['area'].tolist() == [150, 50]
+    assert not filtered[2:4, 2:4].any()
+    assert int(np.count_nonzero(filtered)) == 200
@@ -0,0 +1,81 @@
+"""Regression tests for RegionSampler circle/box statistics (modules/ColorUnitBackend.py)."""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.ColorUnitBackend import RegionSampler, SAMPLER_DIRECT_QUERIES
+
+
+def _image(alpha=False, h=90, w=120):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (h, w, 4 if alpha else 3), dtype=np.uint8)
+    if alpha:
+        img[..., 3] = 255
+        img[:30, :40, 3] = 0
+    return img
+
+
+def _direct_circle(img, cx, cy, r):
+    h, w = img.shape[:2]
+    yy, xx = np.mgrid[:h, :w]
+    inside = (xx - cx) ** 2 + (yy - cy) ** 2 <= r * r
+    if img.shape[2] == 4:
+        inside &= img[..., 3] > 0
+    px = img[..., :3][inside].astype(np.float64)
+    if not px.shape[0]:
+        # Regions without valid pixels report zero mean/std
+        return 0, np.zeros(3), np.zeros(3)
+    return px.shape[0], px.mean(axis=0), px.std(axis=0)
+
+
+def _check_circles(img, centers, r, dense):
+    sampler = RegionSampler(img)
+    if dense:
+        sampler._build_tables()
+    st = sampler.circles(centers[:, 0], centers[:, 1], r)
+    for i, (cx, cy) in enumerate(centers):
+        n, mean, std = _direct_circle(img, cx, cy, r)
+        assert st['count'][i] == n
+        assert np.allclose(st['mean'][i], mean, atol=1e-9)
+        assert np.allclose(st['std'][i], std, atol=1e-6)
+
+
+def test_circles_match_direct_means():
+    # Centres near the borders exercise the clipped row spans
+    centers = np.array([[60, 45], [3, 4], [118, 88], [0, 89], [70, 10]])
+    for alpha in (False, True):
+        img = _image(alpha)
+        for dense in (False, True):
+            _check_circles(img, centers, 9, dense)
+
+
+def test_dense_query_uses_prefix_tables():
+    img = _image(alpha=True)
+    rng = np.random.default_rng(1)
+    centers = np.column_stack([rng.integers(0, 120, SAMPLER_DIRECT_QUERIES + 6),
+                               rng.integers(0, 90, SAMPLER_DIRECT_QUERIES + 6)])
+    sampler = RegionSampler(img)
+    sampler.circles(centers[:, 0], centers[:, 1], 6)
+    assert sampler._sum is not None
+    _check_circles(img, centers, 6, dense=True)
+
+
+def test_boxes_match_direct_means():
+    img = _image(alpha=True)
+    boxes = [(10, 5, 50, 40), (0, 0, 40, 30), (100, 70, 130, 100)]
+    for dense in (False, True):
+        sampler = RegionSampler(img)
+        if dense:
+            sampler._build_tables()
+        st = sampler.boxes(*np.array(boxes).T)
+        for i, (x0, y0, x1, y1) in enumerate(boxes):
+            region = img[y0:y1, x0:x1]
+            px = region[..., :3][region[..., 3] > 0].astype(np.float64)
+            assert st['count'][i] == px.shape[0]
+            if px.shape[0]:
+                assert np.allclose(st['mean'][i], px.mean(axis=0), atol=1e-9)
+            else:
+                assert np.all(st['mean'][i] == 0)
@@ -0,0 +1,33 @@
+"""Regression tests for the spectrum-based repeat unit (modules/PatternUnitBackend.py)."""
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.PatternUnitBackend import repeat_unit, real_spectrum
+
+
+def _tiled(width, height=480, tile_h=40, tile_w=56):
+    rng = np.random.default_rng(0)
+    tile = cv2.GaussianBlur((rng.random((tile_h, tile_w)) * 255).astype(np.uint8), (3, 3), 0)
+    gray = np.tile(tile, (height // tile_h + 1, width // tile_w + 1))[:height, :width]
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def test_repeat_unit_on_padded_spectrum():
+    # 560 is not 5-smooth, so the shared spectrum is zero-padded to 576
+    img = _tiled(560)
+    assert real_spectrum(img[..., 0])['fft_shape'] != img.shape[:2]
+    unit = repeat_unit(img)
+    assert unit is not None
+    assert abs(unit['period_x'] - 56) < 0.5
+    assert abs(unit['period_y'] - 40) < 0.5
+
+
+def test_repeat_unit_matches_unpadded_size():
+    padded, unpadded = repeat_unit(_tiled(560)), repeat_unit(_tiled(540))
+    assert abs(padded['period_x'] - unpadded['period_x']) < 0.5
+    assert abs(padded['period_y'] - unpadded['period_y']) < 0.5